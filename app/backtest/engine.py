@@ -3,6 +3,7 @@
 import math
 from collections import defaultdict
 
+import numpy as np
 from sqlalchemy.orm import Session
 
 from app.backtest.models import BacktestRun, BacktestTrade, BacktestEquity
@@ -87,6 +88,57 @@ def compute_stats(trades: list[Trade]) -> dict:
     }
 
 
+def compute_stats_arrays(returns: np.ndarray, day_index: np.ndarray) -> dict:
+    """compute_stats 的数组版（tick 回测网格扫描用，不构建 Trade 对象）
+
+    Args:
+        returns: 每笔收益（%）
+        day_index: 每笔交易所属交易日的序号（按日期升序编号）
+
+    Returns:
+        与 compute_stats 相同的统计字典（求和保持逐项累加，四舍五入结果一致）
+    """
+    total = len(returns)
+    if total == 0:
+        return compute_stats([])
+
+    wins = int(np.count_nonzero(returns > 0))
+    avg_ret = sum(returns.tolist()) / total
+
+    # 同日多笔取均值，按日期复利
+    counts = np.bincount(day_index)
+    sums = np.bincount(day_index, weights=returns)
+    has_trade = counts > 0
+    daily = sums[has_trade] / counts[has_trade]
+    equity = np.cumprod(1 + daily / 100)
+    peak = np.maximum.accumulate(np.maximum(equity, 1.0))
+    max_dd = max(0.0, float(((peak - equity) / peak).max()))
+    total_return = (float(equity[-1]) - 1) * 100
+
+    if total > 1:
+        std = (sum(((returns - avg_ret) ** 2).tolist()) / (total - 1)) ** 0.5
+        sharpe = (avg_ret / std * math.sqrt(252)) if std > 0 else 0
+    else:
+        sharpe = 0
+
+    win_returns = returns[returns > 0]
+    loss_returns = returns[returns < 0]
+    avg_win = sum(win_returns.tolist()) / len(win_returns) if len(win_returns) else 0
+    avg_loss = abs(sum(loss_returns.tolist()) / len(loss_returns)) if len(loss_returns) else 0
+    profit_factor = avg_win / avg_loss if avg_loss > 0 else 0
+
+    return {
+        "total_trades": total,
+        "win_trades": wins,
+        "win_rate": round(wins / total, 4),
+        "avg_return": round(avg_ret, 4),
+        "total_return": round(total_return, 4),
+        "max_drawdown": round(max_dd * 100, 4),
+        "sharpe_ratio": round(sharpe, 4),
+        "profit_factor": round(profit_factor, 4),
+    }
+
+
 def build_equity_curve(trades: list[Trade]) -> list[dict]:
     """按日期聚合构建权益曲线
 
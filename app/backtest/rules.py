@@ -0,0 +1,191 @@
+# coding:utf-8
+"""声明式筛选规则 — 实盘监控与回测共用
+
+规则格式与 BacktestStrategy.filters 相同:
+    {"min_score": {"enabled": True, "value": 100}, "min_rate": {"enabled": True, "value": 7}, ...}
+
+compile_rules 把规则编译为 RuleSet:
+  - predicate / steps: 对列数组整体求掩码（实盘一轮快照、回测一批记录都是一次向量运算）
+  - score:            评分公式（系数可调，默认与实盘一致）
+
+空值处理有两种模式:
+  strict=True   NaN 一律不通过（实盘 / tick 回测：没有行情就不能入选）
+  strict=False  按 FILTER_REGISTRY 的 null_pass（回测旧数据兼容：字段为空时跳过该条件）
+"""
+import numpy as np
+
+# 过滤器注册表：数据驱动的过滤逻辑
+# null_pass: True 表示字段为 NULL 时跳过过滤（兼容旧数据），False 表示 NULL 不通过
+# stat: 实盘 filter_stats 中的统计键
+FILTER_REGISTRY = {
+    "min_score":    {"attr": "scores",   "op": ">=", "null_pass": False, "stat": "score"},
+    "min_rate":     {"attr": "rates",    "op": ">=", "null_pass": False, "stat": "cje_rate"},
+    "min_bzf":      {"attr": "bzf",      "op": ">=", "null_pass": True,  "stat": "min_bzf"},
+    "max_bzf":      {"attr": "bzf",      "op": "<=", "null_pass": True,  "stat": "max_bzf"},
+    "min_zhenfu":   {"attr": "zhenfu",   "op": ">=", "null_pass": True,  "stat": "zhenfu"},
+    "min_chg_1min": {"attr": "chg_1min", "op": ">=", "null_pass": True,  "stat": "chg_1min"},
+    "time_start":   {"attr": "times",    "op": ">=", "stat": "time_start"},
+    "time_end":     {"attr": "times",    "op": "<=", "stat": "time_end"},
+    "min_lbs":      {"attr": "lbs",      "op": ">=", "null_pass": True,  "stat": "min_lbs"},
+    "min_ozf":      {"attr": "ozf",      "op": ">=", "null_pass": True,  "stat": "ozf"},
+}
+
+# 条件求值顺序（决定实盘 filter_stats 中各条件的淘汰计数）：
+# 开盘即固定的条件在前，其后与原实盘逻辑一致（换手率 → 振幅 → 涨速 → 评分）
+RULE_ORDER = (
+    "min_ozf", "min_lbs", "time_start", "time_end",
+    "min_rate", "min_zhenfu", "min_chg_1min", "min_score", "min_bzf", "max_bzf",
+)
+
+# 评分系数: (涨速 * w_chg + 涨幅 * w_bzf) * 板块系数 + 成交额(万) * w_cje
+SCORE_WEIGHTS = {"w_chg": 20, "w_bzf": 10, "w_cje": 0.001}
+
+
+def _on(value) -> dict:
+    return {"enabled": True, "value": value}
+
+
+# 实盘默认规则（原 mighty / lianban / jjmighty 中写死的阈值）
+LIVE_RULES = {
+    "mighty": {
+        "min_rate": _on(7),
+        "min_zhenfu": _on(3),
+        "min_chg_1min": _on(1),
+        "min_score": _on(100),
+    },
+    "lianban": {
+        "min_rate": _on(7),
+        "min_zhenfu": _on(3),
+        "min_chg_1min": _on(1),
+        "min_score": _on(100),
+    },
+    "jjmighty": {
+        "min_ozf": _on(3),
+        "min_rate": _on(7),
+        "min_zhenfu": _on(3),
+        "min_chg_1min": _on(1),
+        "min_score": _on(100),
+    },
+}
+
+
+def times_to_int(times) -> int:
+    """"HHMM" → 整数（空值为 -1，与原逻辑 "" < "0930" 一致）"""
+    return int(times) if times else -1
+
+
+class RuleSet:
+    """编译后的规则
+
+    conditions: [(filter key, attr, op, 阈值, null_pass)]，按 RULE_ORDER 排序
+    """
+
+    def __init__(self, conditions: list[tuple], strict: bool, weights: dict):
+        self.conditions = conditions
+        self.strict = strict
+        self.weights = weights
+
+    @property
+    def keys(self) -> list[str]:
+        return [c[0] for c in self.conditions]
+
+    @property
+    def attrs(self) -> list[str]:
+        return list(dict.fromkeys(c[1] for c in self.conditions))
+
+    def threshold(self, key: str):
+        for k, _, _, threshold, _ in self.conditions:
+            if k == key:
+                return threshold
+        return None
+
+    def steps(self, columns: dict) -> list[tuple[str, np.ndarray]]:
+        """按顺序返回 (filter key, 通过掩码)
+
+        Args:
+            columns: {attr: 数组或标量}，缺少某个 attr 的条件直接跳过
+                     （如 mighty 的记录没有 lbs 字段）
+        """
+        out = []
+        for key, attr, op, threshold, null_pass in self.conditions:
+            if attr not in columns:
+                continue
+            value = columns[attr]
+            with np.errstate(invalid="ignore"):
+                passed = (value >= threshold) if op == ">=" else (value <= threshold)
+            if attr != "times" and null_pass and not self.strict:
+                passed = passed | np.isnan(value)
+            out.append((key, np.asarray(passed)))
+        return out
+
+    def predicate(self, columns: dict, size) -> np.ndarray:
+        """全部条件同时通过的掩码（size 为掩码长度或形状）"""
+        mask = np.ones(size, dtype=bool)
+        for _, passed in self.steps(columns):
+            mask &= passed
+        return mask
+
+    def rejects(self, columns: dict, size: int) -> np.ndarray:
+        """有值且确定不通过某个条件的掩码（NaN 视为未知，不计入）"""
+        mask = np.zeros(size, dtype=bool)
+        for key, passed in self.steps(columns):
+            value = columns[FILTER_REGISTRY[key]["attr"]]
+            mask |= ~passed & ~np.isnan(value)
+        return mask
+
+    def describe(self) -> str:
+        return ", ".join(f"{attr}{op}{threshold:g}" for _, attr, op, threshold, _ in self.conditions)
+
+    def score(self, chg_1min, change_ratio, zs_times, cje):
+        """评分（向量化）: (涨速 * w_chg + 涨幅 * w_bzf) * 板块系数 + 成交额(万) * w_cje"""
+        w = self.weights
+        return np.round((chg_1min * w["w_chg"] + change_ratio * w["w_bzf"]) * zs_times + cje * w["w_cje"])
+
+
+def compile_rules(
+    filters: dict,
+    allowed: set[str] | None = None,
+    strict: bool = False,
+    weights: dict | None = None,
+) -> RuleSet:
+    """把 filters 配置编译为 RuleSet
+
+    Args:
+        filters: {"min_score": {"enabled": True, "value": 100}, ...}
+        allowed: 允许的 filter key（策略白名单），None 表示不限制
+        strict: True 时 NaN 一律不通过
+        weights: 评分系数，默认 SCORE_WEIGHTS
+    """
+    conditions = []
+    for key in sorted(filters, key=lambda k: RULE_ORDER.index(k) if k in RULE_ORDER else len(RULE_ORDER)):
+        config = filters[key]
+        if allowed is not None and key not in allowed:
+            continue
+        if not config.get("enabled", True):
+            continue
+        reg = FILTER_REGISTRY.get(key)
+        if not reg:
+            continue
+        value = config["value"]
+        threshold = times_to_int(str(value)) if reg["attr"] == "times" else float(value)
+        conditions.append((key, reg["attr"], reg["op"], threshold, reg.get("null_pass", False)))
+    return RuleSet(conditions, strict, {**SCORE_WEIGHTS, **(weights or {})})
+
+
+def record_columns(records, attrs) -> dict[str, np.ndarray]:
+    """把数据库记录列表转为 {attr: 数组}（NULL → NaN，times → 整数）
+
+    记录没有的属性不出现在结果中，对应条件会被跳过。
+    """
+    columns = {}
+    for attr in attrs:
+        if records and not hasattr(records[0], attr):
+            continue
+        if attr == "times":
+            columns[attr] = np.array([times_to_int(getattr(r, attr)) for r in records], dtype=np.int64)
+        else:
+            columns[attr] = np.array(
+                [np.nan if getattr(r, attr) is None else float(getattr(r, attr)) for r in records],
+                dtype=float,
+            )
+    return columns
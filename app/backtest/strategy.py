@@ -1,7 +1,7 @@
 # coding:utf-8
 """通用回测策略 — 从数据表读取信号，按参数过滤，计算每笔收益
 
-支持三个策略，共享相同的过滤逻辑，只读取不同的数据表:
+支持三个策略，共享相同的过滤逻辑（app/backtest/rules.py，与实盘监控同一套规则），只读取不同的数据表:
   mighty:   db_mighty   (强势反包，股票池=昨日大成交额>8亿非涨停)
   lianban:  db_lianban  (连板反包，股票池=昨日连板>=2)
   jjmighty: db_jjmighty (竞价强势，股票池=昨日全部涨停股)
@@ -10,6 +10,7 @@ from dataclasses import dataclass
 
 from sqlalchemy.orm import Session
 
+from app.backtest.rules import FILTER_REGISTRY, compile_rules, record_columns
 from app.features.mighty.models import Mighty
 from app.features.lianban.models import Lianban
 from app.features.jjmighty.models import Jjmighty
@@ -42,22 +43,6 @@ GRID_RANGES = {
     "time_end": ["0935", "0940", "0946"],
 }
 
-# 过滤器注册表：数据驱动的过滤逻辑
-# null_pass: True 表示字段为 NULL 时跳过过滤（兼容旧数据），False 表示 NULL 不通过
-FILTER_REGISTRY = {
-    "min_score":    {"attr": "scores",   "op": ">=", "null_pass": False},
-    "min_rate":     {"attr": "rates",    "op": ">=", "null_pass": False},
-    "min_bzf":      {"attr": "bzf",      "op": ">=", "null_pass": True},
-    "max_bzf":      {"attr": "bzf",      "op": "<=", "null_pass": True},
-    "min_zhenfu":   {"attr": "zhenfu",   "op": ">=", "null_pass": True},
-    "min_chg_1min": {"attr": "chg_1min", "op": ">=", "null_pass": True},
-    "time_start":   {"attr": "times",    "op": ">="},
-    "time_end":     {"attr": "times",    "op": "<="},
-    "min_lbs":      {"attr": "lbs",      "op": ">=", "null_pass": True},
-    "min_ozf":      {"attr": "ozf",      "op": ">=", "null_pass": True},
-}
-
-
 @dataclass
 class Trade:
     stockid: str
@@ -83,6 +68,23 @@ def params_to_filters(params: dict) -> dict:
     return filters
 
 
+def filter_records(records: list, filters: dict) -> list:
+    """按 filters 配置批量过滤数据库记录（编译为规则后整列求掩码）
+
+    Args:
+        records: 数据库记录列表（Model 实例）
+        filters: {"min_score": {"enabled": True, "value": 100}, ...}
+
+    Returns:
+        通过过滤的记录（保持原顺序）
+    """
+    if not records:
+        return []
+    rules = compile_rules(filters)
+    mask = rules.predicate(record_columns(records, rules.attrs), len(records))
+    return [rec for rec, passed in zip(records, mask.tolist()) if passed]
+
+
 def apply_filters(rec, filters: dict) -> bool:
     """根据 filters 配置过滤单条记录
 
@@ -93,43 +95,7 @@ def apply_filters(rec, filters: dict) -> bool:
     Returns:
         True 通过过滤，False 被过滤掉
     """
-    for key, config in filters.items():
-        if not config.get("enabled", True):
-            continue
-
-        reg = FILTER_REGISTRY.get(key)
-        if not reg:
-            continue
-
-        attr_name = reg["attr"]
-        op = reg["op"]
-        threshold = config["value"]
-
-        # 获取记录属性值
-        if not hasattr(rec, attr_name):
-            continue
-
-        raw_value = getattr(rec, attr_name)
-
-        # NULL 值：times 字段空字符串视为不通过，数值字段跳过过滤
-        if attr_name == "times":
-            val = raw_value or ""
-            threshold_str = str(threshold)
-            if op == ">=" and val < threshold_str:
-                return False
-            if op == "<=" and val > threshold_str:
-                return False
-        else:
-            if raw_value is None:
-                continue
-            val = float(raw_value)
-            threshold_f = float(threshold)
-            if op == ">=" and val < threshold_f:
-                return False
-            if op == "<=" and val > threshold_f:
-                return False
-
-    return True
+    return bool(filter_records([rec], filters))
 
 
 def generate_trades(
@@ -174,10 +140,7 @@ def generate_trades(
     records = query.all()
 
     trades = []
-    for rec in records:
-        if not apply_filters(rec, active_filters):
-            continue
-
+    for rec in filter_records(records, active_filters):
         bzf = float(rec.bzf) if rec.bzf is not None else 0
         # 收益 = 收盘涨幅 - 入选时涨幅
         return_pct = float(rec.lastzf) - bzf
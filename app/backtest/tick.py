@@ -0,0 +1,352 @@
+# coding:utf-8
+"""tick 级回测 — 用盘中录制的行情快照按任意阈值重新筛选
+
+generate_trades 只能在实盘已入选（已写入 db_mighty 等表）的记录上再过滤，
+看不到更宽松阈值下本该入选的股票。tick 回测直接读取 data/ticks/<cdate>.npz
+（见 app/collectors/recorder.py），用与实盘完全相同的评分公式
+（MonitorStrategy.features）一次算出整天所有 tick 的指标，再按过滤条件
+找出每只股票第一个满足全部条件的 tick 作为入选点。
+
+为了能在几秒内扫完一个月的网格参数:
+  1. 构建时按 "最宽松" 的过滤条件（floor）预筛，只保留可能入选的
+     (股票, tick) 单元，按 (股票, tick) 排序存成长表；
+  2. 每组参数只在这些单元上做向量比较（单个条件的掩码按取值缓存，网格扫描时
+     上层条件的掩码逐层复用），按列号变化取每只股票的首个入选 tick，
+     网格扫描直接在收益数组上算统计。
+
+收益 = 收盘涨幅 - 入选时涨幅，收盘涨幅取本地日线（data/bars）与三张入选表的 lastzf，
+没有收盘涨幅的股票不产生交易（计入 no_close）。
+与实盘一致，缺失值（NaN）一律视为不通过。
+"""
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.backtest.engine import compute_stats_arrays
+from app.backtest.rules import FILTER_REGISTRY, compile_rules
+from app.backtest.strategy import DEFAULT_PARAMS, STRATEGIES, Trade, params_to_filters
+from app.collectors import func
+from app.collectors.bars import load_bars
+from app.collectors.jjmighty import JjmightyMonitor
+from app.collectors.lianban import LianbanMonitor
+from app.collectors.mighty import MightyMonitor
+from app.collectors.recorder import TICKS_DIR, load_day
+
+MONITORS = {
+    "mighty": MightyMonitor,
+    "lianban": LianbanMonitor,
+    "jjmighty": JjmightyMonitor,
+}
+
+# 长表中保存的逐 tick 指标（键名与 FILTER_REGISTRY 的 attr 一致）
+CELL_FEATURES = ("scores", "rates", "bzf", "zhenfu", "chg_1min", "ozf", "cje")
+
+
+@dataclass
+class StockDay:
+    """长表中一列（某日某只股票）的静态信息"""
+    cdate: str
+    stockid: str
+    lastzf: float
+    zs_times: float
+    lbs: int | None
+
+
+def list_tick_days(start_date: str, end_date: str, directory: str = TICKS_DIR) -> list[str]:
+    """日期范围内有录制文件的交易日 YYYYMMDD"""
+    if not os.path.isdir(directory):
+        return []
+    days = []
+    for name in os.listdir(directory):
+        cdate, ext = os.path.splitext(name)
+        if ext == ".npz" and len(cdate) == 8 and cdate.isdigit() and start_date <= cdate <= end_date:
+            days.append(cdate)
+    return sorted(days)
+
+
+def load_close_ratios(db: Session, cdate: str) -> dict[str, float]:
+    """某日各股票的收盘涨幅
+
+    优先取本地日线（全市场，实盘未入选的股票也有收盘涨幅），
+    三张入选表的 lastzf 覆盖同名股票（与实盘收盘更新的值保持一致）。
+    """
+    closes = {}
+    bars = load_bars(cdate)
+    if bars is not None:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = np.round(bars["close"] / bars["preClose"] * 100 - 100, 2)
+        valid = np.isfinite(ratios)
+        closes.update(zip(bars.codes[valid].tolist(), ratios[valid].tolist()))
+    for meta in STRATEGIES.values():
+        Model = meta["model"]
+        rows = (
+            db.query(Model.stockid, Model.lastzf)
+            .filter(Model.cdate == cdate, Model.lastzf.isnot(None))
+            .all()
+        )
+        for stockid, lastzf in rows:
+            closes[stockid] = float(lastzf)
+    return closes
+
+
+def _active(filters: dict) -> dict[str, tuple[str, str, float]]:
+    """启用的过滤条件 {key: (attr, op, 阈值)}，times 阈值转为 HHMM 整数"""
+    return {key: (attr, op, threshold) for key, attr, op, threshold, _ in compile_rules(filters).conditions}
+
+
+def loosest_filters(grid: dict[str, list], base: dict | None = None) -> dict:
+    """网格参数中每个过滤条件最宽松的取值（用作预筛 floor）"""
+    params = {**(base or {})}
+    for key, values in grid.items():
+        reg = FILTER_REGISTRY.get(key)
+        if not reg or not values:
+            continue
+        cast = int if reg["attr"] == "times" else float
+        params[key] = (min if reg["op"] == ">=" else max)(values, key=cast)
+    return params_to_filters(params)
+
+
+class TickBacktest:
+    """在录制的 tick 快照上回测一个策略
+
+    Args:
+        db: SQLAlchemy Session（读取股票池与收盘涨幅）
+        strategy_name: mighty / lianban / jjmighty
+        start_date: 起始日期 YYYYMMDD
+        end_date: 结束日期 YYYYMMDD
+        floor: 预筛过滤条件（filters 格式），之后 run 的条件必须不比它宽松；
+               None 表示不预筛
+        directory: 录制文件目录
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        strategy_name: str,
+        start_date: str,
+        end_date: str,
+        floor: dict | None = None,
+        directory: str = TICKS_DIR,
+    ):
+        if strategy_name not in MONITORS:
+            raise ValueError(f"未知策略: {strategy_name}，可选: {list(MONITORS.keys())}")
+        self.strategy_name = strategy_name
+        self.has_lbs = strategy_name != "mighty"
+        self.floor = _active(floor or {})
+        # 预筛与实盘一致：NaN 一律不通过
+        self.floor_rules = compile_rules(floor or {}, strict=True)
+        self.days: list[str] = []
+        self.stocks: list[StockDay] = []
+        self.no_close = 0
+
+        cols, hms, feats = [], [], {k: [] for k in CELL_FEATURES}
+        for cdate in list_tick_days(start_date, end_date, directory):
+            part = self._load_day(db, cdate, directory)
+            if part is None:
+                continue
+            col, hm, values = part
+            cols.append(col)
+            hms.append(hm)
+            for k in CELL_FEATURES:
+                feats[k].append(values[k])
+            self.days.append(cdate)
+
+        self.col = np.concatenate(cols) if cols else np.zeros(0, dtype=np.intp)
+        self.hm = np.concatenate(hms) if hms else np.zeros(0, dtype=np.int32)
+        self.features = {
+            k: (np.concatenate(v) if v else np.zeros(0)) for k, v in feats.items()
+        }
+        lbs = [s.lbs if s.lbs is not None else np.nan for s in self.stocks]
+        self.lbs = np.array(lbs, dtype=float)
+        self.lastzf = np.array([s.lastzf for s in self.stocks], dtype=float)
+        day_index = {cdate: i for i, cdate in enumerate(self.days)}
+        self.day_of = np.array([day_index[s.cdate] for s in self.stocks], dtype=np.intp)
+        self._masks: dict[tuple, np.ndarray] = {}
+
+    def _load_day(self, db: Session, cdate: str, directory: str):
+        """计算一天的全部 tick 指标，返回预筛后的 (列号, HHMM, 指标) 长表"""
+        monitor = MONITORS[self.strategy_name]()
+        monitor.cdate = cdate
+        monitor.lsdate = func.get_previous_trading_day(
+            f"{cdate[:4]}-{cdate[4:6]}-{cdate[6:]}"
+        ).replace("-", "")
+        error = monitor.load_pool(db)
+        if error:
+            print(f"[{cdate}] 跳过: {error}")
+            return None
+
+        day = load_day(cdate, directory)
+        closes = load_close_ratios(db, cdate)
+        pool = {}
+        for code, info in monitor.stock_pool.items():
+            if code not in day.index:
+                continue
+            if code not in closes:
+                self.no_close += 1
+                continue
+            pool[code] = info
+        if not pool:
+            return None
+        monitor.stock_pool = pool
+        monitor.bind(day.index)
+
+        f = monitor.features(day)
+        # 与实盘 screen 相同的前置条件：有行情、核心字段非空、未涨停
+        mask = f["present"] & ~(np.isnan(f["latest"]) | np.isnan(f["open"]) | np.isnan(f["preClose"]))
+        mask &= f["latest"] != f["upperLimit"]
+
+        hm_ticks = np.array(
+            [int(datetime.fromtimestamp(float(t)).strftime("%H%M")) for t in day.ts], dtype=np.int32
+        )
+        # 没有连板数的策略（mighty）features 中无 lbs，min_lbs 条件随之跳过
+        columns = {**f, "times": np.broadcast_to(hm_ticks[:, None], mask.shape)}
+        if "lbs" in f:
+            columns["lbs"] = np.broadcast_to(f["lbs"][None, :], mask.shape)
+        mask &= self.floor_rules.predicate(columns, mask.shape)
+
+        # 按 (股票, tick) 排序取出候选单元
+        stock_idx, tick_idx = np.nonzero(mask.T)
+        offset = len(self.stocks)
+        for code, zs_times in zip(monitor.codes, monitor.zs_times):
+            self.stocks.append(StockDay(
+                cdate=cdate,
+                stockid=code,
+                lastzf=closes[code],
+                zs_times=float(zs_times),
+                lbs=pool[code].get("lbs"),
+            ))
+        values = {k: f[k][tick_idx, stock_idx] for k in CELL_FEATURES}
+        return stock_idx + offset, hm_ticks[tick_idx], values
+
+    def _check_floor(self, active: dict):
+        for key, (attr, op, floor) in self.floor.items():
+            if key not in active:
+                raise ValueError(f"过滤条件 {key} 不能关闭（预筛已按 {floor} 过滤）")
+            threshold = active[key][2]
+            if (op == ">=" and threshold < floor) or (op == "<=" and threshold > floor):
+                raise ValueError(f"过滤条件 {key}={threshold} 比预筛 {floor} 更宽松")
+
+    def _condition(self, attr: str, op: str, threshold: float) -> np.ndarray | None:
+        """单个过滤条件在长表上的掩码（按条件缓存，网格扫描时每个取值只算一次）"""
+        key = (attr, op, threshold)
+        if key in self._masks:
+            return self._masks[key]
+        if attr == "times":
+            value = self.hm
+        elif attr == "lbs":
+            # 与 generate_trades 一致：没有连板数字段的策略（mighty）忽略该条件
+            if not self.has_lbs:
+                return None
+            value = self.lbs[self.col]
+        elif attr in self.features:
+            value = self.features[attr]
+        else:
+            return None
+        mask = (value >= threshold) if op == ">=" else (value <= threshold)
+        self._masks[key] = mask
+        return mask
+
+    def _mask(self, active: dict) -> np.ndarray:
+        mask = np.ones(len(self.col), dtype=bool)
+        for attr, op, threshold in active.values():
+            cond = self._condition(attr, op, threshold)
+            if cond is not None:
+                mask &= cond
+        return mask
+
+    def _first_cells(self, mask: np.ndarray) -> np.ndarray:
+        """长表按 (股票, tick) 排序，列号变化处即每只股票第一个通过的单元"""
+        passed = np.flatnonzero(mask)
+        col = self.col[passed]
+        first = np.ones(len(passed), dtype=bool)
+        first[1:] = col[1:] != col[:-1]
+        return passed[first]
+
+    def entries(self, filters: dict) -> np.ndarray:
+        """各股票第一个满足全部条件的单元下标"""
+        active = _active(filters)
+        self._check_floor(active)
+        return self._first_cells(self._mask(active))
+
+    def run(self, params: dict | None = None, filters: dict | None = None) -> list[Trade]:
+        """按过滤条件回测，返回交易列表（与 generate_trades 参数含义相同）"""
+        if filters is None:
+            filters = params_to_filters({**DEFAULT_PARAMS, **(params or {})})
+        cells = self.entries(filters)
+
+        trades = []
+        f = self.features
+        for i in cells:
+            stock = self.stocks[self.col[i]]
+            bzf = float(f["bzf"][i])
+            signal_data = {
+                "scores": float(f["scores"][i]),
+                "bzf": bzf,
+                "lastzf": stock.lastzf,
+                "rates": float(f["rates"][i]),
+                "ozf": float(f["ozf"][i]),
+                "cje": float(f["cje"][i]),
+                "zhenfu": float(f["zhenfu"][i]),
+                "chg_1min": round(float(f["chg_1min"][i]), 2),
+                "zs_times": stock.zs_times,
+                "times": f"{int(self.hm[i]):04d}",
+            }
+            if stock.lbs is not None:
+                signal_data["lbs"] = stock.lbs
+            trades.append(Trade(
+                stockid=stock.stockid,
+                stockname=stock.stockid.split(".")[0],
+                entry_date=stock.cdate,
+                return_pct=round(stock.lastzf - bzf, 4),
+                signal_data=signal_data,
+            ))
+        return trades
+
+    def sweep(self, grid: dict[str, list], base: dict | None = None) -> list[tuple[dict, dict]]:
+        """网格扫描，返回 [(网格参数, 统计)]（顺序同 itertools.product）
+
+        按网格键逐层深入，上层条件的掩码在下层复用，每组参数只需一次与运算；
+        统计由 compute_stats_arrays 直接在收益数组上计算（与 compute_stats 结果一致），
+        不为每组参数构建 Trade 对象。
+        """
+        base = {**DEFAULT_PARAMS, **(base or {})}
+        # 最宽松的组合不低于预筛条件，则所有组合都不低于
+        self._check_floor(_active(loosest_filters(grid, base)))
+        fixed = _active(params_to_filters({k: v for k, v in base.items() if k not in grid}))
+        keys = list(grid.keys())
+        results = []
+
+        def walk(depth: int, mask: np.ndarray, params: dict):
+            if depth == len(keys):
+                cells = self._first_cells(mask)
+                col = self.col[cells]
+                returns = np.round(self.lastzf[col] - self.features["bzf"][cells], 4)
+                results.append((dict(params), compute_stats_arrays(returns, self.day_of[col])))
+                return
+            key = keys[depth]
+            for value in grid[key]:
+                params[key] = value
+                cond = None
+                for attr, op, threshold in _active(params_to_filters({key: value})).values():
+                    cond = self._condition(attr, op, threshold)
+                walk(depth + 1, mask if cond is None else mask & cond, params)
+
+        walk(0, self._mask(fixed), {})
+        return results
+
+
+def generate_tick_trades(
+    db: Session,
+    strategy_name: str,
+    start_date: str,
+    end_date: str,
+    params: dict | None = None,
+    filters: dict | None = None,
+) -> list[Trade]:
+    """单次 tick 回测（参数同 generate_trades）"""
+    if filters is None:
+        filters = params_to_filters({**DEFAULT_PARAMS, **(params or {})})
+    return TickBacktest(db, strategy_name, start_date, end_date, floor=filters).run(filters=filters)
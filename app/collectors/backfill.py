@@ -0,0 +1,218 @@
+# coding:utf-8
+"""历史数据批量补采（可中断续跑、多交易日并发）
+
+按采集器依次补采日期范围内的全部交易日，同一采集器的各交易日并发执行，
+所有并发合计的 THS 请求频率受 BACKFILL_THS_RATE 限制（RateLimitedSource）。
+采集器之间按固定顺序分阶段执行（thsdata 读取前一交易日的 stat 结果和当日日线，
+须在 bars / stat 全部补完后再跑）。历史日线没有涨跌停价，thsdata 按昨收与涨跌幅限制推算
+（app/collectors/bars.py 的 fill_limit_prices）。
+
+large_amount 与 thsdata 都整体替换当日的 db_large_amount（口径不同: 前者只看成交额 > 8 亿，
+后者与收盘后调度一致，另含跌停 / 冲高回落），不能同时补采；默认只跑 thsdata。
+
+每完成一个 (采集器, 交易日) 立即写入检查点文件，中断后用相同参数重新运行
+会跳过已完成的部分，失败的交易日会重试。
+
+用法:
+  python -m app.collectors.backfill 2025-01-02 2025-02-14
+  python -m app.collectors.backfill 2025-01-02 2025-02-14 --collectors=stat,large_amount --workers=2 --rate=1
+  python -m app.collectors.backfill 2025-01-02 2025-02-14 --restart      忽略检查点重新补采
+
+  --collectors  逗号分隔，可选 bars / stat / large_amount / thsdata（按此顺序执行，
+                默认 bars,stat,thsdata；large_amount 与 thsdata 不能同时选）
+  --workers     并发交易日数（默认 BACKFILL_WORKERS）
+  --rate        THS 请求频率上限，次/秒（默认 BACKFILL_THS_RATE，0 表示不限）
+  --checkpoint  检查点文件（默认 data/backfill/<开始>_<结束>.json）
+"""
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app.collectors import func
+from app.collectors.bars import ensure_bars
+from app.collectors.quotecache import CachedQuoteSource
+from app.collectors.quotes import RateLimitedSource, get_source, set_source
+from app.collectors.stat import collect_stat
+from app.collectors.thsdata import backfill_large_amount, collect_ztdb
+from app.config import get_settings
+from app.database import SessionLocal
+from app.trading_calendar import get_calendar
+
+CHECKPOINT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "backfill"
+)
+
+
+def _bars(trading_day: str, db) -> dict:
+    bars = ensure_bars(trading_day)
+    if bars is None:
+        return {"error": f"无 {trading_day} 日线数据"}
+    return {"date": bars.cdate, "codes": len(bars)}
+
+
+# 可补采的采集器 {名称: fn(交易日 YYYY-MM-DD, db) -> 结果}，按执行顺序排列
+COLLECTORS = {
+    "bars": _bars,
+    "stat": lambda day, db: collect_stat(day.replace("-", ""), db),
+    "large_amount": lambda day, db: backfill_large_amount(day.replace("-", ""), db),
+    "thsdata": collect_ztdb,
+}
+
+# 默认补采的采集器（每张表只有一个写入者）
+DEFAULT_COLLECTORS = ("bars", "stat", "thsdata")
+
+
+class Checkpoint:
+    """补采进度 {"done": {采集器: [交易日]}, "failed": {采集器: {交易日: 错误}}}，每次更新原子写盘"""
+
+    def __init__(self, path: str, restart: bool = False):
+        self.path = path
+        self.done: dict[str, set[str]] = {}
+        self.failed: dict[str, dict[str, str]] = {}
+        self._lock = threading.Lock()
+        if not restart and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.done = {name: set(days) for name, days in data.get("done", {}).items()}
+            self.failed = data.get("failed", {})
+
+    def is_done(self, name: str, day: str) -> bool:
+        return day in self.done.get(name, ())
+
+    def mark(self, name: str, day: str, error: str | None = None):
+        with self._lock:
+            if error:
+                self.failed.setdefault(name, {})[day] = error
+            else:
+                self.done.setdefault(name, set()).add(day)
+                self.failed.get(name, {}).pop(day, None)
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "done": {name: sorted(days) for name, days in self.done.items()},
+                "failed": {name: days for name, days in self.failed.items() if days},
+            }, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+
+def _run_one(name: str, day: str) -> str | None:
+    """补采一个 (采集器, 交易日)，成功返回 None，失败返回错误信息"""
+    db = SessionLocal()
+    try:
+        result = COLLECTORS[name](day, db)
+        if isinstance(result, dict) and result.get("error"):
+            return str(result["error"])
+        return None
+    except Exception as e:
+        db.rollback()
+        return str(e)
+    finally:
+        db.close()
+
+
+def run_backfill(
+    start: str,
+    end: str,
+    collectors: list[str] | None = None,
+    workers: int | None = None,
+    rate: float | None = None,
+    checkpoint: str | None = None,
+    restart: bool = False,
+) -> dict:
+    """补采日期范围内的交易日，返回 {采集器: {"done", "failed", "seconds", "dates_per_min"}}"""
+    names = [name for name in COLLECTORS if name in (collectors or DEFAULT_COLLECTORS)]
+    unknown = set(collectors or ()) - set(COLLECTORS)
+    if unknown:
+        raise ValueError(f"未知采集器: {', '.join(sorted(unknown))}，可选: {', '.join(COLLECTORS)}")
+    if {"large_amount", "thsdata"} <= set(names):
+        raise ValueError("large_amount 与 thsdata 都会整体替换 db_large_amount，只能选其一")
+    workers = workers or get_settings().BACKFILL_WORKERS
+    rate = get_settings().BACKFILL_THS_RATE if rate is None else rate
+
+    days = get_calendar().range(start, end)
+    state = Checkpoint(
+        checkpoint or os.path.join(CHECKPOINT_DIR, f"{start.replace('-', '')}_{end.replace('-', '')}.json"),
+        restart,
+    )
+    print(f"补采 {start} ~ {end} 共 {len(days)} 个交易日，采集器: {', '.join(names)}，"
+          f"并发 {workers}，THS 限速 {rate or '不限'} 次/秒，检查点 {state.path}")
+
+    previous = get_source()
+    if rate and isinstance(previous, CachedQuoteSource):
+        # 限速放在缓存之后，命中缓存的查询不占用请求额度
+        set_source(CachedQuoteSource(RateLimitedSource(previous.source, rate), previous.cache))
+    elif rate:
+        set_source(RateLimitedSource(previous, rate))
+    summary = {}
+    started = time.perf_counter()
+    try:
+        for name in names:
+            todo = [day for day in days if not state.is_done(name, day)]
+            if len(todo) < len(days):
+                print(f"[{name}] 检查点已完成 {len(days) - len(todo)} 个交易日，剩余 {len(todo)}")
+            stage_start = time.perf_counter()
+            done = failed = 0
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"backfill-{name}") as pool:
+                futures = {pool.submit(_run_one, name, day): day for day in todo}
+                for future in as_completed(futures):
+                    day = futures[future]
+                    error = future.result()
+                    state.mark(name, day, error)
+                    if error:
+                        failed += 1
+                    else:
+                        done += 1
+                    minutes = (time.perf_counter() - stage_start) / 60
+                    speed = (done + failed) / minutes if minutes else 0.0
+                    status = f"失败: {error}" if error else "完成"
+                    print(f"[{name}] {day} {status}（{done + failed}/{len(todo)}，{speed:.1f} 日/分钟）")
+            seconds = time.perf_counter() - stage_start
+            summary[name] = {
+                "done": done,
+                "failed": failed,
+                "seconds": round(seconds, 1),
+                "dates_per_min": round((done + failed) / seconds * 60, 1) if seconds else 0.0,
+            }
+    finally:
+        set_source(previous)
+
+    total = time.perf_counter() - started
+    processed = sum(s["done"] + s["failed"] for s in summary.values())
+    print(f"补采结束，耗时 {total:.1f}s，共 {processed} 个 (采集器, 交易日)，"
+          f"{processed / total * 60 if total else 0:.1f} 个/分钟: {summary}")
+    return summary
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    opts = dict(a[2:].split("=", 1) if "=" in a else (a[2:], True) for a in sys.argv[1:] if a.startswith("--"))
+    if len(args) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    collectors = opts["collectors"].split(",") if isinstance(opts.get("collectors"), str) else None
+    func.thslogin()
+    try:
+        summary = run_backfill(
+            args[0],
+            args[1],
+            collectors=collectors,
+            workers=int(opts["workers"]) if "workers" in opts else None,
+            rate=float(opts["rate"]) if "rate" in opts else None,
+            checkpoint=opts.get("checkpoint") if isinstance(opts.get("checkpoint"), str) else None,
+            restart=bool(opts.get("restart")),
+        )
+    finally:
+        func.thslogout()
+    sys.exit(1 if any(s["failed"] for s in summary.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,12 +9,16 @@
   python -m app.collectors.backtest_runner mighty 20250101 20250214 --time_end=0935
   python -m app.collectors.backtest_runner mighty 20250101 20250214 --min_bzf=3 --max_bzf=8
   python -m app.collectors.backtest_runner mighty 20250101 20250214 --grid
+  python -m app.collectors.backtest_runner mighty 20250101 20250214 --ticks          用录制的 tick 快照重新筛选
+  python -m app.collectors.backtest_runner mighty 20250101 20250214 --ticks --grid --min_score=60
 """
 import sys
+import time
 from itertools import product
 
 from app.backtest.strategy import generate_trades, STRATEGIES, DEFAULT_PARAMS, GRID_RANGES
 from app.backtest.engine import compute_stats, save_backtest
+from app.backtest.tick import TickBacktest, generate_tick_trades, loosest_filters
 from app.database import SessionLocal
 
 
@@ -41,12 +45,16 @@ def parse_args():
     return strategy, start_date, end_date, params, flags
 
 
-def run_single(strategy: str, start_date: str, end_date: str, params: dict, save: bool = True):
-    """执行单次回测"""
+def run_single(strategy: str, start_date: str, end_date: str, params: dict, save: bool = True, ticks: bool = False):
+    """执行单次回测（ticks=True 时在录制的 tick 快照上重新筛选）"""
     db = SessionLocal()
     try:
         merged_params = {**DEFAULT_PARAMS, **params}
-        trades = generate_trades(db, strategy, start_date, end_date, merged_params)
+        if ticks:
+            trades = generate_tick_trades(db, strategy, start_date, end_date, merged_params)
+            merged_params["mode"] = "tick"
+        else:
+            trades = generate_trades(db, strategy, start_date, end_date, merged_params)
         stats = compute_stats(trades)
 
         label = STRATEGIES[strategy]["label"]
@@ -73,20 +81,31 @@ def run_single(strategy: str, start_date: str, end_date: str, params: dict, save
         db.close()
 
 
-def run_grid(strategy: str, start_date: str, end_date: str):
-    """参数网格搜索"""
+def run_grid(strategy: str, start_date: str, end_date: str, base_params: dict | None = None, ticks: bool = False):
+    """参数网格搜索（ticks=True 时在录制的 tick 快照上扫描）"""
     db = SessionLocal()
     try:
         keys = list(GRID_RANGES.keys())
         values = [GRID_RANGES[k] for k in keys]
-
-        results = []
-        for combo in product(*values):
-            params = dict(zip(keys, combo))
-            merged = {**DEFAULT_PARAMS, **params}
-            trades = generate_trades(db, strategy, start_date, end_date, merged)
-            stats = compute_stats(trades)
-            results.append((params, stats))
+        base = {**DEFAULT_PARAMS, **(base_params or {})}
+
+        start = time.perf_counter()
+        if ticks:
+            # tick 指标只计算一次，按网格中最宽松的条件预筛，每组参数只做向量比较
+            backtest = TickBacktest(db, strategy, start_date, end_date, floor=loosest_filters(GRID_RANGES, base))
+            print(f"tick 快照已加载: {len(backtest.days)} 天，候选单元 {len(backtest.col)} 个，"
+                  f"无收盘涨幅跳过 {backtest.no_close} 只，耗时 {time.perf_counter() - start:.1f}s")
+            start = time.perf_counter()
+            results = backtest.sweep(GRID_RANGES, base)
+        else:
+            results = []
+            for combo in product(*values):
+                params = dict(zip(keys, combo))
+                merged = {**base, **params}
+                trades = generate_trades(db, strategy, start_date, end_date, merged)
+                stats = compute_stats(trades)
+                results.append((params, stats))
+        print(f"网格 {len(results)} 组参数，耗时 {time.perf_counter() - start:.1f}s")
 
         # 按胜率降序，再按平均收益降序排序
         results.sort(key=lambda x: (x[1]["win_rate"], x[1]["avg_return"]), reverse=True)
@@ -125,8 +144,12 @@ def run_grid(strategy: str, start_date: str, end_date: str):
 
         # 保存最优结果
         if best and best[1]["total_trades"] > 0:
-            best_params = {**DEFAULT_PARAMS, **best[0]}
-            best_trades = generate_trades(db, strategy, start_date, end_date, best_params)
+            best_params = {**base, **best[0]}
+            if ticks:
+                best_trades = backtest.run(best_params)
+                best_params["mode"] = "tick"
+            else:
+                best_trades = generate_trades(db, strategy, start_date, end_date, best_params)
             run = save_backtest(db, strategy, start_date, end_date, best_params, best_trades)
             print(f"\n最优参数回测已保存，ID: {run.id}")
 
@@ -142,14 +165,15 @@ def main():
         sys.exit(1)
 
     if not start_date or not end_date:
-        print("用法: python -m app.collectors.backtest_runner <strategy> <start_date> <end_date> [--params] [--grid]")
+        print("用法: python -m app.collectors.backtest_runner <strategy> <start_date> <end_date> [--params] [--grid] [--ticks]")
         print(f"策略: {list(STRATEGIES.keys())}")
         sys.exit(1)
 
+    ticks = "ticks" in flags
     if "grid" in flags:
-        run_grid(strategy, start_date, end_date)
+        run_grid(strategy, start_date, end_date, params, ticks=ticks)
     else:
-        run_single(strategy, start_date, end_date, params)
+        run_single(strategy, start_date, end_date, params, ticks=ticks)
 
 
 if __name__ == "__main__":
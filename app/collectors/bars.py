@@ -0,0 +1,275 @@
+# coding:utf-8
+"""本地日线库（每个交易日一个 data/bars/<cdate>.npz）
+
+收盘后按当日股票池（app/collectors/universe.py）用一次全市场 THS_RQ 取当天日线写入本地，
+之后涉及历史交易日的采集（竞价爆量的昨日成交量、大额成交补采、涨停反包、
+tick 回测的收盘涨幅）直接读本地文件，不再请求 THS。
+
+文件格式（列式，代码升序）:
+  codes   (N,)  股票代码
+  names   (N,)  股票名称
+  trading (N,)  当天是否正常交易
+  open / high / low / close / preClose / volume / amount / upperLimit / lowerLimit
+          (N,)  float64，缺失为 NaN
+          volume 统一为 THS_HQ 的单位（股），amount 单位为元
+          THS_HQ 没有涨跌停价，历史日期按昨收与涨跌幅限制推算（见 fill_limit_prices）
+
+用法:
+  python -m app.collectors.bars                    收盘后写入今天的日线
+  python -m app.collectors.bars 2025-02-14         补采指定交易日（THS_HQ）
+
+  bars = load_bars("20250214")
+  cols = bars.take(["600000.SH", "000001.SZ"], ("close", "volume"))   # 按日期、批量取股票
+  dates, hist = stock_history("600000.SH", "20250101", "20250214")     # 按股票取日期序列
+"""
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from app.collectors import func, thsjson
+from app.collectors.quotes import get_source
+from app.collectors.universe import get_universe
+
+BARS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "bars"
+)
+
+# 日线字段
+BAR_FIELDS = ("open", "high", "low", "close", "preClose", "volume", "amount", "upperLimit", "lowerLimit")
+
+# 收盘后 THS_RQ 指标 → 日线字段
+RQ_FIELDS = {
+    "open": "open",
+    "high": "high",
+    "low": "low",
+    "latest": "close",
+    "preClose": "preClose",
+    "volume": "volume",
+    "amount": "amount",
+    "upperLimit": "upperLimit",
+    "lowerLimit": "lowerLimit",
+}
+
+RQ_INDICATORS = ";".join(RQ_FIELDS) + ";tradeStatus"
+
+# 历史日期 THS_HQ 指标（与日线字段同名）
+HQ_FIELDS = ("open", "high", "low", "close", "preClose", "volume", "amount")
+
+# 已加载的日线 {路径: (mtime, DailyBars)}
+_cache: dict[str, tuple[float, "DailyBars"]] = {}
+
+
+def bars_path(cdate: str, directory: str = BARS_DIR) -> str:
+    return os.path.join(directory, f"{cdate}.npz")
+
+
+class DailyBars:
+    """一个交易日的全市场日线（列式）"""
+
+    def __init__(self, cdate: str, codes, names, trading, columns: dict[str, np.ndarray]):
+        order = np.argsort(np.asarray(codes, dtype=str), kind="stable")
+        self.cdate = cdate
+        self.codes = np.asarray(codes, dtype=str)[order]
+        self.names = np.asarray(names, dtype=str)[order]
+        self.trading = np.asarray(trading, dtype=bool)[order]
+        self.columns = {
+            field: np.asarray(columns.get(field, np.full(len(order), np.nan)), dtype=float)[order]
+            for field in BAR_FIELDS
+        }
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.columns[field]
+
+    def positions(self, codes) -> tuple[np.ndarray, np.ndarray]:
+        """代码在本日线中的位置 (位置, 是否存在)，二分查找，整批一次完成"""
+        query = np.asarray(codes, dtype=str)
+        if len(self.codes) == 0:
+            return np.zeros(len(query), dtype=np.intp), np.zeros(len(query), dtype=bool)
+        pos = np.searchsorted(self.codes, query)
+        pos = np.minimum(pos, len(self.codes) - 1)
+        return pos, self.codes[pos] == query
+
+    def take(self, codes, fields=BAR_FIELDS) -> dict[str, np.ndarray]:
+        """批量取若干股票的字段，与 codes 顺序一致，不存在的股票为 NaN"""
+        pos, found = self.positions(codes)
+        return {field: np.where(found, self.columns[field][pos], np.nan) for field in fields}
+
+    def get(self, code: str) -> dict | None:
+        """单只股票的日线 {字段: 值}"""
+        pos, found = self.positions([code])
+        if not found[0]:
+            return None
+        i = int(pos[0])
+        return {
+            "name": str(self.names[i]),
+            "trading": bool(self.trading[i]),
+            **{field: float(self.columns[field][i]) for field in BAR_FIELDS},
+        }
+
+
+def save_bars(bars: DailyBars, directory: str = BARS_DIR) -> str:
+    """原子写入日线文件（先写临时文件再替换）"""
+    os.makedirs(directory, exist_ok=True)
+    path = bars_path(bars.cdate, directory)
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, codes=bars.codes, names=bars.names, trading=bars.trading, **bars.columns)
+    os.replace(tmp, path)
+    _cache.pop(path, None)
+    return path
+
+
+def load_bars(cdate: str, directory: str = BARS_DIR) -> DailyBars | None:
+    """读取某日日线，不存在返回 None（按文件修改时间缓存）"""
+    path = bars_path(cdate, directory)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with np.load(path) as data:
+        bars = DailyBars(
+            cdate, data["codes"], data["names"], data["trading"],
+            {field: data[field] for field in BAR_FIELDS if field in data.files},
+        )
+    _cache[path] = (mtime, bars)
+    return bars
+
+
+def stock_history(
+    code: str, start_date: str, end_date: str, fields=BAR_FIELDS, directory: str = BARS_DIR
+) -> tuple[list[str], dict[str, np.ndarray]]:
+    """单只股票在日期范围内的日线序列（只含本地已有的交易日）
+
+    Returns:
+        (日期列表 YYYYMMDD, {字段: 与日期对齐的数组})
+    """
+    dates, values = [], {field: [] for field in fields}
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            cdate, ext = os.path.splitext(name)
+            if ext != ".npz" or not (start_date <= cdate <= end_date) or not cdate.isdigit():
+                continue
+            bars = load_bars(cdate, directory)
+            row = bars.take([code], fields)
+            dates.append(cdate)
+            for field in fields:
+                values[field].append(row[field][0])
+    return dates, {field: np.array(v, dtype=float) for field, v in values.items()}
+
+
+def bars_from_rq(cdate: str, data: bytes | str, name_map: dict[str, str]) -> DailyBars:
+    """把收盘后全市场 THS_RQ 的返回数据按列转为 DailyBars"""
+    thscodes, values = thsjson.rq_columns(data, (*RQ_FIELDS, "tradeStatus"))
+    columns = {
+        field: np.array(values[indicator], dtype=float)
+        for indicator, field in RQ_FIELDS.items()
+    }
+    # THS_RQ 成交量单位为手，换算为与 THS_HQ 一致的股
+    columns["volume"] *= 100
+    trading = np.array([status == "交易" for status in values["tradeStatus"]], dtype=bool)
+    names = [name_map.get(code, "") for code in thscodes]
+    return DailyBars(cdate, thscodes, names, trading, columns)
+
+
+def limit_pct(codes, st, cdate: str) -> np.ndarray:
+    """各股票的涨跌幅限制: 北交所 30%，创业板（20200824 起）/ 科创板 20%，主板 ST 5%，其余 10%"""
+    codes = np.asarray(codes, dtype=str)
+    pct = np.where(np.asarray(st, dtype=bool), 0.05, 0.1)
+    wide = np.char.startswith(codes, "68")
+    if cdate >= "20200824":
+        wide |= np.char.startswith(codes, "30")
+    pct = np.where(wide, 0.2, pct)
+    return np.where(np.char.endswith(codes, ".BJ"), 0.3, pct)
+
+
+def fill_limit_prices(bars: DailyBars, st_codes: set[str]) -> DailyBars:
+    """缺失的涨跌停价按 昨收 × (1 ± 涨跌幅限制) 四舍五入到分补齐（原地修改，返回 bars）
+
+    新股上市首日等无涨跌幅限制的情况无法推算，与实际涨跌停价可能不同。
+    """
+    missing = np.isnan(bars["upperLimit"]) | np.isnan(bars["lowerLimit"])
+    if not missing.any():
+        return bars
+    pct = limit_pct(bars.codes, np.isin(bars.codes, list(st_codes)), bars.cdate)
+    pre_close = bars["preClose"]
+    # 四舍五入（非银行家舍入），1e-6 吸收浮点误差
+    upper = np.floor(pre_close * (1 + pct) * 100 + 0.5 + 1e-6) / 100
+    lower = np.floor(pre_close * (1 - pct) * 100 + 0.5 + 1e-6) / 100
+    bars.columns["upperLimit"] = np.where(np.isnan(bars["upperLimit"]), upper, bars["upperLimit"])
+    bars.columns["lowerLimit"] = np.where(np.isnan(bars["lowerLimit"]), lower, bars["lowerLimit"])
+    return bars
+
+
+def fetch_bars(trading_day: str) -> DailyBars | str:
+    """从 THS 取一个交易日的全市场日线，失败返回错误信息
+
+    当天（收盘后）用一次全市场 THS_RQ，历史日期用一次多代码 THS_HQ。
+    """
+    ths = get_source()
+    if not ths.available:
+        return "iFinDPy not available"
+
+    cdate = trading_day.replace("-", "")
+    universe = get_universe(trading_day)
+    if universe is None:
+        return f"无 {cdate} 股票池"
+    codes = universe.codes.tolist()
+    name_map = universe.name_map()
+
+    if trading_day == datetime.today().strftime("%Y-%m-%d"):
+        data = ths.rq(codes, RQ_INDICATORS, "", "format:json")
+        if data.errorcode != 0:
+            return f"THS_RQ 失败: {data.errmsg}"
+        return bars_from_rq(cdate, data.data, name_map)
+
+    data = ths.hq(";".join(codes), ",".join(HQ_FIELDS), "", trading_day, trading_day, "format:json")
+    if data.errorcode != 0:
+        return f"THS_HQ 失败: {data.errmsg}"
+    thscodes, values = thsjson.rq_columns(data.data, HQ_FIELDS)
+    columns = {field: np.array(values[field], dtype=float) for field in HQ_FIELDS}
+    # 历史行情没有交易状态，以当天有成交视为正常交易
+    trading = np.nan_to_num(columns["volume"]) > 0
+
+    names = [name_map.get(code, "") for code in thscodes]
+    return fill_limit_prices(DailyBars(cdate, thscodes, names, trading, columns), universe.st_codes())
+
+
+def ensure_bars(trading_day: str, directory: str = BARS_DIR) -> DailyBars | None:
+    """读取本地日线，没有则从 THS 取一次并写入本地；取不到返回 None"""
+    cdate = trading_day.replace("-", "")
+    bars = load_bars(cdate, directory)
+    if bars is not None:
+        return bars
+    bars = fetch_bars(trading_day)
+    if isinstance(bars, str):
+        print(f"获取 {cdate} 日线失败: {bars}")
+        return None
+    save_bars(bars, directory)
+    return bars
+
+
+def collect_bars(trading_day: str, db=None) -> dict:
+    """收盘后写入当天全市场日线（调度器任务，db 未使用）"""
+    bars = fetch_bars(trading_day)
+    if isinstance(bars, str):
+        return {"error": bars}
+    path = save_bars(bars)
+    return {"date": bars.cdate, "codes": len(bars), "trading": int(bars.trading.sum()), "path": path}
+
+
+if __name__ == "__main__":
+    date_arg = sys.argv[1] if len(sys.argv) > 1 else datetime.today().strftime("%Y-%m-%d")
+    trading_day = func.get_trading_day(date_arg)
+
+    func.thslogin()
+    try:
+        print(f"日线写入完成: {collect_bars(trading_day)}")
+    finally:
+        func.thslogout()
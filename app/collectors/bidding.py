@@ -2,23 +2,19 @@
 """竞价一字+爆量采集 — 原 python/bidding.py 迁移
 将 Redis 中间层替换为直接写入 Cloud SQL (SQLAlchemy)
 """
-import json
 from datetime import datetime
 
 from sqlalchemy.orm import Session
 
-from app.collectors import func
+from app.collectors import func, thsjson
+from app.collectors.bars import load_bars
+from app.collectors.bulk import replace_rows, upsert_rows
 from app.collectors.models import ZtReson
+from app.collectors.quotes import get_source
+from app.collectors.universe import get_universe
 from app.features.jjztdt.models import Jjztdt
 from app.features.jjbvol.models import Jjbvol
 
-try:
-    from iFinDPy import THS_DR, THS_RQ, THS_HQ
-except ImportError:
-    THS_DR = None
-    THS_RQ = None
-    THS_HQ = None
-
 
 def collect_bidding(trading_day: str, db: Session) -> dict:
     """采集竞价一字板和爆量数据
@@ -30,7 +26,8 @@ def collect_bidding(trading_day: str, db: Session) -> dict:
     Returns:
         统计信息
     """
-    if THS_DR is None:
+    ths = get_source()
+    if not ths.available:
         return {"error": "iFinDPy not available"}
 
     tradingday_obj = datetime.strptime(trading_day, "%Y-%m-%d")
@@ -38,23 +35,14 @@ def collect_bidding(trading_day: str, db: Session) -> dict:
     yesterday_str = func.get_previous_trading_day(trading_day)
     lsdate = yesterday_str.replace("-", "")
 
-    # 获取全部A股代码
-    date_params = f"date={cdate}"
-    data_codes = THS_DR(
-        "p03291",
-        date_params + ";blockname=001005010;iv_type=allcontract",
-        "p03291_f001:Y,p03291_f002:Y,p03291_f003:Y,p03291_f004:Y",
-    )
-    if data_codes.errorcode != 0:
-        return {"error": data_codes.errmsg}
-
-    codes_list = data_codes.data["p03291_f002"].tolist()
-    names_list = data_codes.data["p03291_f003"].tolist()
-    stock_name_map = dict(zip(codes_list, names_list))
+    # 当日股票池（全部A股代码、名称、ST 标记）
+    universe = get_universe(trading_day, db)
+    if universe is None:
+        return {"error": f"无 {cdate} 股票池"}
+    stock_name_map = universe.name_map()
 
     # 过滤ST
-    sid_list = [sid for sid in codes_list if "ST" not in stock_name_map.get(sid, "")]
-    codes_str = ", ".join(sid_list)
+    codes_str = ", ".join(universe.codes[~universe.st].tolist())
 
     # 从 db_zt_reson 获取昨日涨停数据 (由 stat.py 采集写入)
     lszt_records = db.query(ZtReson).filter(ZtReson.cdate == lsdate).all()
@@ -65,7 +53,7 @@ def collect_bidding(trading_day: str, db: Session) -> dict:
         lszt_stocks[rec.stockid] = {"lbs": rec.lbs}
 
     # 获取竞价实时行情
-    data_result = THS_RQ(
+    data_result = ths.rq(
         codes_str,
         "bid1;ask1;changeRatio;upperLimit;downLimit;amount;volume;bidSize1;askSize1;tradeStatus;chg_5min",
         "", "format:json",
@@ -74,13 +62,13 @@ def collect_bidding(trading_day: str, db: Session) -> dict:
     if data_result.errorcode != 0:
         return {"error": data_result.errmsg}
 
-    jdata = json.loads(data_result.data.decode('gb18030'))
+    jdata = thsjson.loads(data_result.data)
 
     zts = 0
     dts = 0
     ztfd = 0.0
     dtfd = 0.0
-    jjbvol_list = []
+    candidates = []  # 昨日涨停且竞价涨幅/金额达标，待比较昨日成交量
 
     for item in jdata["tables"]:
         thscode = item["thscode"]
@@ -121,19 +109,33 @@ def collect_bidding(trading_day: str, db: Session) -> dict:
         if change_ratio[0] < 5 or amount[0] < 10000000:
             continue
 
-        # 获取昨日成交量
-        data_lshq = THS_HQ(thscode, "volume,close,amount", "", yesterday_str, yesterday_str, "format:json")
+        candidates.append((thscode, change_ratio[0], chg_5min[0], amount[0], volume[0]))
+
+    # 候选股昨日成交量: 优先读本地日线，日线缺失的代码一次多代码 THS_HQ 补齐
+    ls_volumes = {}
+    ls_bars = load_bars(lsdate) if candidates else None
+    if ls_bars is not None:
+        candidate_codes = [code for code, *_ in candidates]
+        volumes = ls_bars.take(candidate_codes, ("volume",))["volume"]
+        ls_volumes = {code: v for code, v in zip(candidate_codes, volumes.tolist()) if v == v}
+    missing = [code for code, *_ in candidates if code not in ls_volumes]
+    if missing:
+        data_lshq = ths.hq(
+            ";".join(missing),
+            "volume,close,amount", "", yesterday_str, yesterday_str, "format:json",
+        )
         if data_lshq.errorcode != 0:
-            continue
-
-        hqdata = json.loads(data_lshq.data.decode('gb18030'))
-        ls_volume = 0
-        for hqs in hqdata["tables"]:
-            ls_volume = hqs["table"]["volume"][0]
+            print(f"获取昨日成交量失败: {data_lshq.errmsg}")
+        else:
+            for hqs in thsjson.tables(data_lshq.data):
+                ls_volumes[hqs["thscode"]] = hqs["table"]["volume"][0]
 
-        if ls_volume == 0:
+    jjbvol_list = []
+    for thscode, zf, zs, jje, volume in candidates:
+        ls_volume = ls_volumes.get(thscode)
+        if not ls_volume:
             continue
-        vol_rate = round(volume[0] * 100 / ls_volume * 100, 2)
+        vol_rate = round(volume * 100 / ls_volume * 100, 2)
         if vol_rate < 8:
             continue
 
@@ -143,28 +145,20 @@ def collect_bidding(trading_day: str, db: Session) -> dict:
         jjbvol_list.append({
             "stockid": thscode,
             "stockname": stock_name_map.get(thscode, ""),
-            "zf": round(change_ratio[0], 2),
-            "zs": round(chg_5min[0], 2),
-            "volume": volume[0],
-            "jje": round(amount[0] / 10000),
+            "zf": round(zf, 2),
+            "zs": round(zs, 2),
+            "volume": volume,
+            "jje": round(jje / 10000),
             "rate": vol_rate,
             "status": status,
         })
 
     # 写入竞价一字数据 (upsert)
-    existing = db.query(Jjztdt).filter(Jjztdt.cdate == cdate).first()
-    if existing:
-        existing.zts = zts
-        existing.ztfd = round(ztfd, 2)
-        existing.dts = dts
-        existing.dtfd = round(dtfd, 2)
-    else:
-        db.add(Jjztdt(cdate=cdate, zts=zts, ztfd=round(ztfd, 2), dts=dts, dtfd=round(dtfd, 2)))
+    upsert_rows(db, Jjztdt, [{"cdate": cdate, "zts": zts, "ztfd": round(ztfd, 2), "dts": dts, "dtfd": round(dtfd, 2)}],
+                key=("cdate",))
 
     # 写入竞价爆量数据
-    db.query(Jjbvol).filter(Jjbvol.cdate == cdate).delete()
-    for bvol in jjbvol_list:
-        db.add(Jjbvol(cdate=cdate, **bvol))
+    replace_rows(db, Jjbvol, [{"cdate": cdate, **bvol} for bvol in jjbvol_list], scope={"cdate": cdate})
 
     db.commit()
     return {
@@ -0,0 +1,89 @@
+# coding:utf-8
+"""采集结果批量写入 — 分块多行 INSERT ... ON DUPLICATE KEY UPDATE
+
+原先各采集器 "先删当日全部记录，再逐条 db.add()"：通过 TCP 连 Cloud SQL 时
+flush 阶段每行一次往返，且删除与写入之间读端会短暂看到空表。
+这里改为:
+  1. 按唯一键分块 upsert（每块一条多行 INSERT，已有记录原地更新）
+  2. 删除同一范围内本次结果中已不存在的键（一条 DELETE）
+两步在调用方的同一事务中完成，提交前读端看到的始终是旧数据。
+
+用法:
+    replace_rows(db, Ztdb, rows, scope={"cdate": cdate})   # 当日结果整体替换
+    upsert_rows(db, MoneyEffect, [row], key=("cdate",))     # 单行汇总
+    db.commit()
+"""
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+# 每条 INSERT 的行数
+CHUNK_SIZE = 1000
+
+# 采集表的默认唯一键
+DEFAULT_KEY = ("cdate", "stockid")
+
+
+def upsert_rows(
+    db: Session, Model, rows: list[dict], key: tuple[str, ...] = DEFAULT_KEY, chunk_size: int = CHUNK_SIZE
+) -> int:
+    """分块 upsert，唯一键冲突时用新值更新其余列（不提交）
+
+    Returns:
+        写入行数
+    """
+    if not rows:
+        return 0
+    table = Model.__table__
+    # 只更新本次提供的非键列（自增主键、未提供的列保持原值）
+    columns = [c for c in rows[0] if c not in key and not table.c[c].primary_key]
+    for start in range(0, len(rows), chunk_size):
+        stmt = mysql_insert(table).values(rows[start:start + chunk_size])
+        updates = {c: stmt.inserted[c] for c in columns} or {key[0]: stmt.inserted[key[0]]}
+        db.execute(stmt.on_duplicate_key_update(**updates))
+    return len(rows)
+
+
+def delete_stale(db: Session, Model, rows: list[dict], scope: dict, key: tuple[str, ...] = DEFAULT_KEY) -> int:
+    """删除 scope 范围内、键不在 rows 中的旧记录（不提交）
+
+    Args:
+        scope: 范围条件 {列: 值}，如 {"cdate": "20250214"}
+        key: 唯一键，scope 中的列之外的部分用于比对
+
+    Returns:
+        删除行数
+    """
+    table = Model.__table__
+    stmt = delete(table).where(*(table.c[col] == value for col, value in scope.items()))
+    rest = [col for col in key if col not in scope]
+    if rows and rest:
+        if len(rest) == 1:
+            stmt = stmt.where(table.c[rest[0]].not_in({row[rest[0]] for row in rows}))
+        else:
+            keys = {tuple(row[col] for col in rest) for row in rows}
+            stmt = stmt.where(tuple_(*(table.c[col] for col in rest)).not_in(keys))
+    elif rows:
+        # 键完全由 scope 决定，本次有结果即无旧键
+        return 0
+    return db.execute(stmt).rowcount
+
+
+def replace_rows(
+    db: Session,
+    Model,
+    rows: list[dict],
+    scope: dict,
+    key: tuple[str, ...] = DEFAULT_KEY,
+    chunk_size: int = CHUNK_SIZE,
+) -> dict:
+    """用 rows 整体替换 scope 范围内的记录：upsert 新结果 + 删除多余旧键（不提交）
+
+    rows 须包含 scope 中的列，且取值与 scope 一致。
+
+    Returns:
+        {"upserted": 写入行数, "deleted": 删除的旧记录数}
+    """
+    upserted = upsert_rows(db, Model, rows, key, chunk_size)
+    deleted = delete_stale(db, Model, rows, scope, key)
+    return {"upserted": upserted, "deleted": deleted}
@@ -0,0 +1,111 @@
+# coding:utf-8
+"""收盘涨幅更新（mighty / lianban / jjmighty 合并为一步）
+
+三张入选表当天的股票代码取并集，只调用一次 THS_RQ(changeRatio)，
+再按主键对每张表执行一次批量 UPDATE（executemany），不再逐条修改 ORM 对象。
+
+用法:
+  python -m app.collectors.close                 更新今天三张入选表的收盘涨幅
+  python -m app.collectors.close 2025-02-14      指定日期
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.collectors import func, thsjson
+from app.collectors.quotes import get_source
+from app.features.jjmighty.models import Jjmighty
+from app.features.lianban.models import Lianban
+from app.features.mighty.models import Mighty
+
+# 需要更新收盘涨幅的入选表
+CLOSE_MODELS = {
+    "mighty": Mighty,
+    "lianban": Lianban,
+    "jjmighty": Jjmighty,
+}
+
+
+def update_close_prices(trading_day: str, db: Session, strategies=None) -> dict:
+    """收盘后批量更新入选股票的收盘涨幅
+
+    Args:
+        trading_day: 交易日 YYYY-MM-DD 格式
+        db: SQLAlchemy Session
+        strategies: 要更新的策略名，默认全部（CLOSE_MODELS）
+
+    Returns:
+        {"date", "codes": 请求的代码数, "updated": 总更新条数, "tables": {策略: 更新条数}}
+    """
+    ths = get_source()
+    if not ths.available:
+        return {"error": "iFinDPy not available"}
+
+    cdate = datetime.strptime(trading_day, "%Y-%m-%d").strftime("%Y%m%d")
+    names = list(strategies or CLOSE_MODELS)
+
+    # 各表当天入选记录 (id, stockid)
+    records = {}
+    for name in names:
+        Model = CLOSE_MODELS[name]
+        records[name] = db.query(Model.id, Model.stockid).filter(Model.cdate == cdate).all()
+    codes = sorted({stockid for rows in records.values() for _, stockid in rows})
+    if not codes:
+        return {"date": cdate, "updated": 0, "tables": {name: 0 for name in names}, "msg": "无入选记录"}
+
+    data_result = ths.rq(", ".join(codes), "changeRatio", "", "format:json")
+    if data_result.errorcode != 0:
+        return {"error": data_result.errmsg}
+
+    thscodes, columns = thsjson.rq_columns(data_result.data, ("changeRatio",))
+    lastzf = {
+        code: round(value, 2)
+        for code, value in zip(thscodes, columns["changeRatio"])
+        if value is not None
+    }
+
+    tables = {}
+    for name in names:
+        params = [
+            {"id": rec_id, "lastzf": lastzf[stockid]}
+            for rec_id, stockid in records[name]
+            if stockid in lastzf
+        ]
+        if params:
+            # 按主键的 ORM 批量 UPDATE，一条语句 executemany
+            db.execute(update(CLOSE_MODELS[name]), params)
+        tables[name] = len(params)
+        print(f"更新 {name} 收盘涨幅: {len(params)}/{len(records[name])} 条")
+    db.commit()
+
+    return {"date": cdate, "codes": len(codes), "updated": sum(tables.values()), "tables": tables}
+
+
+def update_strategy_close(name: str, trading_day: str, db: Session) -> dict:
+    """只更新单个策略（各采集模块 --close 使用）"""
+    result = update_close_prices(trading_day, db, [name])
+    if "error" in result:
+        return result
+    out = {"date": result["date"], "updated": result["tables"][name]}
+    if "msg" in result:
+        out["msg"] = result["msg"]
+    return out
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    date_arg = args[0] if args else datetime.today().strftime("%Y-%m-%d")
+    trading_day = func.get_trading_day(date_arg)
+
+    func.thslogin()
+    db = SessionLocal()
+    try:
+        result = update_close_prices(trading_day, db)
+        print(f"收盘涨幅更新完成: {result}")
+    finally:
+        db.close()
+        func.thslogout()
@@ -18,27 +18,42 @@
   python -m app.collectors.jjmighty --close             收盘后更新收盘涨幅
   python -m app.collectors.jjmighty 2025-02-14 --close  指定日期更新收盘涨幅
 """
-import json
 import sys
-import time as sys_time
-from datetime import datetime, time as dt_time
+from datetime import datetime
 
 from sqlalchemy.orm import Session
 
 from app.collectors import func
+from app.collectors.close import update_strategy_close
+from app.collectors.monitor import MonitorStrategy, run_monitors
 from app.collectors.models import ZtReson
 from app.features.jjmighty.models import Jjmighty
 
-try:
-    from iFinDPy import THS_RQ
-except ImportError:
-    THS_RQ = None
 
+class JjmightyMonitor(MonitorStrategy):
+    """竞价强势: 昨日全部涨停股，额外要求开盘涨幅 >= 3%（见 LIVE_RULES["jjmighty"]）"""
 
-def should_execute() -> bool:
-    """判断当前时间是否在执行窗口 9:30-9:46"""
-    now = datetime.now().time()
-    return dt_time(9, 30) <= now <= dt_time(9, 46)
+    name = "jjmighty"
+    label = "竞价强势"
+    Model = Jjmighty
+
+    def load_pool(self, db: Session) -> str | None:
+        # 读取昨日全部涨停股
+        zt_records = db.query(ZtReson).filter(ZtReson.cdate == self.lsdate).all()
+        if not zt_records:
+            return f"db_zt_reson 中无 {self.lsdate} 的数据"
+
+        # stock_pool: stockid -> {amount_yuan, lbs}
+        # cje 单位是亿，转换为元
+        for rec in zt_records:
+            self.stock_pool[rec.stockid] = {
+                "amount": float(rec.cje) * 1e8,
+                "lbs": rec.lbs,
+            }
+        return None
+
+    def extra(self, thscode: str) -> dict:
+        return {"lbs": self.stock_pool[thscode]["lbs"]}
 
 
 def collect_jjmighty(trading_day: str, db: Session) -> dict:
@@ -55,186 +70,12 @@ def collect_jjmighty(trading_day: str, db: Session) -> dict:
     Returns:
         统计信息
     """
-    if THS_RQ is None:
-        return {"error": "iFinDPy not available"}
-
-    cdate = datetime.strptime(trading_day, "%Y-%m-%d").strftime("%Y%m%d")
-    yesterday_str = func.get_previous_trading_day(trading_day)
-    lsdate = yesterday_str.replace("-", "")
-
-    # 读取昨日全部涨停股
-    zt_records = db.query(ZtReson).filter(ZtReson.cdate == lsdate).all()
-    if not zt_records:
-        return {"error": f"db_zt_reson 中无 {lsdate} 的数据"}
-
-    # stock_pool: stockid -> {amount_yuan, lbs}
-    # cje 单位是亿，转换为元
-    stock_pool = {}
-    for rec in zt_records:
-        stock_pool[rec.stockid] = {
-            "amount": float(rec.cje) * 1e8,
-            "lbs": rec.lbs,
-        }
-
-    codes_list = ", ".join(stock_pool.keys())
-    print(f"竞价强势监控启动，股票池: {len(stock_pool)} 只，日期: {cdate}")
-
-    total_found = 0
-    loop_count = 0
-    filter_stats = {"none_data": 0, "upper_limit": 0, "ozf": 0, "cje_rate": 0, "zhenfu": 0, "chg_1min": 0, "score": 0, "passed": 0}
-
-    while should_execute():
-        loop_count += 1
-        sys_time.sleep(3)
-
-        now = datetime.now()
-        hm = now.strftime("%H%M")
-        ms = now.strftime("%M:%S")
-
-        data_result = THS_RQ(
-            codes_list,
-            "preClose;open;latest;changeRatio;upperLimit;amount;tradeStatus;chg_1min",
-            "", "format:json",
-        )
-
-        if data_result.errorcode != 0:
-            print(f"THS_RQ 错误: {data_result.errmsg}")
-            continue
-
-        jdata = json.loads(data_result.data.decode('gb18030'))
-
-        for item in jdata["tables"]:
-            thscode = item["thscode"]
-
-            exists = db.query(Jjmighty).filter(
-                Jjmighty.cdate == cdate, Jjmighty.stockid == thscode
-            ).first()
-            if exists:
-                continue
-
-            latest = item["table"]["latest"]
-            upper_limit = item["table"]["upperLimit"]
-            open_price = item["table"]["open"]
-            pre_close = item["table"]["preClose"]
-            chg_1min = item["table"]["chg_1min"]
-            change_ratio = item["table"]["changeRatio"]
-            amount = item["table"]["amount"]
-
-            if latest[0] is None or open_price[0] is None or pre_close[0] is None:
-                filter_stats["none_data"] += 1
-                continue
-
-            # 过滤已涨停
-            if upper_limit[0] is not None and float(latest[0]) == float(upper_limit[0]):
-                filter_stats["upper_limit"] += 1
-                continue
-
-            # 条件1: 开盘涨幅 >= 3%
-            ozf = round(float(open_price[0]) / float(pre_close[0]) * 100 - 100, 2)
-            if ozf < 3:
-                filter_stats["ozf"] += 1
-                continue
-
-            # 条件2: 成交额占比 >= 7%
-            ls_amount = stock_pool[thscode]["amount"]
-            if ls_amount <= 0:
-                filter_stats["cje_rate"] += 1
-                continue
-            cje_rate = round(amount[0] / ls_amount * 100, 2)
-            if cje_rate < 7:
-                filter_stats["cje_rate"] += 1
-                continue
-
-            # 条件3: 盘中振幅 >= 3%（降低，避免与竞价涨幅叠加）
-            zhenfu = round(float(latest[0]) / float(open_price[0]) * 100 - 100, 2)
-            if zhenfu < 3:
-                filter_stats["zhenfu"] += 1
-                continue
-
-            # 条件4: 1分钟涨速 >= 1%
-            if not chg_1min[0] or chg_1min[0] < 1:
-                filter_stats["chg_1min"] += 1
-                continue
-
-            # 板块系数
-            thscoder = thscode.split(".")
-            code_prefix = thscoder[0][:2]
-            zs_times = 0.6 if code_prefix in ("68", "30") else 1.0
-
-            # 成交额（万）
-            cje = round(amount[0] / 10000)
-
-            # 评分
-            score = round((chg_1min[0] * 20 + change_ratio[0] * 10) * zs_times + cje * 0.001)
-
-            # 条件5: 评分 >= 100
-            if score < 100:
-                filter_stats["score"] += 1
-                continue
-
-            filter_stats["passed"] += 1
-
-            record = Jjmighty(
-                cdate=cdate,
-                stockid=thscode,
-                stockname=thscoder[0],
-                lbs=stock_pool[thscode]["lbs"],
-                scores=score,
-                times=hm,
-                bzf=round(change_ratio[0], 2),
-                cje=cje,
-                rates=cje_rate,
-                ozf=ozf,
-                zhenfu=zhenfu,
-                chg_1min=round(chg_1min[0], 2),
-                zs_times=zs_times,
-                tms=ms,
-            )
-            db.add(record)
-            db.commit()
-            total_found += 1
-            print(f"入选: {thscode} {stock_pool[thscode]['lbs']}连板 评分={score} "
-                  f"开盘涨幅={ozf}% 涨幅={round(change_ratio[0], 2)}% "
-                  f"换手率={cje_rate}% 时间={hm}")
-
-        if loop_count % 30 == 0:
-            print(f"第{loop_count}轮 过滤统计: {filter_stats}")
-
-    print(f"竞价强势监控结束，共 {loop_count} 轮，入选 {total_found} 只")
-    print(f"最终过滤统计: {filter_stats}")
-    return {"date": cdate, "loops": loop_count, "found": total_found}
+    return run_monitors(trading_day, db, [JjmightyMonitor()])["jjmighty"]
 
 
 def update_close_price(trading_day: str, db: Session) -> dict:
-    """收盘后更新入选股票的收盘涨幅"""
-    if THS_RQ is None:
-        return {"error": "iFinDPy not available"}
-
-    cdate = datetime.strptime(trading_day, "%Y-%m-%d").strftime("%Y%m%d")
-
-    records = db.query(Jjmighty).filter(Jjmighty.cdate == cdate).all()
-    if not records:
-        return {"date": cdate, "updated": 0, "msg": "无入选记录"}
-
-    code_map = {rec.stockid: rec for rec in records}
-    codes_list = ", ".join(code_map.keys())
-
-    data_result = THS_RQ(codes_list, "changeRatio", "", "format:json")
-    if data_result.errorcode != 0:
-        return {"error": data_result.errmsg}
-
-    jdata = json.loads(data_result.data.decode('gb18030'))
-    updated = 0
-    for item in jdata["tables"]:
-        thscode = item["thscode"]
-        change_ratio = item["table"]["changeRatio"]
-        if thscode in code_map and change_ratio[0] is not None:
-            code_map[thscode].lastzf = round(change_ratio[0], 2)
-            updated += 1
-            print(f"更新 {thscode} 收盘涨幅: {round(change_ratio[0], 2)}%")
-
-    db.commit()
-    return {"date": cdate, "updated": updated}
+    """收盘后更新入选股票的收盘涨幅（见 app/collectors/close.py）"""
+    return update_strategy_close("jjmighty", trading_day, db)
 
 
 if __name__ == "__main__":
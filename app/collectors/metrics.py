@@ -0,0 +1,143 @@
+# coding:utf-8
+"""盘中监控逐 tick 指标
+
+每轮记录 THS 往返耗时、解码耗时、筛选耗时、入库耗时、股票池大小、入选数与超时情况:
+  - 逐行追加到本地 logs/monitor_metrics_YYYYMMDD.jsonl（最后一行为本次运行汇总）
+  - 运行结束后批量写入 db_monitor_ticks
+汇总给出各耗时的 p50/p95/p99/max 与实际 tick 间隔，用来确认 3 秒扫描在本机是否站得住。
+
+查看某天的汇总:
+  python -m app.collectors.metrics 20250214
+"""
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import insert
+
+from app.collectors.models import MonitorTick
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "logs")
+
+# 需要统计分位数的耗时字段（毫秒）
+TIMING_FIELDS = ("tick_ms", "ths_ms", "decode_ms", "screen_ms", "db_ms", "lag_ms")
+
+
+def metrics_path(cdate: str) -> str:
+    return os.path.join(LOG_DIR, f"monitor_metrics_{cdate}.jsonl")
+
+
+def summarize(rows: list[dict], interval: float) -> dict:
+    """按逐 tick 记录计算分位数与实际扫描间隔"""
+    if not rows:
+        return {"ticks": 0}
+
+    summary = {"ticks": len(rows), "interval": interval}
+    for field in TIMING_FIELDS:
+        values = np.array([row[field] for row in rows], dtype=float)
+        summary[field] = {
+            "p50": round(float(np.percentile(values, 50)), 1),
+            "p95": round(float(np.percentile(values, 95)), 1),
+            "p99": round(float(np.percentile(values, 99)), 1),
+            "max": round(float(values.max()), 1),
+        }
+
+    # 实际 tick 间隔: 相邻两轮开始时间之差
+    starts = np.array([row["ts"] for row in rows], dtype=float)
+    if len(starts) > 1:
+        gaps = np.diff(starts)
+        summary["cadence_s"] = {
+            "avg": round(float(gaps.mean()), 3),
+            "p95": round(float(np.percentile(gaps, 95)), 3),
+            "max": round(float(gaps.max()), 3),
+        }
+    tick_ms = np.array([row["tick_ms"] for row in rows], dtype=float)
+    # 单轮处理在一个间隔内完成的比例
+    summary["within_interval"] = round(float(np.mean(tick_ms < interval * 1000)), 4)
+    summary["overruns"] = sum(1 for row in rows if row["skipped"] > 0)
+    summary["skipped"] = sum(row["skipped"] for row in rows)
+    summary["selected"] = sum(row["selected"] for row in rows)
+    summary["polled_first"] = rows[0]["polled"]
+    summary["polled_last"] = rows[-1]["polled"]
+    return summary
+
+
+class MonitorMetrics:
+    """逐 tick 指标记录
+
+    Args:
+        cdate: 交易日 YYYYMMDD
+        interval: tick 间隔（秒）
+        source: 行情数据源名（ifind / replay）
+        path: 本地 JSONL 文件路径，默认 logs/monitor_metrics_<cdate>.jsonl
+    """
+
+    def __init__(self, cdate: str, interval: float, source: str = "", path: str | None = None):
+        self.cdate = cdate
+        self.interval = interval
+        self.source = source
+        self.rows: list[dict] = []
+        self.path = path or metrics_path(cdate)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def record(self, tick, ts: float, **fields) -> dict:
+        """记录一轮指标
+
+        Args:
+            tick: TickScheduler 产生的 Tick
+            ts: 本轮开始的时间（epoch 秒，数据源时钟）
+            fields: tick_ms / ths_ms / decode_ms / screen_ms / db_ms / pool / polled / selected
+        """
+        row = {
+            "cdate": self.cdate,
+            "seq": tick.seq,
+            "times": tick.at.strftime("%H:%M:%S"),
+            "ts": round(ts, 3),
+            "lag_ms": round(tick.lag * 1000, 1),
+            "skipped": tick.skipped,
+            **{k: round(v, 1) if isinstance(v, float) else v for k, v in fields.items()},
+        }
+        self.rows.append(row)
+        self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._file.flush()
+        return row
+
+    def close(self, engine=None) -> dict:
+        """写入汇总行并把逐 tick 记录批量写入数据库，返回汇总"""
+        summary = summarize(self.rows, self.interval)
+        self._file.write(json.dumps({"summary": summary, "source": self.source}, ensure_ascii=False) + "\n")
+        self._file.close()
+
+        if engine is not None and self.rows:
+            columns = {c.name for c in MonitorTick.__table__.columns}
+            rows = [
+                {k: v for k, v in {**row, "source": self.source}.items() if k in columns}
+                for row in self.rows
+            ]
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(MonitorTick), rows)
+            except Exception as e:
+                print(f"写入 db_monitor_ticks 失败（本地文件 {self.path} 已保存）: {e}")
+        return summary
+
+
+def load_rows(cdate: str) -> list[dict]:
+    """读取某天本地文件中的逐 tick 记录（多次运行合并）"""
+    rows = []
+    with open(metrics_path(cdate), encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if "summary" not in record:
+                rows.append(record)
+    return rows
+
+
+if __name__ == "__main__":
+    cdate = sys.argv[1] if len(sys.argv) > 1 else datetime.today().strftime("%Y%m%d")
+    from app.config import get_settings
+
+    print(json.dumps(summarize(load_rows(cdate), get_settings().MONITOR_INTERVAL), ensure_ascii=False, indent=2))
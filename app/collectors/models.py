@@ -1,5 +1,5 @@
 # coding:utf-8
-from sqlalchemy import Column, Integer, String, DECIMAL, UniqueConstraint
+from sqlalchemy import Column, Integer, SmallInteger, String, DECIMAL, UniqueConstraint
 
 from app.database import Base
 
@@ -18,3 +18,41 @@ class ZtReson(Base):
     __table_args__ = (
         UniqueConstraint("cdate", "stockid", name="uk_cdate_stockid"),
     )
+
+
+class MonitorTick(Base):
+    """盘中监控逐 tick 指标（见 app/collectors/metrics.py）"""
+    __tablename__ = "db_monitor_ticks"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cdate = Column(String(8), nullable=False, index=True)
+    seq = Column(Integer, nullable=False)
+    times = Column(String(8))
+    source = Column(String(20))
+    lag_ms = Column(DECIMAL(10, 1))
+    skipped = Column(Integer, default=0)
+    tick_ms = Column(DECIMAL(10, 1))
+    ths_ms = Column(DECIMAL(10, 1))
+    decode_ms = Column(DECIMAL(10, 1))
+    screen_ms = Column(DECIMAL(10, 1))
+    db_ms = Column(DECIMAL(10, 1))
+    pool = Column(Integer)
+    polled = Column(Integer)
+    selected = Column(Integer, default=0)
+
+
+class StockUniverse(Base):
+    """每日股票池快照（见 app/collectors/universe.py）"""
+    __tablename__ = "db_universe"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cdate = Column(String(8), nullable=False, index=True)
+    stockid = Column(String(20), nullable=False)
+    stockname = Column(String(50))
+    board = Column(String(8))
+    is_st = Column(SmallInteger, default=0)
+    is_bj = Column(SmallInteger, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("cdate", "stockid", name="uk_universe_cdate_stockid"),
+    )
@@ -0,0 +1,573 @@
+# coding:utf-8
+"""盘中实时监控公共框架 (9:30-9:46)
+
+mighty / lianban / jjmighty 三个策略共用同一个行情轮询器:
+每个 tick（默认 3 秒，对齐墙钟边界）对股票池并集调用一次 THS_RQ，再把同一份快照
+依次交给各策略的筛选规则，入选记录统一交给 SelectionWriter 批量写入。
+
+快照按列存为 NumPy 数组，筛选链（涨停、换手率、振幅、涨速、评分、开盘涨幅）
+以布尔掩码整体计算，股票池扩大到全市场时每轮耗时仍远小于 3 秒。
+
+策略通过继承 MonitorStrategy 实现:
+  load_pool(db) -> 填充 stock_pool {stockid: {"amount": 昨日成交额(元), "lbs": 连板数(可选)}}
+
+筛选阈值与评分不写在代码里，而是由 app/backtest/rules.py 的声明式规则编译而来
+（格式同 BacktestStrategy.filters）：默认使用 LIVE_RULES，配置 MONITOR_STRATEGY_IDS
+后直接使用回测调好并保存的策略，无需改代码。
+"""
+import math
+import time as sys_time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dt_time
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.backtest.models import BacktestStrategy
+from app.backtest.rules import FILTER_REGISTRY, LIVE_RULES, compile_rules
+from app.collectors import func, thsjson
+from app.collectors.quotes import QuoteSource, get_source
+from app.config import get_settings
+from app.database import engine
+from app.collectors.metrics import MonitorMetrics
+from app.collectors.recorder import SnapshotRecorder
+from app.collectors.ticker import TickScheduler
+from app.collectors.writer import SelectionWriter
+from app.features.shared.filters import STRATEGY_ALLOWED_FILTERS
+
+# 实时行情指标（三个策略相同）；只取数值列，返回数据为纯 ASCII，可免解码直接解析
+RQ_INDICATORS = "preClose;open;latest;changeRatio;upperLimit;amount;chg_1min"
+# 单次 THS_RQ 请求的最大代码数、并发请求的最大批数（见 .env）
+BATCH_SIZE = get_settings().THS_RQ_BATCH_SIZE
+FETCH_WORKERS = get_settings().THS_RQ_WORKERS
+
+
+# 监控窗口 9:30-9:46
+WINDOW_START = dt_time(9, 30)
+WINDOW_END = dt_time(9, 46)
+
+
+# 开盘后即固定的指标：不满足这些条件的股票全天都不会入选
+FIXED_ATTRS = ("ozf", "lbs")
+
+# 快照中的数值列
+SNAPSHOT_COLUMNS = ("latest", "open", "preClose", "upperLimit", "amount", "chg_1min", "changeRatio")
+
+
+class Snapshot:
+    """一轮行情快照（列式）
+
+    各列为与 QuotePoller.codes 顺序一致的 float64 数组，缺失值为 NaN；
+    present 标记本轮 THS 实际返回了哪些代码。
+    """
+
+    def __init__(self, size: int):
+        self.present = np.zeros(size, dtype=bool)
+        self.columns = {col: np.full(size, np.nan) for col in SNAPSHOT_COLUMNS}
+
+    def __getitem__(self, col: str) -> np.ndarray:
+        return self.columns[col]
+
+
+def parse_strategy_map(value: str) -> dict[str, int]:
+    """解析 "mighty=3,jjmighty=5" 形式的按策略配置，返回 {策略名: 整数}"""
+    out = {}
+    for item in value.split(","):
+        name, _, number = item.partition("=")
+        if number.strip():
+            out[name.strip()] = int(number)
+    return out
+
+
+def monitor_intervals() -> dict[str, int]:
+    """各策略的扫描间隔（秒）: MONITOR_INTERVALS 中未指定或为 0 的策略取 MONITOR_INTERVAL"""
+    settings = get_settings()
+    intervals = parse_strategy_map(settings.MONITOR_INTERVALS)
+    return {name: intervals.get(name) or settings.MONITOR_INTERVAL for name in ("mighty", "lianban", "jjmighty")}
+
+
+class MonitorStrategy:
+    """实时监控策略基类（列式批量筛选）
+
+    子类需设置 name / label / Model 并实现 load_pool；
+    筛选条件由规则编译（见 use_rules），filter_stats 由各条件的掩码计数得到。
+
+    Args:
+        interval: 扫描间隔（秒），默认取 MONITOR_INTERVAL
+        filters: 过滤配置（BacktestStrategy.filters 格式），默认 LIVE_RULES[name]
+    """
+
+    name = ""
+    label = ""
+    Model = None
+
+    def __init__(self, interval: int | None = None, filters: dict | None = None):
+        # 扫描间隔（秒），须为整数；默认取 MONITOR_INTERVAL
+        self.interval = int(interval or get_settings().MONITOR_INTERVAL)
+        self._last_slot = -1
+        self.cdate = ""
+        self.lsdate = ""
+        self.stock_pool: dict[str, dict] = {}
+        self.selected: set[str] = set()
+        self.loops = 0
+        self.found = 0
+        # 显式传入的规则优先于 MONITOR_STRATEGY_IDS
+        self._fixed_rules = filters is not None
+        self.use_rules(filters if filters is not None else LIVE_RULES.get(self.name, {}))
+
+    def use_rules(self, filters: dict):
+        """编译过滤配置（按策略白名单，NaN 一律不通过），并重置 filter_stats"""
+        self.filters = filters
+        self.rules = compile_rules(filters, allowed=STRATEGY_ALLOWED_FILTERS.get(self.name), strict=True)
+        stat_keys = [FILTER_REGISTRY[key]["stat"] for key in self.rules.keys]
+        self.filter_keys = ("none_data", "upper_limit", *stat_keys, "passed")
+        self.filter_stats = {k: 0 for k in self.filter_keys}
+
+    def load_rules(self, db: Session) -> str | None:
+        """MONITOR_STRATEGY_IDS 指定了本策略时改用已保存的回测策略，返回错误信息"""
+        if self._fixed_rules:
+            return None
+        ids = parse_strategy_map(get_settings().MONITOR_STRATEGY_IDS)
+        if self.name not in ids:
+            return None
+
+        saved = db.query(BacktestStrategy).filter(BacktestStrategy.id == ids[self.name]).first()
+        if saved is None:
+            return f"回测策略 {ids[self.name]} 不存在"
+        if saved.strategy_name != self.name:
+            return f"回测策略 {saved.id}({saved.name}) 属于 {saved.strategy_name}，不能用于 {self.name}"
+        self.use_rules(saved.filters)
+        print(f"{self.label}使用回测策略 {saved.id}({saved.name}): {self.rules.describe()}")
+        return None
+
+    def prepare(self, trading_day: str, db: Session) -> str | None:
+        """加载筛选规则、股票池和已入选集合，返回错误信息（无错误返回 None）"""
+        self.cdate = datetime.strptime(trading_day, "%Y-%m-%d").strftime("%Y%m%d")
+        self.lsdate = func.get_previous_trading_day(trading_day).replace("-", "")
+
+        error = self.load_rules(db) or self.load_pool(db)
+        if error:
+            return error
+
+        # 已入选股票集合：启动时从表中加载一次（支持重启），之后随写入同步更新，
+        # 循环内不再逐只查询数据库
+        Model = self.Model
+        self.selected = {
+            stockid for (stockid,) in
+            db.query(Model.stockid).filter(Model.cdate == self.cdate).all()
+        }
+        print(f"{self.label}监控启动，股票池: {len(self.stock_pool)} 只，"
+              f"已入选: {len(self.selected)} 只，日期: {self.cdate}")
+        return None
+
+    def load_pool(self, db: Session) -> str | None:
+        """填充 self.stock_pool，返回错误信息（无错误返回 None）"""
+        raise NotImplementedError
+
+    def bind(self, index: dict[str, int]):
+        """按轮询器代码顺序预先构建股票池的列数组"""
+        self.codes = list(self.stock_pool)
+        self.positions = np.array([index[code] for code in self.codes], dtype=np.intp)
+        # 昨日成交额（元）
+        self.ls_amount = np.array([self.stock_pool[code]["amount"] for code in self.codes], dtype=float)
+        # 板块系数: 创业板(30)/科创板(68) = 0.6，主板 = 1.0
+        self.zs_times = np.array([0.6 if code[:2] in ("68", "30") else 1.0 for code in self.codes])
+        self.selected_mask = np.array([code in self.selected for code in self.codes], dtype=bool)
+        # 连板数（股票池没有连板数时为 None，min_lbs 条件随之跳过）
+        if any("lbs" in info for info in self.stock_pool.values()):
+            self.lbs = np.array(
+                [np.nan if info.get("lbs") is None else float(info["lbs"]) for info in self.stock_pool.values()]
+            )
+        else:
+            self.lbs = None
+        # 永久不可能入选的股票（昨日成交额缺失时换手率无法计算），不再请求行情
+        self.ineligible = ~(self.ls_amount > 0)
+
+    def features(self, snapshot: Snapshot) -> dict[str, np.ndarray]:
+        """计算股票池的筛选指标（键名与入选表字段一致）
+
+        快照各列可以是单轮的 (N,) 数组，也可以是录制的 (T, N) 多轮数组
+        （tick 回测一次算完一整天），股票池沿最后一维选取。
+        """
+        pos = self.positions
+        latest = snapshot["latest"][..., pos]
+        open_price = snapshot["open"][..., pos]
+        pre_close = snapshot["preClose"][..., pos]
+        amount = snapshot["amount"][..., pos]
+        chg_1min = snapshot["chg_1min"][..., pos]
+        change_ratio = snapshot["changeRatio"][..., pos]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # 成交额占比（换手率）: 当前成交额 / 昨日总成交额 * 100
+            rates = np.where(self.ls_amount > 0, np.round(amount / self.ls_amount * 100, 2), np.nan)
+            # 振幅: (最新价 - 开盘价) / 开盘价 * 100
+            zhenfu = np.round(latest / open_price * 100 - 100, 2)
+            # 开盘涨幅
+            ozf = np.round(open_price / pre_close * 100 - 100, 2)
+        # 成交额（万）
+        cje = np.round(amount / 10000)
+        # 评分: (涨速 * 20 + 最新涨幅 * 10) * 板块系数 + 成交额(万) * 0.001（系数见规则）
+        scores = self.rules.score(chg_1min, change_ratio, self.zs_times, cje)
+
+        features = {
+            "latest": latest,
+            "open": open_price,
+            "preClose": pre_close,
+            "upperLimit": snapshot["upperLimit"][..., pos],
+            "present": snapshot.present[..., pos],
+            "rates": rates,
+            "zhenfu": zhenfu,
+            "ozf": ozf,
+            "cje": cje,
+            "chg_1min": chg_1min,
+            "bzf": np.round(change_ratio, 2),
+            "scores": scores,
+        }
+        if self.lbs is not None:
+            features["lbs"] = self.lbs
+        return features
+
+    def checks(self, f: dict[str, np.ndarray]) -> list[tuple[str, np.ndarray]]:
+        """按规则顺序返回 (filter_stats 键, 通过掩码)，NaN 一律视为不通过"""
+        return [(FILTER_REGISTRY[key]["stat"], passed) for key, passed in self.rules.steps(f)]
+
+    def never_qualifies(self, f: dict[str, np.ndarray]) -> np.ndarray:
+        """全天都不可能通过的股票掩码（只依据开盘后即固定的指标，如开盘涨幅、连板数）"""
+        fixed = {attr: f[attr] for attr in FIXED_ATTRS if attr in f}
+        return self.rules.rejects(fixed, len(self.codes))
+
+    def pending(self) -> np.ndarray:
+        """仍需请求行情的股票（未入选、未被永久排除）在轮询器代码中的位置"""
+        return self.positions[~(self.selected_mask | self.ineligible)]
+
+    def extra(self, thscode: str) -> dict:
+        """入选记录的附加字段（如连板数）"""
+        return {}
+
+    def screen(self, snapshot: Snapshot, hm: str, ms: str) -> list[dict]:
+        """对整轮快照批量筛选，返回本轮新入选记录"""
+        f = self.features(snapshot)
+        f["times"] = int(hm)
+        stats = self.filter_stats
+        self.ineligible |= f["present"] & self.never_qualifies(f)
+
+        alive = f["present"] & ~self.selected_mask
+
+        none_data = np.isnan(f["latest"]) | np.isnan(f["open"]) | np.isnan(f["preClose"])
+        stats["none_data"] += int(np.count_nonzero(alive & none_data))
+        alive &= ~none_data
+
+        # 过滤已涨停
+        upper = f["latest"] == f["upperLimit"]
+        stats["upper_limit"] += int(np.count_nonzero(alive & upper))
+        alive &= ~upper
+
+        for key, passed in self.checks(f):
+            stats[key] += int(np.count_nonzero(alive & ~passed))
+            alive &= passed
+
+        rows = []
+        for i in np.flatnonzero(alive):
+            thscode = self.codes[i]
+            row = {
+                "cdate": self.cdate,
+                "stockid": thscode,
+                "stockname": thscode.split(".")[0],
+                **self.extra(thscode),
+                "scores": int(f["scores"][i]),
+                "times": hm,
+                "bzf": float(f["bzf"][i]),
+                "cje": int(f["cje"][i]),
+                "rates": float(f["rates"][i]),
+                "ozf": float(f["ozf"][i]),
+                "zhenfu": float(f["zhenfu"][i]),
+                "chg_1min": round(float(f["chg_1min"][i]), 2),
+                "zs_times": float(self.zs_times[i]),
+                "tms": ms,
+            }
+            rows.append(row)
+            lbs = f" {row['lbs']}连板" if "lbs" in row else ""
+            print(f"入选[{self.name}]: {thscode}{lbs} 评分={row['scores']} 涨幅={row['bzf']}% "
+                  f"开盘涨幅={row['ozf']}% 涨速={row['chg_1min']}% 换手率={row['rates']}% 时间={hm}")
+
+        stats["passed"] += len(rows)
+        return rows
+
+    def mark_selected(self, rows: list[dict]):
+        for row in rows:
+            self.selected.add(row["stockid"])
+        if rows:
+            self.selected_mask |= np.isin(self.codes, [row["stockid"] for row in rows])
+        self.found += len(rows)
+
+    def due(self, tick) -> bool:
+        """本策略在该 tick 是否需要扫描（按自身间隔的墙钟边界，超时合并）"""
+        slot = int(tick.offset // self.interval)
+        if slot <= self._last_slot:
+            return False
+        self._last_slot = slot
+        self.loops += 1
+        return True
+
+    def result(self) -> dict:
+        return {"date": self.cdate, "interval": self.interval, "loops": self.loops, "found": self.found}
+
+
+class QuotePoller:
+    """共享行情轮询器：每轮对所有策略股票池的并集请求一次 THS_RQ
+
+    股票池按 batch_size 分批，各批通过有界线程池并发请求，结果合并为
+    一份快照后再交给策略筛选；每批耗时记录在 batch_latency 中，用于调整批大小。
+    已入选或永久不可能入选的股票由 set_active 移出请求列表，批次随之重建，
+    窗口越往后每轮请求的代码越少。
+    """
+
+    def __init__(
+        self,
+        source: QuoteSource,
+        codes: list[str],
+        batch_size: int = BATCH_SIZE,
+        max_workers: int = FETCH_WORKERS,
+    ):
+        self.source = source
+        self.codes = codes
+        self.index = {code: i for i, code in enumerate(codes)}
+        self.batch_size = batch_size
+        self.active = np.ones(len(codes), dtype=bool)
+        self.batches = self._split(codes)
+        # 每批耗时（秒）与代码数: batch_latency[批序号] = [每轮耗时...]
+        self.batch_latency: list[list[float]] = [[] for _ in self.batches]
+        self.batch_codes: list[list[int]] = [[] for _ in self.batches]
+        # 每轮实际请求的代码数
+        self.polled: list[int] = []
+        # 最近一轮耗时（毫秒）: fetch_ms 整轮墙钟 / ths_ms 最慢一批 THS_RQ / decode_ms 各批解析合计
+        self.last_timing = {"fetch_ms": 0.0, "ths_ms": 0.0, "decode_ms": 0.0}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(self.batches))),
+            thread_name_prefix="ths-rq",
+        )
+
+    def _split(self, codes: list[str]) -> list[list[str]]:
+        return [codes[i:i + self.batch_size] for i in range(0, len(codes), self.batch_size)]
+
+    def set_active(self, active: np.ndarray):
+        """设置需要请求的代码（与 self.codes 对齐的布尔掩码），有变化时重建批次"""
+        if np.array_equal(active, self.active):
+            return
+        self.active = active.copy()
+        self.batches = self._split([self.codes[i] for i in np.flatnonzero(active)])
+
+    def _fetch_batch(self, batch_no: int, batch: list[str]):
+        """返回 (代码列表, 列数据, THS 往返秒数, 解析秒数)"""
+        start = sys_time.perf_counter()
+        try:
+            data_result = self.source.rq(", ".join(batch), RQ_INDICATORS, "", "format:json")
+            received = sys_time.perf_counter()
+            if data_result.errorcode != 0:
+                print(f"THS_RQ 错误(第{batch_no + 1}批): {data_result.errmsg}")
+                return [], {}, received - start, 0.0
+            codes, values = thsjson.rq_columns(data_result.data, SNAPSHOT_COLUMNS)
+            return codes, values, received - start, sys_time.perf_counter() - received
+        finally:
+            self.batch_latency[batch_no].append(sys_time.perf_counter() - start)
+            self.batch_codes[batch_no].append(len(batch))
+
+    def fetch(self) -> Snapshot:
+        """并发拉取所有批次，按 self.codes 顺序合并为一份快照"""
+        snapshot = Snapshot(len(self.codes))
+        index = self.index
+        start = sys_time.perf_counter()
+        ths_s = decode_s = 0.0
+
+        self.polled.append(int(np.count_nonzero(self.active)))
+        futures = [self._executor.submit(self._fetch_batch, n, batch) for n, batch in enumerate(self.batches)]
+        for future in futures:
+            try:
+                codes, values, rq_s, parse_s = future.result()
+            except Exception as e:
+                print(f"THS_RQ 请求异常: {e}")
+                continue
+            ths_s = max(ths_s, rq_s)
+            decode_s += parse_s
+            if not codes:
+                continue
+            pos = np.array([index.get(code, -1) for code in codes], dtype=np.intp)
+            known = pos >= 0
+            pos = pos[known]
+            snapshot.present[pos] = True
+            for col in SNAPSHOT_COLUMNS:
+                # None 转为 NaN
+                snapshot.columns[col][pos] = np.array(values[col], dtype=float)[known]
+        self.last_timing = {
+            "fetch_ms": (sys_time.perf_counter() - start) * 1000,
+            "ths_ms": ths_s * 1000,
+            "decode_ms": decode_s * 1000,
+        }
+        return snapshot
+
+    def latency_summary(self) -> dict:
+        """各批耗时统计（毫秒），用于调整 BATCH_SIZE / FETCH_WORKERS"""
+        summary = {"batch_size": self.batch_size, "batches": []}
+        if self.polled:
+            summary["polled"] = {
+                "first": self.polled[0],
+                "last": self.polled[-1],
+                "avg": round(sum(self.polled) / len(self.polled), 1),
+            }
+        for n, samples in enumerate(self.batch_latency):
+            if not samples:
+                continue
+            arr = np.array(samples) * 1000
+            summary["batches"].append({
+                "batch": n + 1,
+                "rounds": len(samples),
+                "avg_codes": round(sum(self.batch_codes[n]) / len(samples), 1),
+                "avg_ms": round(float(arr.mean()), 1),
+                "max_ms": round(float(arr.max()), 1),
+            })
+        return summary
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def run_monitors(trading_day: str, db: Session, strategies: list[MonitorStrategy], bind=engine) -> dict:
+    """运行一个或多个实时监控策略（共享同一个行情轮询器）
+
+    Args:
+        trading_day: 交易日 YYYY-MM-DD 格式
+        db: SQLAlchemy Session（仅用于启动时加载股票池）
+        strategies: 监控策略实例列表
+        bind: 入选记录与 db_monitor_ticks 写入的数据库引擎，None 表示试运行（不写库）
+
+    Returns:
+        {策略名: 统计信息}
+    """
+    source = get_source()
+    if not source.available:
+        return {s.name: {"error": "iFinDPy not available"} for s in strategies}
+
+    results = {}
+    active = []
+    for strategy in strategies:
+        error = strategy.prepare(trading_day, db)
+        if error:
+            print(f"{strategy.label}: {error}")
+            results[strategy.name] = {"error": error}
+        else:
+            active.append(strategy)
+    if not active:
+        return results
+
+    # 股票池并集（保持首次出现的顺序）
+    codes = list(dict.fromkeys(code for s in active for code in s.stock_pool))
+    poller = QuotePoller(source, codes)
+    for strategy in active:
+        strategy.bind(poller.index)
+    print(f"行情轮询启动，策略: {[s.name for s in active]}，"
+          f"股票池并集: {len(codes)} 只({len(poller.batches)}批)")
+
+    # 所有策略共用一个 tick 时钟：间隔取各策略间隔的最大公约数，
+    # 各策略只在自身间隔的边界上扫描
+    ticker = TickScheduler(
+        interval=math.gcd(*[s.interval for s in active]),
+        start=WINDOW_START,
+        end=WINDOW_END,
+        now_fn=source.time,
+        sleep_fn=source.sleep,
+    )
+
+    # 逐 tick 指标：本地 logs/monitor_metrics_<cdate>.jsonl + 结束后写入 db_monitor_ticks
+    metrics = MonitorMetrics(active[0].cdate, ticker.interval, source=source.name)
+
+    # 入选记录交给后台线程批量写入，扫描循环不等待 Cloud SQL
+    writer = SelectionWriter(bind=bind)
+    # 每轮快照录制到 data/ticks/<cdate>.npz（回放时不录制，避免覆盖原始录制）
+    recorder = None
+    if get_settings().RECORD_TICKS and source.name != "replay":
+        recorder = SnapshotRecorder(active[0].cdate, codes)
+    # 只请求本轮到期策略仍可能入选的股票（关闭后每轮请求整个股票池）；
+    # 录制时未请求的代码在快照中 present 为 False，另每 RECORD_FULL_EVERY 轮请求一次完整股票池
+    prune = get_settings().MONITOR_PRUNE
+    full_every = get_settings().RECORD_FULL_EVERY if recorder else 0
+    polls = 0
+    try:
+        for tick in ticker:
+            due = [s for s in active if s.due(tick)]
+            if not due:
+                continue
+
+            hm = tick.at.strftime("%H%M")
+            ms = tick.at.strftime("%M:%S")
+            tick_ts = source.time()
+            tick_start = sys_time.perf_counter()
+
+            if prune and full_every and polls % full_every == 0:
+                poller.set_active(np.ones(len(codes), dtype=bool))
+            elif prune:
+                need = np.zeros(len(codes), dtype=bool)
+                for strategy in due:
+                    need[strategy.pending()] = True
+                poller.set_active(need)
+            snapshot = poller.fetch()
+            polls += 1
+            if recorder:
+                recorder.record(tick.at.timestamp(), snapshot)
+
+            screen_start = sys_time.perf_counter()
+            selected = 0
+            for strategy in due:
+                rows = strategy.screen(snapshot, hm, ms)
+                for row in rows:
+                    writer.put(strategy.Model, row)
+                strategy.mark_selected(rows)
+                selected += len(rows)
+            screen_ms = (sys_time.perf_counter() - screen_start) * 1000
+
+            writer.flush()
+            timing = poller.last_timing
+            metrics.record(
+                tick,
+                ts=tick_ts,
+                tick_ms=(sys_time.perf_counter() - tick_start) * 1000,
+                ths_ms=timing["ths_ms"],
+                decode_ms=timing["decode_ms"],
+                screen_ms=screen_ms,
+                # 入库在后台线程进行，这里记录上一轮 flush 以来完成的写入耗时
+                db_ms=writer.take_write_ms(),
+                pool=len(codes),
+                polled=poller.polled[-1],
+                selected=selected,
+            )
+
+            if tick.skipped:
+                print(f"第{ticker.ticks}轮超时，合并跳过 {tick.skipped} 个 tick（滞后 {round(tick.lag, 2)}s）")
+            if ticker.ticks % 30 == 0:
+                print(f"第{ticker.ticks}轮 请求代码 {poller.polled[-1]}/{len(codes)} 只")
+                for strategy in active:
+                    print(f"[{strategy.name}] 第{strategy.loops}轮 过滤统计: {strategy.filter_stats}")
+    finally:
+        poller.close()
+        # 正常结束或中断时都排空写入队列
+        write_stats = writer.close()
+        record_stats = recorder.close() if recorder else None
+        metrics_summary = metrics.close(bind)
+
+    for strategy in active:
+        print(f"{strategy.label}监控结束，共 {strategy.loops} 轮，入选 {strategy.found} 只")
+        print(f"[{strategy.name}] 最终过滤统计: {strategy.filter_stats}")
+        results[strategy.name] = strategy.result()
+    print(f"入选写入统计: {write_stats}")
+    results["writer"] = write_stats
+    if record_stats:
+        print(f"行情快照已录制: {record_stats}")
+        results["recorder"] = record_stats
+    tick_stats = ticker.summary()
+    print(f"tick 统计: {tick_stats}")
+    results["ticks"] = tick_stats
+    print(f"逐 tick 指标汇总（{metrics.path}）: {metrics_summary}")
+    results["metrics"] = metrics_summary
+    latency = poller.latency_summary()
+    print(f"THS_RQ 分批耗时: {latency}")
+    results["fetch_latency"] = latency
+    return results
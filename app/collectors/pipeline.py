@@ -0,0 +1,153 @@
+# coding:utf-8
+"""按依赖关系执行的采集流水线（DAG）
+
+每个节点声明上游依赖和最早开始时间，调度规则:
+  - 上游全部成功、after 中的节点全部结束、且已到 not_before 的节点立即开始，
+    互不依赖的节点并发执行
+  - 上游（deps）失败的节点不执行（记为 skipped），其余分支照常继续；
+    after 只决定先后顺序，其中的节点失败不影响本节点
+  - 全部节点结束即返回，不再等待下一个固定时间点
+
+收盘后流水线（见 scheduler.after_close_pipeline，虚线为 after）:
+
+    stat  (15:05) ────→ thsdata
+    bars  (15:05) ┄┄┄┄→ thsdata（bars 失败时 thsdata 自行取日线）
+    close (15:05)
+
+用法:
+    pipeline = Pipeline([
+        Node("bars", lambda db: collect_bars(day, db), not_before=1505),
+        Node("stat", lambda db: collect_stat(cdate, db), not_before=1505),
+        Node("thsdata", lambda db: collect_ztdb(day, db), deps=("stat",), after=("bars",)),
+    ])
+    status = pipeline.run(run_task)   # {"bars": "ok", "stat": "ok", "thsdata": "ok"}
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable
+
+# 节点状态
+OK = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+@dataclass
+class Node:
+    """流水线节点
+
+    Args:
+        name: 任务名
+        fn: 任务函数 fn(db) -> 结果
+        deps: 上游节点名，全部成功后才开始
+        not_before: 最早开始时间 HHMM（如 1505），None 表示不限
+        after: 只排序的上游节点名，全部结束（无论成败）后才开始
+    """
+    name: str
+    fn: Callable
+    deps: tuple[str, ...] = field(default_factory=tuple)
+    not_before: int | None = None
+    after: tuple[str, ...] = field(default_factory=tuple)
+
+
+def _hm() -> int:
+    now = datetime.now()
+    return now.hour * 100 + now.minute
+
+
+class Pipeline:
+    """DAG 执行器
+
+    Args:
+        nodes: 节点列表（名称唯一，依赖须在列表中，不能成环）
+        max_workers: 最大并发节点数
+    """
+
+    def __init__(self, nodes: list[Node], max_workers: int = 4):
+        self.nodes = {node.name: node for node in nodes}
+        self.max_workers = max_workers
+        for node in nodes:
+            unknown = [dep for dep in (*node.deps, *node.after) if dep not in self.nodes]
+            if unknown:
+                raise ValueError(f"节点 {node.name} 的依赖不存在: {', '.join(unknown)}")
+        self.order()
+
+    def order(self) -> list[str]:
+        """拓扑序（检查环）"""
+        done, out = set(), []
+        pending = list(self.nodes)
+        while pending:
+            ready = [
+                name for name in pending
+                if all(dep in done for dep in (*self.nodes[name].deps, *self.nodes[name].after))
+            ]
+            if not ready:
+                raise ValueError(f"依赖成环: {', '.join(pending)}")
+            for name in ready:
+                pending.remove(name)
+                done.add(name)
+                out.append(name)
+        return out
+
+    def run(
+        self,
+        runner: Callable[[str, Callable], bool],
+        ignore_times: bool = False,
+        clock: Callable[[], int] = _hm,
+        poll: float = 15,
+        log: Callable[[str], None] = print,
+    ) -> dict[str, str]:
+        """执行全部节点，返回 {节点名: ok / failed / skipped}
+
+        Args:
+            runner: runner(name, fn) -> 是否成功（scheduler.run_task，负责会话与日志）
+            ignore_times: 忽略 not_before（--now 立即补采）
+            clock: 当前时间 HHMM
+            poll: 等待 not_before 时的检查间隔（秒）
+        """
+        status: dict[str, str] = {}
+        running = {}
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline") as pool:
+            while len(status) < len(self.nodes):
+                hm = clock()
+                skipped = False
+                for name, node in self.nodes.items():
+                    if name in status or name in running.values():
+                        continue
+                    failed_deps = [dep for dep in node.deps if status.get(dep) in (FAILED, SKIPPED)]
+                    if failed_deps:
+                        status[name] = SKIPPED
+                        log(f"{name} 跳过（上游未成功: {', '.join(failed_deps)}）")
+                        skipped = True
+                        continue
+                    if any(status.get(dep) != OK for dep in node.deps):
+                        continue
+                    if any(dep not in status for dep in node.after):
+                        continue
+                    if not ignore_times and node.not_before is not None and hm < node.not_before:
+                        continue
+                    running[pool.submit(runner, name, node.fn)] = name
+
+                if len(status) == len(self.nodes):
+                    break
+                if not running:
+                    # 跳过的节点可能让下游也需跳过；否则只剩等待 not_before 的节点
+                    if not skipped:
+                        time.sleep(poll)
+                    continue
+
+                finished, _ = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        status[name] = OK if future.result() else FAILED
+                    except Exception as e:
+                        log(f"{name} 异常: {e}")
+                        status[name] = FAILED
+
+        log(f"流水线结束，耗时 {time.perf_counter() - started:.1f}s: {status}")
+        return status
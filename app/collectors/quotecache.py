@@ -0,0 +1,243 @@
+# coding:utf-8
+"""THS 历史查询的本地磁盘缓存
+
+CachedQuoteSource 包装实盘数据源，THS_HQ / THS_DR / THS_WCQuery 的成功结果按
+sha256(函数名 + 参数) 存到 data/thscache/<前两位>/<key>.pkl（pickle）:
+  - 查询日期早于今天且结果非空: 收盘数据不再变化，永不过期
+  - 查询日期为今天、无法识别或结果为空（数据可能尚未就绪）: 缓存 THS_CACHE_TTL 秒
+  - THS_RQ 是实时行情，不缓存
+缓存总大小超过 THS_CACHE_MAX_MB 时按最近访问时间淘汰（LRU，读命中会刷新访问时间）。
+
+重跑 stat / thsdata / 大额成交补采、批量 backfill 时，同一日期的查询只请求一次 THS。
+
+用法:
+  python -m app.collectors.quotecache            查看缓存条目数与大小
+  python -m app.collectors.quotecache --clear    清空缓存
+"""
+import hashlib
+import os
+import pickle
+import re
+import sys
+import threading
+import time as sys_time
+from datetime import datetime
+
+from app.collectors import thsjson
+from app.collectors.quotes import QuoteResult, QuoteSource
+
+CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "thscache"
+)
+
+# 参数中的日期: 20250214 / 2025-02-14
+_DATE_RE = re.compile(r"(?<!\d)(\d{4})-?(\d{2})-?(\d{2})(?!\d)")
+
+
+def query_date(*args) -> str | None:
+    """从查询参数中取数据日期 YYYYMMDD（取最后出现的日期，如 THS_HQ 的结束日期）"""
+    found = None
+    for arg in args:
+        for match in _DATE_RE.finditer(str(arg)):
+            found = "".join(match.groups())
+    return found
+
+
+def has_data(data) -> bool:
+    """结果是否非空: DataFrame 有行；JSON 返回至少一张表有值；其余为非空 bytes / str"""
+    if data is None:
+        return False
+    if hasattr(data, "empty"):
+        return not data.empty
+    if isinstance(data, (bytes, bytearray, str)):
+        if not data.strip():
+            return False
+        try:
+            parsed = thsjson.loads(data)
+        except ValueError:
+            return True
+        if not isinstance(parsed, dict) or "tables" not in parsed:
+            return bool(parsed)
+        return any(
+            any(len(values) for values in (item.get("table") or {}).values())
+            for item in parsed["tables"] or ()
+        )
+    return bool(data)
+
+
+def cache_key(func: str, *args) -> str:
+    """内容寻址键: sha256(函数名 + 参数)"""
+    payload = repr((func, [";".join(a) if isinstance(a, (list, tuple)) else a for a in args]))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QuoteCache:
+    """磁盘缓存（线程安全）
+
+    Args:
+        directory: 缓存目录
+        max_bytes: 总大小上限，超出按访问时间淘汰
+        ttl: 当日数据的有效期（秒）
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = 512 * 1024 * 1024, ttl: float = 300):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size: int | None = None  # 首次写入时扫描目录
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".pkl")
+
+    def get(self, key: str):
+        """命中返回缓存的结果，未命中 / 已过期返回 None"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                created, permanent, result = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        if not permanent and sys_time.time() - created > self.ttl:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # 刷新访问时间（LRU）
+        except OSError:
+            pass
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result, permanent: bool):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((sys_time.time(), permanent, result), f, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            old = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp, path)
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += os.path.getsize(path) - old
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """[(访问时间, 大小, 路径)]"""
+        out = []
+        if not os.path.isdir(self.directory):
+            return out
+        for sub in os.listdir(self.directory):
+            folder = os.path.join(self.directory, sub)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if not name.endswith(".pkl"):
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                out.append((st.st_mtime, st.st_size, path))
+        return out
+
+    def _evict(self):
+        """按访问时间从旧到新删除，直到总大小降到上限的 90%"""
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+                self._size -= size
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        return {
+            "directory": self.directory,
+            "entries": len(entries),
+            "size_mb": round(sum(size for _, size, _ in entries) / 1024 / 1024, 2),
+            "max_mb": round(self.max_bytes / 1024 / 1024),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def clear(self) -> int:
+        with self._lock:
+            entries = self._entries()
+            for _, _, path in entries:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size = 0
+        return len(entries)
+
+
+class CachedQuoteSource(QuoteSource):
+    """在数据源前加磁盘缓存（THS_RQ 直通）"""
+
+    def __init__(self, source: QuoteSource, cache: QuoteCache):
+        self.source = source
+        self.cache = cache
+        self.name = source.name
+        self.available = source.available
+
+    def _cached(self, func: str, call, *args):
+        key = cache_key(func, *args)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+        result = call(*args)
+        if result.errorcode == 0:
+            date = query_date(*args)
+            permanent = date is not None and date < datetime.today().strftime("%Y%m%d") and has_data(result.data)
+            self.cache.put(key, QuoteResult(result.errorcode, result.errmsg, result.data), permanent)
+        return result
+
+    def rq(self, codes, indicators, params="", fmt="format:json"):
+        return self.source.rq(codes, indicators, params, fmt)
+
+    def hq(self, codes, indicators, params, start, end, fmt="format:json"):
+        return self._cached("hq", self.source.hq, codes, indicators, params, start, end, fmt)
+
+    def dr(self, report, params, fields):
+        return self._cached("dr", self.source.dr, report, params, fields)
+
+    def wcquery(self, query, domain="stock", fmt="format:json"):
+        return self._cached("wcquery", self.source.wcquery, query, domain, fmt)
+
+    def time(self) -> float:
+        return self.source.time()
+
+    def sleep(self, seconds: float):
+        self.source.sleep(seconds)
+
+
+def default_cache() -> QuoteCache:
+    from app.config import get_settings
+
+    settings = get_settings()
+    return QuoteCache(
+        settings.THS_CACHE_DIR or CACHE_DIR,
+        max_bytes=settings.THS_CACHE_MAX_MB * 1024 * 1024,
+        ttl=settings.THS_CACHE_TTL,
+    )
+
+
+if __name__ == "__main__":
+    cache = default_cache()
+    if "--clear" in sys.argv:
+        print(f"已清除 {cache.clear()} 条缓存")
+    else:
+        print(cache.stats())
@@ -0,0 +1,151 @@
+# coding:utf-8
+"""行情数据源接口
+
+采集脚本不再直接 import iFinDPy，而是通过 get_source() 取得当前数据源:
+  IFinDSource  — 实盘，调用 iFinDPy 的 THS_RQ / THS_HQ / THS_DR / THS_WCQuery
+  ReplaySource — 回放，读取录制的 THS_RQ 快照，按实际或加速时间提供行情
+                 （见 app/collectors/replay.py，可在 Linux 上离线压测监控）
+
+数据源同时提供时钟（time/sleep），盘中监控的 tick 调度走数据源时钟，
+回放时即可按录制当天的 9:30-9:46 加速运行。
+
+CachedQuoteSource（app/collectors/quotecache.py）缓存 THS_HQ / THS_DR / THS_WCQuery 的结果，
+RateLimitedSource 可包装任一数据源，限制所有线程合计的请求频率（历史补采并发时使用）。
+
+返回值与 iFinDPy 一致: 具有 errorcode / errmsg / data 属性的结果对象。
+"""
+import threading
+import time as sys_time
+
+try:
+    from iFinDPy import THS_DR, THS_HQ, THS_RQ, THS_WCQuery
+except ImportError:
+    THS_DR = None
+    THS_HQ = None
+    THS_RQ = None
+    THS_WCQuery = None
+
+
+class QuoteResult:
+    """与 iFinDPy 返回值结构相同的结果对象"""
+
+    def __init__(self, errorcode: int = 0, errmsg: str = "", data=None):
+        self.errorcode = errorcode
+        self.errmsg = errmsg
+        self.data = data
+
+
+class QuoteSource:
+    """行情数据源基类"""
+
+    name = ""
+    available = True
+
+    def rq(self, codes, indicators: str, params: str = "", fmt: str = "format:json"):
+        """实时行情（THS_RQ）"""
+        raise NotImplementedError
+
+    def hq(self, codes, indicators: str, params: str, start: str, end: str, fmt: str = "format:json"):
+        """历史行情（THS_HQ）"""
+        raise NotImplementedError
+
+    def dr(self, report: str, params: str, fields: str):
+        """专题报表（THS_DR），data 为 DataFrame"""
+        raise NotImplementedError
+
+    def wcquery(self, query: str, domain: str = "stock", fmt: str = "format:json"):
+        """问财查询（THS_WCQuery）"""
+        raise NotImplementedError
+
+    def time(self) -> float:
+        """当前时间（epoch 秒）"""
+        return sys_time.time()
+
+    def sleep(self, seconds: float):
+        sys_time.sleep(seconds)
+
+
+class IFinDSource(QuoteSource):
+    """实盘数据源：直接调用 iFinDPy"""
+
+    name = "ifind"
+    available = THS_RQ is not None
+
+    def rq(self, codes, indicators, params="", fmt="format:json"):
+        return THS_RQ(codes, indicators, params, fmt)
+
+    def hq(self, codes, indicators, params, start, end, fmt="format:json"):
+        return THS_HQ(codes, indicators, params, start, end, fmt)
+
+    def dr(self, report, params, fields):
+        return THS_DR(report, params, fields)
+
+    def wcquery(self, query, domain="stock", fmt="format:json"):
+        return THS_WCQuery(query, domain, fmt)
+
+
+class RateLimitedSource(QuoteSource):
+    """限速包装：所有线程合计每秒最多 rate 次 THS 请求（批量补采并发时避免触发接口限流）
+
+    请求按固定间隔 1/rate 依次放行，超出的调用方阻塞等待。
+    """
+
+    def __init__(self, source: QuoteSource, rate: float):
+        self.source = source
+        self.name = source.name
+        self.available = source.available
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def _acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = sys_time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            sys_time.sleep(start - now)
+
+    def rq(self, codes, indicators, params="", fmt="format:json"):
+        self._acquire()
+        return self.source.rq(codes, indicators, params, fmt)
+
+    def hq(self, codes, indicators, params, start, end, fmt="format:json"):
+        self._acquire()
+        return self.source.hq(codes, indicators, params, start, end, fmt)
+
+    def dr(self, report, params, fields):
+        self._acquire()
+        return self.source.dr(report, params, fields)
+
+    def wcquery(self, query, domain="stock", fmt="format:json"):
+        self._acquire()
+        return self.source.wcquery(query, domain, fmt)
+
+    def time(self) -> float:
+        return self.source.time()
+
+    def sleep(self, seconds: float):
+        self.source.sleep(seconds)
+
+
+_source: QuoteSource | None = None
+
+
+def get_source() -> QuoteSource:
+    """当前进程使用的行情数据源（默认实盘 iFinDPy，历史查询经本地磁盘缓存）"""
+    global _source
+    if _source is None:
+        from app.collectors.quotecache import CachedQuoteSource, default_cache
+
+        cache = default_cache()
+        _source = CachedQuoteSource(IFinDSource(), cache) if cache.max_bytes > 0 else IFinDSource()
+    return _source
+
+
+def set_source(source: QuoteSource):
+    """替换行情数据源（回放压测 / 离线测试）"""
+    global _source
+    _source = source
@@ -0,0 +1,244 @@
+# coding:utf-8
+"""盘中行情快照录制（9:30-9:46 每个 tick 的 THS_RQ 快照）
+
+监控循环每轮把快照交给 SnapshotRecorder（仅入队，不做 IO），后台线程
+按交易日写入压缩的列式文件 data/ticks/<cdate>.npz，格式与回放文件相同:
+  ts        (T,)   每个 tick 的边界时间（epoch 秒）
+  codes     (N,)   股票代码
+  present   (T, N) 该 tick THS 是否返回了该代码
+  <指标名>  (T, N) float64，缺失为 NaN
+
+即按 (tick 时间, 股票代码) 二维索引。录制文件可直接交给回放数据源重放，
+也可用 load_day 内存映射后按新阈值重新筛选历史 tick。
+
+录制过程中每 checkpoint_every 个 tick 只把新增部分写入 <cdate>.part<序号>.npz，
+结束时一次合并为 <cdate>.npz 并删除分段文件，检查点耗时不随录制时长增长。
+中途崩溃留下的分段文件在下次录制（监控重启）时并入。
+
+用法:
+    day = load_day("20250214")
+    day["latest"][:, day.index["600000.SH"]]     # 单只股票的 tick 序列
+    day.frame(k)                                 # 第 k 个 tick 的全部列
+"""
+import os
+import queue
+import re
+import threading
+
+import numpy as np
+
+TICKS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "ticks"
+)
+
+
+def day_path(cdate: str, directory: str = TICKS_DIR) -> str:
+    return os.path.join(directory, f"{cdate}.npz")
+
+
+def part_paths(cdate: str, directory: str = TICKS_DIR) -> list[str]:
+    """当日检查点分段文件，按序号升序"""
+    if not os.path.isdir(directory):
+        return []
+    pattern = re.compile(rf"^{cdate}\.part(\d+)\.npz$")
+    parts = sorted(
+        (int(m.group(1)), name) for name in os.listdir(directory) if (m := pattern.match(name))
+    )
+    return [os.path.join(directory, name) for _, name in parts]
+
+
+class SnapshotRecorder:
+    """后台线程录制行情快照
+
+    Args:
+        cdate: 交易日 YYYYMMDD
+        codes: 快照列对应的股票代码（QuotePoller.codes）
+        directory: 输出目录
+        checkpoint_every: 每录制多少个 tick 写一个分段文件（中途崩溃最多丢失这么多 tick）
+    """
+
+    def __init__(self, cdate: str, codes: list[str], directory: str = TICKS_DIR, checkpoint_every: int = 100):
+        self.cdate = cdate
+        self.codes = list(codes)
+        self.directory = directory
+        self.path = day_path(cdate, directory)
+        self.checkpoint_every = checkpoint_every
+        self.recorded = 0
+        self._ts: list[float] = []
+        self._present: list[np.ndarray] = []
+        self._columns: dict[str, list[np.ndarray]] = {}
+        os.makedirs(directory, exist_ok=True)
+        # 当日已有录制（监控重启）与上次崩溃留下的分段: 结束时与本次录制合并
+        self._base = load_arrays(self.path) if os.path.exists(self.path) else None
+        self._parts = part_paths(cdate, directory)
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="snapshot-recorder", daemon=True)
+        self._thread.start()
+
+    def record(self, ts: float, snapshot):
+        """入队一轮快照（非阻塞；快照每轮新建，不会再被修改，无需复制）"""
+        self._queue.put((ts, snapshot))
+
+    def close(self, timeout: float | None = 60) -> dict:
+        """写完剩余快照并返回 {"path", "ticks", "codes"}"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+        return {"path": self.path, "ticks": self.recorded, "codes": len(self.codes)}
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._save()
+                return
+            ts, snapshot = item
+            self._ts.append(ts)
+            self._present.append(snapshot.present)
+            for col, arr in snapshot.columns.items():
+                self._columns.setdefault(col, []).append(arr)
+            self.recorded += 1
+            if self.recorded % self.checkpoint_every == 0:
+                self._checkpoint()
+
+    def _take_chunk(self) -> dict | None:
+        """取出上次检查点以来的快照并清空缓冲"""
+        if not self._ts:
+            return None
+        chunk = {
+            "ts": np.array(self._ts),
+            "codes": np.array(self.codes),
+            "present": np.vstack(self._present),
+            **{col: np.vstack(arrs) for col, arrs in self._columns.items()},
+        }
+        self._ts, self._present, self._columns = [], [], {}
+        return chunk
+
+    def _checkpoint(self):
+        """只把新增的 tick 写入下一个分段文件"""
+        chunk = self._take_chunk()
+        if chunk is None:
+            return
+        last = re.search(r"\.part(\d+)\.npz$", self._parts[-1]) if self._parts else None
+        path = os.path.join(self.directory, f"{self.cdate}.part{int(last.group(1)) + 1 if last else 0}.npz")
+        try:
+            _write(path, chunk)
+            self._parts.append(path)
+        except OSError as e:
+            # 写入失败的 tick 放回缓冲，结束时随最终文件写入
+            print(f"行情快照分段写入失败 {path}: {e}")
+            self._restore(chunk)
+
+    def _restore(self, chunk: dict):
+        self._ts = [*chunk["ts"].tolist(), *self._ts]
+        self._present = [chunk["present"], *self._present]
+        for col in chunk:
+            if col not in ("ts", "codes", "present"):
+                self._columns[col] = [chunk[col], *self._columns.get(col, [])]
+
+    def _save(self):
+        """合并已有录制、各分段与剩余快照为当日文件，成功后删除分段"""
+        data = self._base
+        for path in self._parts:
+            part = load_arrays(path)
+            data = part if data is None else _merge(data, part)
+        chunk = self._take_chunk()
+        if chunk is not None:
+            data = chunk if data is None else _merge(data, chunk)
+        if data is None or (data is self._base and not self._parts):
+            return
+        try:
+            _write(self.path, data)
+        except OSError as e:
+            print(f"行情快照写入失败 {self.path}: {e}")
+            return
+        for path in self._parts:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _write(path: str, data: dict):
+    """先写临时文件再替换，避免中途中断留下损坏的文件"""
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, **data)
+    os.replace(tmp, path)
+
+
+def _merge(base: dict, new: dict) -> dict:
+    """按 (ts, 代码) 合并两段录制，代码取并集，缺失处为 NaN / False"""
+    codes = list(dict.fromkeys([*map(str, base["codes"]), *map(str, new["codes"])]))
+    index = {code: i for i, code in enumerate(codes)}
+    ts = np.concatenate([base["ts"], new["ts"]])
+    order = np.argsort(ts, kind="stable")
+
+    merged = {"ts": ts[order], "codes": np.array(codes)}
+    for col in dict.fromkeys(k for part in (base, new) for k in part if k not in ("ts", "codes")):
+        fill = False if col == "present" else np.nan
+        parts = []
+        for part in (base, new):
+            T = len(part["ts"])
+            out = np.full((T, len(codes)), fill, dtype=bool if col == "present" else float)
+            if col in part:
+                out[:, [index[str(c)] for c in part["codes"]]] = part[col]
+            parts.append(out)
+        merged[col] = np.vstack(parts)[order]
+    return merged
+
+
+def load_arrays(path: str) -> dict:
+    """读取整个 npz 到内存"""
+    with np.load(path, allow_pickle=False) as npz:
+        return {name: npz[name] for name in npz.files}
+
+
+class TickDay:
+    """一天的录制快照（各列为内存映射的 (T, N) 数组）"""
+
+    def __init__(self, cdate: str, arrays: dict):
+        self.cdate = cdate
+        self.ts = arrays["ts"]
+        self.codes = [str(c) for c in arrays["codes"]]
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.present = arrays.get("present")
+        self.columns = {col: arr for col, arr in arrays.items() if col not in ("ts", "codes", "present")}
+
+    def __getitem__(self, col: str) -> np.ndarray:
+        return self.columns[col]
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def frame(self, k: int) -> dict[str, np.ndarray]:
+        """第 k 个 tick 的全部列"""
+        return {col: arr[k] for col, arr in self.columns.items()}
+
+
+def load_day(cdate: str, directory: str = TICKS_DIR) -> TickDay:
+    """内存映射加载一天的录制快照
+
+    压缩的 npz 无法直接映射，首次加载时解压为 data/ticks/<cdate>/<列>.npy，
+    之后（npz 未更新时）直接 np.load(mmap_mode="r")，只读取实际访问到的部分。
+    """
+    path = day_path(cdate, directory)
+    cache = os.path.join(directory, cdate)
+    stamp = os.path.join(cache, ".mtime")
+    mtime = str(os.path.getmtime(path))
+
+    fresh = os.path.exists(stamp)
+    if fresh:
+        with open(stamp) as f:
+            fresh = f.read() == mtime
+    if not fresh:
+        os.makedirs(cache, exist_ok=True)
+        with np.load(path, allow_pickle=False) as npz:
+            for name in npz.files:
+                np.save(os.path.join(cache, f"{name}.npy"), npz[name])
+        with open(stamp, "w") as f:
+            f.write(mtime)
+
+    arrays = {
+        name[:-4]: np.load(os.path.join(cache, name), mmap_mode="r", allow_pickle=False)
+        for name in os.listdir(cache) if name.endswith(".npy")
+    }
+    return TickDay(cdate, arrays)
@@ -0,0 +1,281 @@
+# coding:utf-8
+"""录制行情回放数据源 + 离线压测CLI
+
+回放文件为 npz（列式，T 个 tick × N 只股票）:
+  ts        (T,)   每个 tick 的 epoch 秒
+  codes     (N,)   股票代码
+  present   (T, N) 可选，该 tick 是否有该代码的行情（盘中录制文件带有此列）
+  <指标名>  (T, N) float64，缺失为 NaN（latest/open/preClose/upperLimit/amount/chg_1min/changeRatio）
+
+ReplaySource 按虚拟时钟返回 "当前时刻" 最近一个已录制 tick 的行情:
+  speed=1   按实际时间回放
+  speed=10  10 倍速
+  speed=0   不等待，sleep 直接推进虚拟时钟（测吞吐）
+
+回放默认试运行: 入选记录与逐 tick 指标不写库，股票池从 DATABASE_URL 只读加载。
+写库（--write）与写入模拟股票池（--seed-pool）只允许指向单独的回放库
+（--db-url= 或 REPLAY_DATABASE_URL，不能与 DATABASE_URL 相同），此时股票池也从回放库读取。
+
+用法:
+  python -m app.collectors.replay synth 2025-02-14                       生成 5000 只股票的模拟行情
+  python -m app.collectors.replay synth 2025-02-14 --stocks=5500 --seed-pool --db-url=mysql+pymysql://.../replay
+  python -m app.collectors.replay run data/replay/20250214.npz            回放并运行三个监控策略（试运行）
+  python -m app.collectors.replay run data/replay/20250214.npz --speed=10 --strategies=mighty
+  python -m app.collectors.replay run data/ticks/20250214.npz --speed=0         回放盘中录制的快照
+  python -m app.collectors.replay run data/replay/20250214.npz --write    入选与指标写入 REPLAY_DATABASE_URL
+"""
+import bisect
+import json
+import os
+import sys
+import time as sys_time
+from datetime import datetime, time as dt_time
+
+import numpy as np
+
+from app.collectors.quotes import QuoteResult, QuoteSource
+
+# 回放文件中的数值列
+REPLAY_COLUMNS = ("latest", "open", "preClose", "upperLimit", "amount", "chg_1min", "changeRatio")
+
+REPLAY_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "replay"
+)
+
+
+class ReplaySource(QuoteSource):
+    """录制行情回放数据源（仅支持 THS_RQ）
+
+    Args:
+        ts: (T,) 各 tick 的 epoch 秒，升序
+        codes: (N,) 股票代码
+        columns: {指标名: (T, N) 数组}
+        speed: 回放倍速，0 表示不等待
+    """
+
+    name = "replay"
+    available = True
+
+    def __init__(self, ts, codes, columns: dict, speed: float = 1.0, present=None):
+        self.ts = [float(t) for t in ts]
+        self.codes = [str(c) for c in codes]
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.columns = columns
+        self.present = present
+        self.speed = speed
+        # 虚拟时钟从第一个 tick 前 1 秒开始
+        self._t0 = self.ts[0] - 1 if self.ts else 0.0
+        self._offset = 0.0
+        self._wall0 = sys_time.perf_counter()
+
+    @classmethod
+    def from_file(cls, path: str, speed: float = 1.0) -> "ReplaySource":
+        with np.load(path, allow_pickle=False) as npz:
+            columns = {col: npz[col] for col in REPLAY_COLUMNS if col in npz.files}
+            present = npz["present"] if "present" in npz.files else None
+            return cls(npz["ts"], npz["codes"], columns, speed=speed, present=present)
+
+    @property
+    def trading_day(self) -> str:
+        """录制数据所属交易日 YYYY-MM-DD"""
+        return datetime.fromtimestamp(self.ts[0]).strftime("%Y-%m-%d")
+
+    def time(self) -> float:
+        elapsed = (sys_time.perf_counter() - self._wall0) * self.speed if self.speed > 0 else 0.0
+        return self._t0 + self._offset + elapsed
+
+    def sleep(self, seconds: float):
+        if seconds <= 0:
+            return
+        if self.speed > 0:
+            sys_time.sleep(seconds / self.speed)
+        else:
+            self._offset += seconds
+
+    def rq(self, codes, indicators, params="", fmt="format:json"):
+        k = bisect.bisect_right(self.ts, self.time()) - 1
+        if k < 0:
+            return QuoteResult(-1, "回放时间早于第一个录制 tick")
+
+        if isinstance(codes, str):
+            codes = [c.strip() for c in codes.split(",")]
+        fields = [f for f in indicators.split(";") if f]
+
+        tables = []
+        for code in codes:
+            i = self.index.get(code)
+            if i is None or (self.present is not None and not self.present[k, i]):
+                continue
+            table = {}
+            for field in fields:
+                arr = self.columns.get(field)
+                if arr is None:
+                    # 未录制的文本列（如 tradeStatus）
+                    table[field] = ["交易"]
+                    continue
+                value = arr[k, i]
+                table[field] = [None if np.isnan(value) else float(value)]
+            tables.append({"thscode": code, "table": table})
+
+        data = json.dumps({"tables": tables}, ensure_ascii=False).encode("gb18030")
+        return QuoteResult(0, "", data)
+
+    def hq(self, codes, indicators, params, start, end, fmt="format:json"):
+        return QuoteResult(-1, "回放数据源不支持 THS_HQ")
+
+    def dr(self, report, params, fields):
+        return QuoteResult(-1, "回放数据源不支持 THS_DR")
+
+    def wcquery(self, query, domain="stock", fmt="format:json"):
+        return QuoteResult(-1, "回放数据源不支持 THS_WCQuery")
+
+
+def synthesize_day(trading_day: str, n_stocks: int = 5000, interval: int = 3, seed: int = 0) -> dict:
+    """生成一天 9:30-9:46 的模拟全市场行情（随机游走）
+
+    Returns:
+        {"ts": (T,), "codes": (N,), <指标名>: (T, N)}
+    """
+    rng = np.random.default_rng(seed)
+    day = datetime.strptime(trading_day, "%Y-%m-%d").date()
+    start = datetime.combine(day, dt_time(9, 30)).timestamp()
+    end = datetime.combine(day, dt_time(9, 46)).timestamp()
+    ts = np.arange(start, end + 0.001, interval)
+    T, N = len(ts), n_stocks
+
+    # 按板块前缀生成唯一代码: 60/68 → .SH，00/30 → .SZ
+    boards = rng.choice(["60", "00", "30", "68"], N, p=[0.35, 0.3, 0.25, 0.1])
+    serial: dict[str, int] = {}
+    codes = []
+    for board in boards:
+        n = serial.get(board, 0)
+        serial[board] = n + 1
+        codes.append(f"{board}{n:04d}" + (".SH" if board in ("60", "68") else ".SZ"))
+    codes = np.array(codes)
+
+    pre_close = np.round(rng.uniform(3, 80, N), 2)
+    is_20cm = np.isin(boards, ["30", "68"])
+    upper = np.round(pre_close * np.where(is_20cm, 1.2, 1.1), 2)
+    open_price = np.round(pre_close * (1 + rng.normal(0.005, 0.02, N)), 2)
+
+    steps = rng.normal(0.0002, 0.004, (T, N))
+    latest = np.round(open_price * np.exp(np.cumsum(steps, axis=0)), 2)
+    latest = np.minimum(latest, upper)
+    change_ratio = (latest / pre_close - 1) * 100
+    # 近 20 个 tick（约 1 分钟）涨速
+    lagged = np.vstack([np.repeat(open_price[None, :], 20, axis=0), latest[:-20]])
+    chg_1min = (latest / lagged - 1) * 100
+    amount = np.cumsum(rng.uniform(0, 2e6, (T, N)) * (1 + np.abs(steps) * 200), axis=0)
+
+    columns = {
+        "latest": latest,
+        "open": np.broadcast_to(open_price, (T, N)).copy(),
+        "preClose": np.broadcast_to(pre_close, (T, N)).copy(),
+        "upperLimit": np.broadcast_to(upper, (T, N)).copy(),
+        "amount": amount,
+        "chg_1min": chg_1min,
+        "changeRatio": change_ratio,
+    }
+    return {"ts": ts, "codes": codes, **columns}
+
+
+def replay_engine(url: str | None = None):
+    """回放库引擎（url 默认取 REPLAY_DATABASE_URL），未配置返回 None
+
+    与 DATABASE_URL 相同时报错，回放不会写入生产表。
+    """
+    from sqlalchemy import create_engine
+
+    from app.config import get_settings
+
+    settings = get_settings()
+    url = url or settings.REPLAY_DATABASE_URL
+    if not url:
+        return None
+    if url == settings.DATABASE_URL:
+        raise ValueError("回放库不能与 DATABASE_URL 相同")
+    return create_engine(url, pool_pre_ping=True)
+
+
+def _seed_pool(trading_day: str, codes, amounts, bind):
+    """为模拟行情写入回放库中前一交易日的 db_large_amount 股票池（全市场）"""
+    from sqlalchemy.orm import Session
+
+    from app.collectors import func
+    from app.collectors.bulk import upsert_rows
+    from app.features.mighty.models import LargeAmount
+
+    lsdate = func.get_previous_trading_day(trading_day).replace("-", "")
+    db = Session(bind=bind)
+    try:
+        if db.query(LargeAmount).filter(LargeAmount.cdate == lsdate).count():
+            print(f"db_large_amount 已有 {lsdate} 数据，跳过写入")
+            return
+        upsert_rows(db, LargeAmount, [
+            {"cdate": lsdate, "stockid": str(code), "amount": float(amount)} for code, amount in zip(codes, amounts)
+        ])
+        db.commit()
+        print(f"已写入 {lsdate} 模拟股票池 {len(codes)} 只")
+    finally:
+        db.close()
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    opts = dict(a[2:].split("=", 1) if "=" in a else (a[2:], True) for a in sys.argv[1:] if a.startswith("--"))
+    if len(args) < 2 or args[0] not in ("synth", "run"):
+        print(__doc__)
+        sys.exit(1)
+
+    try:
+        bind = replay_engine(opts.get("db-url") if isinstance(opts.get("db-url"), str) else None)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    if bind is None and (opts.get("seed-pool") or opts.get("write")):
+        print("--seed-pool / --write 需要单独的回放库: --db-url=... 或 REPLAY_DATABASE_URL")
+        sys.exit(1)
+
+    if args[0] == "synth":
+        trading_day = args[1]
+        n_stocks = int(opts.get("stocks", 5000))
+        data = synthesize_day(trading_day, n_stocks=n_stocks)
+        os.makedirs(REPLAY_DIR, exist_ok=True)
+        path = opts.get("out") or os.path.join(REPLAY_DIR, trading_day.replace("-", "") + ".npz")
+        np.savez_compressed(path, **data)
+        print(f"模拟行情已生成: {path}（{len(data['ts'])} tick × {n_stocks} 只）")
+        if opts.get("seed-pool"):
+            # 昨日成交额取 8亿~30亿，使全市场都进入 mighty 股票池
+            amounts = np.random.default_rng(1).uniform(8e8, 3e9, n_stocks)
+            _seed_pool(trading_day, data["codes"], amounts, bind)
+        return
+
+    from sqlalchemy.orm import Session
+
+    from app.collectors.jjmighty import JjmightyMonitor
+    from app.collectors.lianban import LianbanMonitor
+    from app.collectors.mighty import MightyMonitor
+    from app.collectors.monitor import run_monitors
+    from app.collectors.quotes import set_source
+    from app.database import SessionLocal
+
+    source = ReplaySource.from_file(args[1], speed=float(opts.get("speed", 0)))
+    set_source(source)
+    available = {"mighty": MightyMonitor, "lianban": LianbanMonitor, "jjmighty": JjmightyMonitor}
+    names = str(opts.get("strategies", "lianban,jjmighty,mighty")).split(",")
+    strategies = [available[n]() for n in names]
+
+    print(f"回放 {args[1]}，交易日 {source.trading_day}，{len(source.ts)} tick × {len(source.codes)} 只，"
+          f"倍速 {source.speed or '不等待'}，{'写入回放库' if opts.get('write') else '试运行（不写库）'}")
+    db = Session(bind=bind) if bind is not None else SessionLocal()
+    start = sys_time.perf_counter()
+    try:
+        result = run_monitors(source.trading_day, db, strategies, bind=bind if opts.get("write") else None)
+    finally:
+        db.close()
+    elapsed = sys_time.perf_counter() - start
+    print(f"回放完成，耗时 {elapsed:.1f}s: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,17 @@
 # coding:utf-8
 """自动定时采集调度器
 
-采集时间表（交易日，共 10 个任务）:
+采集时间表（交易日，共 9 个任务）:
   9:27      - bidding         竞价数据（一次）
-  9:30-9:46 - mighty          强势反包实时监控（内含循环，启动一次）
-  9:30-9:46 - lianban         连板反包实时监控（内含循环，启动一次）
-  9:30-9:46 - jjmighty        竞价强势实时监控（内含循环，启动一次）
-  15:05     - stat            涨停统计（一次）
-  15:08     - thsdata         涨停反包 + 大额成交（收盘后全天数据）
-  15:15     - mighty_close    更新强势反包收盘涨幅（一次）
-  15:15     - lianban_close   更新连板反包收盘涨幅（一次）
-  15:15     - jjmighty_close  更新竞价强势收盘涨幅（一次）
+  9:30-9:46 - mighty          强势反包实时监控 ┐
+  9:30-9:46 - lianban         连板反包实时监控 ├ 共享行情轮询（monitors，启动一次）
+  9:30-9:46 - jjmighty        竞价强势实时监控 ┘
+  15:05 起   收盘后流水线（app/collectors/pipeline.py，按依赖并发执行，全部完成即结束）:
+            - bars            全市场日线写入本地（data/bars，一次 THS_RQ），15:05 开始
+            - stat            涨停统计（一次），15:05 开始
+            - thsdata         涨停反包 + 大额成交，stat 成功且 bars 结束后立即开始
+                              （bars 失败不影响，thsdata 自行取日线）
+            - close           更新 mighty / lianban / jjmighty 收盘涨幅，15:05 开始
   23:00     - cleanup_logs    清理30天前日志
 
 注意: thsdata 必须在收盘后执行，因为 THS_RQ 获取实时行情，
@@ -20,20 +21,24 @@
   python -m app.collectors.scheduler              正常调度模式（常驻进程）
   python -m app.collectors.scheduler --now         立即执行所有任务（测试/补采）
   python -m app.collectors.scheduler --task <name>  执行单个任务（供 Windows 任务计划程序调用）
+  python -m app.collectors.scheduler --task after_close  执行收盘后流水线
 """
 import os
 import sys
 import time
-import threading
 from datetime import datetime, timedelta
 
 from app.collectors import func
 from app.collectors.stat import collect_stat
 from app.collectors.thsdata import collect_ztdb, backfill_large_amount
+from app.collectors.bars import collect_bars
 from app.collectors.bidding import collect_bidding
-from app.collectors.mighty import collect_mighty, update_close_price
-from app.collectors.lianban import collect_lianban, update_close_price as lianban_update_close
-from app.collectors.jjmighty import collect_jjmighty, update_close_price as jjmighty_update_close
+from app.collectors.close import update_close_prices
+from app.collectors.monitor import monitor_intervals, run_monitors
+from app.collectors.pipeline import Node, Pipeline
+from app.collectors.mighty import MightyMonitor, collect_mighty, update_close_price
+from app.collectors.lianban import LianbanMonitor, collect_lianban, update_close_price as lianban_update_close
+from app.collectors.jjmighty import JjmightyMonitor, collect_jjmighty, update_close_price as jjmighty_update_close
 from app.collectors.models import ZtReson
 from app.features.mighty.models import LargeAmount
 from app.database import SessionLocal
@@ -68,11 +73,14 @@ def log(msg: str):
 
 
 def run_task(name: str, task_fn):
-    """执行单个采集任务，返回是否成功"""
+    """执行单个采集任务，返回是否成功（任务返回 {"error": ...} 视为失败）"""
     log(f"执行 {name}...")
     db = SessionLocal()
     try:
         result = task_fn(db)
+        if isinstance(result, dict) and result.get("error"):
+            log(f"{name} 失败: {result['error']}")
+            return False
         log(f"{name} 完成: {result}")
         return True
     except Exception as e:
@@ -90,6 +98,10 @@ def run_thsdata(trading_day: str, db):
     return collect_ztdb(trading_day, db)
 
 
+def run_bars(trading_day: str, db):
+    return collect_bars(trading_day, db)
+
+
 def run_stat(cdate: str, db):
     return collect_stat(cdate, db)
 
@@ -118,6 +130,41 @@ def run_jjmighty_close(trading_day: str, db):
     return jjmighty_update_close(trading_day, db)
 
 
+def run_close(trading_day: str, db):
+    """三个策略的收盘涨幅合并更新"""
+    return update_close_prices(trading_day, db)
+
+
+def run_monitor_all(trading_day: str, db):
+    """三个实时监控策略共享一个行情轮询器（每轮一次 THS_RQ）"""
+    intervals = monitor_intervals()
+    return run_monitors(trading_day, db, [
+        LianbanMonitor(intervals["lianban"]),
+        JjmightyMonitor(intervals["jjmighty"]),
+        MightyMonitor(intervals["mighty"]),
+    ])
+
+
+def after_close_pipeline(trading_day: str) -> Pipeline:
+    """收盘后流水线: bars / stat / close 15:05 开始，thsdata 依赖 stat，并排在 bars 之后
+
+    thsdata 优先读取 bars 写好的本地日线，bars 失败时自行从 THS 取，因此 bars 只决定先后。
+    """
+    cdate = trading_day.replace("-", "")
+    return Pipeline([
+        Node("bars", lambda db: run_bars(trading_day, db), not_before=1505),
+        Node("stat", lambda db: run_stat(cdate, db), not_before=1505),
+        Node("thsdata", lambda db: run_thsdata(trading_day, db), deps=("stat",), after=("bars",)),
+        Node("close", lambda db: run_close(trading_day, db), not_before=1505),
+    ])
+
+
+def run_after_close(trading_day: str, ignore_times: bool = False) -> bool:
+    """执行收盘后流水线，全部节点成功返回 True"""
+    status = after_close_pipeline(trading_day).run(run_task, ignore_times=ignore_times, log=log)
+    return all(value == "ok" for value in status.values())
+
+
 def seconds_until(hour: int, minute: int) -> float:
     """计算距离今天指定时间的秒数，如果已过则返回负数"""
     now = datetime.now()
@@ -187,6 +234,7 @@ def run_single_task(name: str):
     tasks = {
         "bidding": lambda db: run_bidding(trading_day, db),
         "thsdata": lambda db: run_thsdata(trading_day, db),
+        "bars": lambda db: run_bars(trading_day, db),
         "stat": lambda db: run_stat(cdate, db),
         "mighty": lambda db: run_mighty(trading_day, db),
         "mighty_close": lambda db: run_mighty_close(trading_day, db),
@@ -194,19 +242,24 @@ def run_single_task(name: str):
         "lianban_close": lambda db: run_lianban_close(trading_day, db),
         "jjmighty": lambda db: run_jjmighty(trading_day, db),
         "jjmighty_close": lambda db: run_jjmighty_close(trading_day, db),
+        "close": lambda db: run_close(trading_day, db),
+        "monitors": lambda db: run_monitor_all(trading_day, db),
     }
 
-    if name not in tasks:
-        log(f"未知任务: {name}，可选: {', '.join(tasks)}")
+    if name not in tasks and name != "after_close":
+        log(f"未知任务: {name}，可选: {', '.join(tasks)}, after_close")
         sys.exit(1)
 
     log(f"定时任务模式，执行 {name}，交易日: {trading_day}")
     func.thslogin()
     try:
         # 早盘任务需要前一交易日数据
-        if name in ("bidding", "mighty", "lianban", "jjmighty"):
+        if name in ("bidding", "mighty", "lianban", "jjmighty", "monitors"):
             ensure_previous_day_data(trading_day)
-        success = run_task(name, tasks[name])
+        if name == "after_close":
+            success = run_after_close(trading_day)
+        else:
+            success = run_task(name, tasks[name])
     finally:
         func.thslogout()
         log(f"任务 {name} 结束")
@@ -249,38 +302,16 @@ def main():
                     run_task("bidding", lambda db: run_bidding(trading_day, db))
                     done.add("bidding")
 
-                # 9:30 启动实时监控（mighty/lianban/jjmighty 各含循环到 9:46 自动退出）
-                # 使用多线程并行执行，避免串行导致后两个错过 9:30-9:46 窗口
+                # 9:30 启动实时监控（mighty/lianban/jjmighty 循环到 9:46 自动退出）
+                # 三个策略共享一个行情轮询器，每轮对股票池并集只请求一次 THS_RQ
                 elif hm >= 930 and "mighty" not in done:
-                    threads = [
-                        threading.Thread(target=run_task, args=("lianban", lambda db: run_lianban(trading_day, db))),
-                        threading.Thread(target=run_task, args=("jjmighty", lambda db: run_jjmighty(trading_day, db))),
-                        threading.Thread(target=run_task, args=("mighty", lambda db: run_mighty(trading_day, db))),
-                    ]
-                    for t in threads:
-                        t.start()
-                    for t in threads:
-                        t.join()
+                    run_task("monitors", lambda db: run_monitor_all(trading_day, db))
                     done.update(["lianban", "jjmighty", "mighty"])
 
-                # 15:05 执行 stat（一次）
-                elif hm >= 1505 and "stat" not in done:
-                    run_task("stat", lambda db: run_stat(cdate, db))
-                    done.add("stat")
-
-                # 15:08 执行 thsdata 涨停反包（收盘后全天数据）
-                elif hm >= 1508 and "thsdata" not in done:
-                    run_task("thsdata", lambda db: run_thsdata(trading_day, db))
-                    done.add("thsdata")
-
-                # 15:15 执行收盘更新（mighty/lianban/jjmighty）
-                elif hm >= 1515 and "mighty_close" not in done:
-                    run_task("mighty_close", lambda db: run_mighty_close(trading_day, db))
-                    done.add("mighty_close")
-                    run_task("lianban_close", lambda db: run_lianban_close(trading_day, db))
-                    done.add("lianban_close")
-                    run_task("jjmighty_close", lambda db: run_jjmighty_close(trading_day, db))
-                    done.add("jjmighty_close")
+                # 15:05 收盘后流水线: bars + stat 并发，thsdata / close 在各自上游完成后立即执行
+                elif hm >= 1505 and "after_close" not in done:
+                    run_after_close(trading_day)
+                    done.add("after_close")
                     log("今日采集全部完成")
                     sleep_until_tomorrow()
                     break
@@ -299,18 +330,13 @@ def run_all_now():
     setup_logging()
     today = datetime.now().strftime("%Y-%m-%d")
     trading_day = func.get_trading_day(today)
-    cdate = trading_day.replace("-", "")
 
     log(f"立即执行模式，交易日: {trading_day}")
     func.thslogin()
     try:
         ensure_previous_day_data(trading_day)
         run_task("bidding", lambda db: run_bidding(trading_day, db))
-        run_task("stat", lambda db: run_stat(cdate, db))
-        run_task("thsdata", lambda db: run_thsdata(trading_day, db))
-        run_task("mighty_close", lambda db: run_mighty_close(trading_day, db))
-        run_task("lianban_close", lambda db: run_lianban_close(trading_day, db))
-        run_task("jjmighty_close", lambda db: run_jjmighty_close(trading_day, db))
+        run_after_close(trading_day, ignore_times=True)
         log("全部任务执行完成")
     finally:
         func.thslogout()
@@ -325,6 +351,6 @@ if __name__ == "__main__":
         if task_name:
             run_single_task(task_name)
         else:
-            print("用法: python -m app.collectors.scheduler --task <bidding|stat|thsdata|mighty|mighty_close|lianban|lianban_close|jjmighty|jjmighty_close>")
+            print("用法: python -m app.collectors.scheduler --task <bidding|bars|stat|thsdata|mighty|mighty_close|lianban|lianban_close|jjmighty|jjmighty_close|close|monitors|after_close>")
     else:
         main()
@@ -10,7 +10,7 @@
 import sys
 from collections import defaultdict
 
-from app.backtest.strategy import STRATEGIES, Trade, apply_filters, params_to_filters, DEFAULT_PARAMS
+from app.backtest.strategy import STRATEGIES, Trade, filter_records, params_to_filters, DEFAULT_PARAMS
 from app.backtest.engine import compute_stats
 from app.database import SessionLocal
 
@@ -117,7 +117,7 @@ def run_compare(strategy_name, start_date, end_date, old_threshold=100, new_thre
 
         # 先应用基础过滤（除score外的过滤器）
         if filters:
-            records = [r for r in records if apply_filters(r, filters)]
+            records = filter_records(records, filters)
 
         print(f"\n{'='*70}")
         print(f"评分公式对比: {label} ({strategy_name})")
@@ -2,19 +2,15 @@
 """赚钱效应统计采集 — 原 python/stat.py 迁移
 将 Redis 中间层替换为直接写入 Cloud SQL (SQLAlchemy)
 """
-import json
 
 from sqlalchemy.orm import Session
 
-from app.collectors import func
+from app.collectors import func, thsjson
+from app.collectors.bulk import replace_rows, upsert_rows
 from app.collectors.models import ZtReson
+from app.collectors.quotes import get_source
 from app.features.effect.models import MoneyEffect
 
-try:
-    from iFinDPy import THS_WCQuery
-except ImportError:
-    THS_WCQuery = None
-
 
 def collect_stat(cdate: str, db: Session) -> dict:
     """采集赚钱效应数据
@@ -26,11 +22,12 @@ def collect_stat(cdate: str, db: Session) -> dict:
     Returns:
         统计信息
     """
-    if THS_WCQuery is None:
+    ths = get_source()
+    if not ths.available:
         return {"error": "iFinDPy not available"}
 
     # 一字板数据
-    yzdata_result = THS_WCQuery(
+    yzdata_result = ths.wcquery(
         cdate + " 去除ST以及北交所股票一字涨停板股票以及涨停封单金额",
         "stock", "format:json",
     )
@@ -38,7 +35,7 @@ def collect_stat(cdate: str, db: Session) -> dict:
     yzb_fd = 0.0
     yzb_num = 0
     if yzdata_result.errorcode == 0:
-        jdata = json.loads(yzdata_result.data.decode('gb18030'))
+        jdata = thsjson.loads(yzdata_result.data)
         for item in jdata["tables"]:
             ztfd_list = item["table"]["涨停封单额[" + cdate + "]"]
             ztfd_list = [float(x) for x in ztfd_list]
@@ -48,7 +45,7 @@ def collect_stat(cdate: str, db: Session) -> dict:
         print(f"一字板查询失败: {yzdata_result.errmsg}")
 
     # 涨停板数据
-    ztdata_result = THS_WCQuery(
+    ztdata_result = ths.wcquery(
         cdate + " 去除ST以及北交所股票 涨停板股票、成交金额、涨停原因、连续涨停天数",
         "stock", "format:json",
     )
@@ -59,7 +56,7 @@ def collect_stat(cdate: str, db: Session) -> dict:
     maxlb = 1
     zt_details = []
     if ztdata_result.errorcode == 0:
-        jdata = json.loads(ztdata_result.data.decode('gb18030'))
+        jdata = thsjson.loads(ztdata_result.data)
         for item in jdata["tables"]:
             code_list = item["table"]["股票代码"]
             name_list = item["table"]["股票简称"]
@@ -87,31 +84,19 @@ def collect_stat(cdate: str, db: Session) -> dict:
         print(f"涨停板查询失败: {ztdata_result.errmsg}")
 
     # 写入涨停原因明细到 db_zt_reson (替代 Redis zhangting_reson_{date})
-    db.query(ZtReson).filter(ZtReson.cdate == cdate).delete()
-    for detail in zt_details:
-        db.add(ZtReson(cdate=cdate, **detail))
+    replace_rows(db, ZtReson, [{"cdate": cdate, **detail} for detail in zt_details], scope={"cdate": cdate})
 
     # 写入赚钱效应汇总 (upsert)
-    existing = db.query(MoneyEffect).filter(MoneyEffect.cdate == cdate).first()
-    if existing:
-        existing.ztje = zt_cje
-        existing.maxlb = maxlb
-        existing.zts = zt_num
-        existing.lbs = lbs
-        existing.yzb = yzb_num
-        existing.yzbfd = yzb_fd
-        existing.dzfs = 0
-    else:
-        db.add(MoneyEffect(
-            cdate=cdate,
-            ztje=zt_cje,
-            maxlb=maxlb,
-            zts=zt_num,
-            lbs=lbs,
-            yzb=yzb_num,
-            yzbfd=yzb_fd,
-            dzfs=0,
-        ))
+    upsert_rows(db, MoneyEffect, [{
+        "cdate": cdate,
+        "ztje": zt_cje,
+        "maxlb": maxlb,
+        "zts": zt_num,
+        "lbs": lbs,
+        "yzb": yzb_num,
+        "yzbfd": yzb_fd,
+        "dzfs": 0,
+    }], key=("cdate",))
 
     db.commit()
     return {
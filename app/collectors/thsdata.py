@@ -1,25 +1,29 @@
 # coding:utf-8
 """涨停反包数据采集 — 原 python/thsdata.py 迁移
 将 Redis 中间层替换为直接写入 Cloud SQL (SQLAlchemy)
+
+全市场收盘行情读取本地日线库（app/collectors/bars.py），本地没有时从 THS 取一次并写入；
+筛选在整列上一次完成（scan_ztdb），结果经 app/collectors/bulk.py 分块 upsert 写入。
+
+用法:
+  python -m app.collectors.thsdata                采集今天
+  python -m app.collectors.thsdata 2025-02-14     采集指定日期
+  python -m app.collectors.thsdata --bench        5500 只股票合成数据上对比逐条循环与列式筛选
 """
-import json
 from datetime import datetime
 
+import numpy as np
 from sqlalchemy.orm import Session
 
-from app.collectors import func
+from app.collectors import func, thsjson
+from app.collectors.bars import DailyBars, ensure_bars, fill_limit_prices
+from app.collectors.bulk import replace_rows
 from app.collectors.models import ZtReson
+from app.collectors.quotes import get_source
+from app.collectors.universe import get_universe
 from app.features.ztdb.models import Ztdb
 from app.features.mighty.models import LargeAmount
 
-try:
-    from iFinDPy import THS_DR, THS_RQ, THS_HQ, THS_WCQuery
-except ImportError:
-    THS_DR = None
-    THS_RQ = None
-    THS_HQ = None
-    THS_WCQuery = None
-
 
 def collect_ztdb(trading_day: str, db: Session) -> dict:
     """采集涨停反包数据并写入数据库
@@ -31,7 +35,8 @@ def collect_ztdb(trading_day: str, db: Session) -> dict:
     Returns:
         统计信息
     """
-    if THS_DR is None:
+    ths = get_source()
+    if not ths.available:
         return {"error": "iFinDPy not available"}
 
     tradingday_obj = datetime.strptime(trading_day, "%Y-%m-%d")
@@ -50,99 +55,80 @@ def collect_ztdb(trading_day: str, db: Session) -> dict:
             "lbs": rec.lbs,
         }
 
-    # 获取全部A股实时行情
-    date_params = f"date={cdate}"
-    data_codes = THS_DR(
-        "p03291",
-        date_params + ";blockname=001005010;iv_type=allcontract",
-        "p03291_f001:Y,p03291_f002:Y,p03291_f003:Y,p03291_f004:Y",
-    )
-
-    if data_codes.errorcode != 0:
-        return {"error": data_codes.errmsg}
-
-    codes_list = data_codes.data["p03291_f002"].tolist()
-    names_list = data_codes.data["p03291_f003"].tolist()
-
-    data_result = THS_RQ(
-        codes_list,
-        "changeRatio;latest;high;low;open;upperLimit;lowerLimit;preClose;amount;tradeStatus",
-        "", "format:json",
-    )
-
-    if data_result.errorcode != 0:
-        return {"error": data_result.errmsg}
-
-    jdata = json.loads(data_result.data.decode('gb18030'))
-
-    # 获取ST股列表
-    st_stocks = THS_WCQuery(cdate + " ST股票", "stock", "format:json")
-    st_sids = set()
-    if st_stocks.errorcode == 0:
-        st_data = json.loads(st_stocks.data.decode('gb18030'))
-        st_sids = set(st_data["tables"][0]["table"]["股票代码"])
-
-    # 清除当日旧数据
-    db.query(Ztdb).filter(Ztdb.cdate == cdate).delete()
-    db.query(LargeAmount).filter(LargeAmount.cdate == cdate).delete()
-
-    ztdb_count = 0
-    large_amount_count = 0
-    for item in jdata["tables"]:
-        latest = item["table"]["latest"]
-        pre_close = item["table"]["preClose"]
-        upper_limit = item["table"]["upperLimit"]
-        high = item["table"]["high"]
-        low = item["table"]["low"]
-        amount = item["table"]["amount"]
-        lower_limit = item["table"].get("lowerLimit", [None])
-        trade_status = item["table"]["tradeStatus"]
-        thscode = item["thscode"]
-        thscoder = thscode.split(".")
-
-        # 过滤北交所、非交易、ST
-        if thscoder[1] == "BJ" or trade_status[0] != "交易" or thscode in st_sids:
-            continue
-
-        # 跳过当日涨停
-        if latest[0] == upper_limit[0]:
-            continue
+    # 全部A股当日日线（收盘后由 bars 任务写入本地）
+    bars = ensure_bars(trading_day)
+    if bars is None:
+        return {"error": f"无 {cdate} 日线数据"}
+
+    # ST 股列表（当日股票池，与竞价采集同一口径）
+    universe = get_universe(trading_day, db)
+    if universe is None:
+        return {"error": f"无 {cdate} 股票池"}
+
+    # 早先经 THS_HQ 补采的历史日线没有涨跌停价，按昨收推算，否则涨停 / 跌停判断全部失效
+    st_sids = universe.st_codes()
+    fill_limit_prices(bars, st_sids)
+
+    ztdb_rows, large_rows = scan_ztdb(bars, cdate, set(lszt_stocks), st_sids)
+
+    # 整体替换当日数据（分块 upsert + 删除多余旧记录，同一事务）
+    replace_rows(db, Ztdb, ztdb_rows, scope={"cdate": cdate})
+    replace_rows(db, LargeAmount, large_rows, scope={"cdate": cdate})
+
+    db.commit()
+    return {"date": cdate, "ztdb_count": len(ztdb_rows), "large_amount_count": len(large_rows)}
+
 
+def scan_ztdb(bars: DailyBars, cdate: str, lszt_codes: set[str], st_sids: set[str]) -> tuple[list[dict], list[dict]]:
+    """全市场列式筛选，返回 (db_ztdb 行, db_large_amount 行)
+
+    各条件在整列上一次求掩码，只对入选的少数股票逐行生成记录。
+    """
+    codes = bars.codes
+    latest = bars["close"]
+    pre_close = bars["preClose"]
+    high = bars["high"]
+    low = bars["low"]
+    amount = bars["amount"]
+
+    # 过滤北交所、非交易、ST，跳过当日涨停（缺失值为 NaN，比较结果均为 False）
+    alive = bars.trading & ~np.char.endswith(codes, ".BJ") & ~np.isin(codes, list(st_sids))
+    alive &= ~(latest == bars["upperLimit"])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
         # 入池条件（OR）：成交额>8亿 / 当日跌停 / 冲高回落>=5%
-        is_large = amount[0] and amount[0] >= 800000000
-        is_limit_down = lower_limit[0] is not None and latest[0] == lower_limit[0]
+        is_large = amount >= 800000000
+        is_limit_down = latest == bars["lowerLimit"]
         # 冲高回落：盘中最高价须高于昨收3%以上，且从高点回落>=5%
-        rise_from_pre = round((high[0] - pre_close[0]) / pre_close[0] * 100, 2) if pre_close[0] else 0
-        drop_from_high = round((high[0] - latest[0]) / high[0] * 100, 2) if high[0] else 0
-        is_pullback = rise_from_pre >= 3 and drop_from_high >= 5
-        if is_large or is_limit_down or is_pullback:
-            db.add(LargeAmount(cdate=cdate, stockid=thscode, amount=amount[0] or 0))
-            large_amount_count += 1
+        rise_from_pre = np.where(pre_close != 0, np.round((high - pre_close) / pre_close * 100, 2), 0)
+        drop_from_high = np.where(high != 0, np.round((high - latest) / high * 100, 2), 0)
+        is_pullback = (rise_from_pre >= 3) & (drop_from_high >= 5)
 
         # 昨日涨停股中振幅>=10且回撤<10的
-        if thscode in lszt_stocks:
-            zhenfu = round((high[0] - low[0]) / pre_close[0] * 100, 2)
-            declines = round((high[0] - latest[0]) / high[0] * 100, 2)
-            if zhenfu >= 10 and declines < 10:
-                stock_name = names_list[codes_list.index(thscode)] if thscode in codes_list else ""
-                record = Ztdb(
-                    cdate=cdate,
-                    stockid=thscode,
-                    stockname=stock_name,
-                    zhenfu=zhenfu,
-                    declines=declines,
-                )
-                db.add(record)
-                ztdb_count += 1
-
-    db.commit()
-    return {"date": cdate, "ztdb_count": ztdb_count, "large_amount_count": large_amount_count}
+        zhenfu = np.round((high - low) / pre_close * 100, 2)
+        declines = np.round((high - latest) / high * 100, 2)
+        is_ztdb = np.isin(codes, list(lszt_codes)) & (pre_close > 0) & (zhenfu >= 10) & (declines < 10)
+
+    large = np.flatnonzero(alive & (is_large | is_limit_down | is_pullback))
+    large_rows = [
+        {"cdate": cdate, "stockid": code, "amount": value if value == value else 0}
+        for code, value in zip(codes[large].tolist(), amount[large].tolist())
+    ]
+
+    ztdb = np.flatnonzero(alive & is_ztdb)
+    ztdb_rows = [
+        {"cdate": cdate, "stockid": code, "stockname": name, "zhenfu": zf, "declines": dc}
+        for code, name, zf, dc in zip(
+            codes[ztdb].tolist(), bars.names[ztdb].tolist(), zhenfu[ztdb].tolist(), declines[ztdb].tolist()
+        )
+    ]
+    return ztdb_rows, large_rows
 
 
 def backfill_large_amount(cdate: str, db: Session) -> dict:
     """补采指定日期的大额成交数据（历史数据）
 
-    用 THS_DR 获取 A 股代码列表，THS_HQ 获取指定日期历史成交额，
+    读取本地日线的成交额（本地没有时按当日股票池用一次 THS_HQ 取回并写入本地），
     过滤成交额 > 8 亿写入 db_large_amount。
 
     Args:
@@ -152,52 +138,130 @@ def backfill_large_amount(cdate: str, db: Session) -> dict:
     Returns:
         统计信息
     """
-    if THS_DR is None or THS_HQ is None:
-        return {"error": "iFinDPy not available"}
-
     trading_day = f"{cdate[:4]}-{cdate[4:6]}-{cdate[6:]}"
 
-    # 获取全部 A 股代码
-    data_codes = THS_DR(
-        "p03291",
-        f"date={cdate};blockname=001005010;iv_type=allcontract",
-        "p03291_f001:Y,p03291_f002:Y,p03291_f003:Y,p03291_f004:Y",
-    )
-    if data_codes.errorcode != 0:
-        return {"error": f"THS_DR 失败: {data_codes.errmsg}"}
-
-    codes_list = data_codes.data["p03291_f002"].tolist()
-
-    # 用 THS_HQ 批量获取历史成交额
-    codes_str = ";".join(codes_list)
-    data_hq = THS_HQ(codes_str, "amount", "", trading_day, trading_day, "format:json")
-    if data_hq.errorcode != 0:
-        return {"error": f"THS_HQ 失败: {data_hq.errmsg}"}
-
-    jdata = json.loads(data_hq.data.decode("gb18030"))
-
-    # 清除当日旧数据
-    db.query(LargeAmount).filter(LargeAmount.cdate == cdate).delete()
-
-    count = 0
-    for item in jdata["tables"]:
-        thscode = item["thscode"]
-        amount_list = item["table"].get("amount", [])
-        if not amount_list:
-            continue
-        amount = amount_list[0]
-        if amount and amount >= 800000000:
-            db.add(LargeAmount(cdate=cdate, stockid=thscode, amount=amount))
-            count += 1
+    # 历史成交额: 本地日线，没有时一次多代码 THS_HQ 取回并写入本地
+    bars = ensure_bars(trading_day)
+    if bars is None:
+        return {"error": f"无 {cdate} 日线数据"}
+
+    large = bars["amount"] >= 800000000
+    rows = [
+        {"cdate": cdate, "stockid": code, "amount": amount}
+        for code, amount in zip(bars.codes[large].tolist(), bars["amount"][large].tolist())
+    ]
+    replace_rows(db, LargeAmount, rows, scope={"cdate": cdate})
+    count = len(rows)
 
     db.commit()
     return {"date": cdate, "large_amount_count": count}
 
 
+def _bench_payload(n_stocks: int):
+    """构造与收盘后全市场 THS_RQ 结构相同的返回数据，返回 (data, 代码, 名称, 昨日涨停, ST)"""
+    import json
+    import random
+
+    rnd = random.Random(0)
+    codes, names, items = [], [], []
+    for i in range(n_stocks):
+        code = f"{600000 + i}.SH" if i % 2 else f"{i:06d}.SZ"
+        pre_close = round(rnd.uniform(3, 80), 2)
+        high = round(pre_close * rnd.uniform(1.0, 1.1), 2)
+        low = round(pre_close * rnd.uniform(0.9, 1.0), 2)
+        codes.append(code)
+        names.append(f"股票{i}")
+        items.append({"thscode": code, "table": {
+            "open": [round(pre_close * rnd.uniform(0.95, 1.05), 2)],
+            "high": [high],
+            "low": [low],
+            "latest": [round(rnd.uniform(low, high), 2)],
+            "preClose": [pre_close],
+            "volume": [rnd.uniform(1e4, 1e7)],
+            "amount": [rnd.uniform(1e7, 3e9)],
+            "upperLimit": [round(pre_close * 1.1, 2)],
+            "lowerLimit": [round(pre_close * 0.9, 2)],
+            "tradeStatus": ["交易" if rnd.random() > 0.01 else "停牌"],
+            "changeRatio": [round(rnd.uniform(-10, 10), 2)],
+        }})
+    data = json.dumps({"tables": items}, ensure_ascii=False).encode("gb18030")
+    lszt = set(rnd.sample(codes, 100))
+    st_sids = set(rnd.sample(codes, 150))
+    return data, codes, names, lszt, st_sids
+
+
+def bench(n_stocks: int = 5500):
+    """逐条循环（原实现）与列式筛选的耗时 / 内存峰值对比（不含写库）"""
+    import time
+    import tracemalloc
+
+    from app.collectors.bars import bars_from_rq
+
+    data, codes_list, names_list, lszt, st_sids = _bench_payload(n_stocks)
+    cdate = "20250214"
+
+    def baseline():
+        # 原 collect_ztdb: 整个返回数据解析为对象树后逐条判断，名称用 list.index 查找
+        jdata = thsjson.loads(data)
+        ztdb_rows, large_rows = [], []
+        for item in jdata["tables"]:
+            table = item["table"]
+            latest, pre_close = table["latest"][0], table["preClose"][0]
+            high, low, amount = table["high"][0], table["low"][0], table["amount"][0]
+            thscode = item["thscode"]
+            if thscode.split(".")[1] == "BJ" or table["tradeStatus"][0] != "交易" or thscode in st_sids:
+                continue
+            if latest == table["upperLimit"][0]:
+                continue
+            is_large = amount and amount >= 800000000
+            is_limit_down = table["lowerLimit"][0] is not None and latest == table["lowerLimit"][0]
+            rise_from_pre = round((high - pre_close) / pre_close * 100, 2) if pre_close else 0
+            drop_from_high = round((high - latest) / high * 100, 2) if high else 0
+            if is_large or is_limit_down or (rise_from_pre >= 3 and drop_from_high >= 5):
+                large_rows.append({"cdate": cdate, "stockid": thscode, "amount": amount or 0})
+            if thscode in lszt:
+                zhenfu = round((high - low) / pre_close * 100, 2)
+                declines = round((high - latest) / high * 100, 2)
+                if zhenfu >= 10 and declines < 10:
+                    stock_name = names_list[codes_list.index(thscode)] if thscode in codes_list else ""
+                    ztdb_rows.append({"cdate": cdate, "stockid": thscode, "stockname": stock_name,
+                                      "zhenfu": zhenfu, "declines": declines})
+        return ztdb_rows, large_rows
+
+    def columnar():
+        bars = bars_from_rq(cdate, data, dict(zip(codes_list, names_list)))
+        return scan_ztdb(bars, cdate, lszt, st_sids)
+
+    def measure(fn, repeat=5):
+        fn()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = fn()
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+        return result, elapsed, peak
+
+    (old_z, old_l), old_ms, old_mb = measure(baseline)
+    (new_z, new_l), new_ms, new_mb = measure(columnar)
+    same = sorted(r["stockid"] for r in old_z) == sorted(r["stockid"] for r in new_z) and \
+        sorted(r["stockid"] for r in old_l) == sorted(r["stockid"] for r in new_l)
+    print(f"{n_stocks} 只股票，返回数据 {len(data) / 1024:.0f}KB，"
+          f"ztdb {len(new_z)} 条，large_amount {len(new_l)} 条，结果一致: {same}")
+    print(f"  逐条循环: {old_ms:.1f}ms，内存峰值 {old_mb:.1f}MB")
+    print(f"  列式筛选: {new_ms:.1f}ms，内存峰值 {new_mb:.1f}MB")
+
+
 if __name__ == "__main__":
     import sys
     from app.database import SessionLocal
 
+    if "--bench" in sys.argv:
+        bench()
+        sys.exit(0)
+
     date_arg = sys.argv[1] if len(sys.argv) > 1 else datetime.today().strftime("%Y-%m-%d")
     trading_day = func.get_trading_day(date_arg)
 
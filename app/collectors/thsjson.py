@@ -0,0 +1,118 @@
+# coding:utf-8
+"""THS 返回数据解析（format:json）
+
+所有采集脚本统一用这里的函数解析 THS_RQ / THS_HQ / THS_WCQuery 的返回数据，
+替代 json.loads(data.decode('gb18030')):
+  - 安装了 orjson 时用 orjson 解析（未安装退回标准库 json）
+  - 纯 ASCII 的返回（只含数值列，不含 tradeStatus 等中文字段）直接解析 bytes，
+    省去 gb18030 解码和中间 str 拷贝；含中文时才解码
+  - rq_columns 只取出调用方需要的列，便于直接转成 NumPy 数组
+
+微基准（5000 只股票的全市场 THS_RQ 返回）:
+  python -m app.collectors.thsjson
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data: bytes | str):
+    """解析 THS 返回的 JSON（gb18030 编码的 bytes）"""
+    if isinstance(data, (bytes, bytearray)):
+        # ASCII 是 gb18030 的子集，无中文时无需解码
+        if not data.isascii():
+            data = data.decode("gb18030")
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def tables(data: bytes | str) -> list[dict]:
+    """返回数据中的 tables 列表"""
+    return loads(data)["tables"]
+
+
+def rq_columns(data: bytes | str, fields) -> tuple[list[str], dict[str, list]]:
+    """按列取出 THS_RQ 结果（每只股票每个字段只有一个值）
+
+    Args:
+        data: THS_RQ 返回的 data
+        fields: 需要的字段名
+
+    Returns:
+        (代码列表, {字段: 与代码列表对齐的值列表})，缺失值为 None
+    """
+    items = tables(data)
+    codes = [item["thscode"] for item in items]
+    rows = [item["table"] for item in items]
+    columns = {}
+    for field in fields:
+        try:
+            columns[field] = [row[field][0] for row in rows]
+        except (KeyError, IndexError, TypeError):
+            # 个别股票缺少该字段或值为空列表
+            columns[field] = [(row.get(field) or [None])[0] for row in rows]
+    return codes, columns
+
+
+def _bench_payload(n_stocks: int, text_field: bool) -> bytes:
+    """构造与 THS_RQ 结构相同的全市场返回数据"""
+    import random
+
+    rnd = random.Random(0)
+    items = []
+    for i in range(n_stocks):
+        pre_close = round(rnd.uniform(3, 80), 2)
+        table = {
+            "preClose": [pre_close],
+            "open": [round(pre_close * rnd.uniform(0.95, 1.05), 2)],
+            "latest": [round(pre_close * rnd.uniform(0.9, 1.1), 2)],
+            "changeRatio": [rnd.uniform(-10, 10)],
+            "upperLimit": [round(pre_close * 1.1, 2)],
+            "amount": [rnd.uniform(1e6, 3e9)],
+            "chg_1min": [rnd.choice([None, rnd.uniform(-2, 3)])],
+        }
+        if text_field:
+            table["tradeStatus"] = ["交易"]
+        items.append({"thscode": f"{600000 + i}.SH", "table": table})
+    return json.dumps({"tables": items}, ensure_ascii=False).encode("gb18030")
+
+
+def main():
+    import time
+
+    fields = ("latest", "open", "preClose", "upperLimit", "amount", "chg_1min", "changeRatio")
+
+    def baseline(data):
+        jdata = json.loads(data.decode("gb18030"))
+        out = {field: [] for field in fields}
+        for item in jdata["tables"]:
+            for field in fields:
+                out[field].append(item["table"][field][0])
+        return out
+
+    def bench(fn, data, repeat=20):
+        fn(data)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn(data)
+        return (time.perf_counter() - start) / repeat * 1000
+
+    print(f"JSON 解析器: {'orjson' if orjson else '标准库 json（未安装 orjson）'}")
+    for text_field in (True, False):
+        data = _bench_payload(5000, text_field)
+        old_parse = bench(lambda d: json.loads(d.decode("gb18030")), data)
+        new_parse = bench(loads, data)
+        old = bench(baseline, data)
+        new = bench(lambda d: rq_columns(d, fields), data)
+        label = "含 tradeStatus（需解码）" if text_field else "仅数值列（ASCII，免解码）"
+        print(f"5000 只 {label}，{len(data) / 1024:.0f}KB:")
+        print(f"  解析: decode+json.loads {old_parse:.1f}ms → loads {new_parse:.1f}ms（{old_parse / new_parse:.1f}x）")
+        print(f"  解析+取 {len(fields)} 列: 逐条循环 {old:.1f}ms → rq_columns {new:.1f}ms（{old / new:.1f}x）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# coding:utf-8
+"""固定墙钟边界的 tick 调度器（盘中监控循环使用）
+
+tick 落在 anchor + k * interval 的整点边界上（如 09:30:00、:03、:06…），
+而不是 "处理完再 sleep(3)"，因此处理耗时不会累积成漂移。
+某一轮处理超时跨过了后续边界时，错过的 tick 直接合并到最近的一个边界
+立即触发，不会排队补跑；每轮的滞后（实际触发时间 - 边界时间）与
+超时/跳过次数都会记录下来。
+
+用法:
+    ticker = TickScheduler(interval=3, start=dt_time(9, 30), end=dt_time(9, 46))
+    for tick in ticker:
+        ...  # tick.at 为本轮边界时间，tick.lag 为滞后秒数
+    print(ticker.summary())
+"""
+import time as sys_time
+from dataclasses import dataclass
+from datetime import datetime, time as dt_time
+from typing import Callable
+
+
+@dataclass
+class Tick:
+    seq: int          # 边界序号 k（从 anchor 起算）
+    at: datetime      # 本轮边界的墙钟时间
+    offset: float     # 距 anchor 的秒数
+    lag: float        # 实际触发时间 - 边界时间（秒）
+    skipped: int      # 因上一轮超时而合并掉的 tick 数
+
+
+class TickScheduler:
+    """按固定墙钟边界触发的 tick 迭代器
+
+    Args:
+        interval: tick 间隔（秒）
+        start: 当日窗口开始时间（第一个边界）
+        end: 当日窗口结束时间（含）
+        now_fn: 返回当前 epoch 秒的函数，默认 time.time（回放时可替换）
+        sleep_fn: 睡眠函数，默认 time.sleep
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        start: dt_time,
+        end: dt_time,
+        now_fn: Callable[[], float] = sys_time.time,
+        sleep_fn: Callable[[float], None] = sys_time.sleep,
+    ):
+        self.interval = interval
+        self.now_fn = now_fn
+        self.sleep_fn = sleep_fn
+
+        today = datetime.fromtimestamp(now_fn()).date()
+        self.anchor = datetime.combine(today, start).timestamp()
+        self.end = datetime.combine(today, end).timestamp()
+
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.lags: list[float] = []
+        self._last_seq = -1
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Tick:
+        now = self.now_fn()
+        due_seq = self._last_seq + 1
+        # 启动时已进入窗口：从下一个边界开始，不计为超时
+        if self._last_seq < 0 and now > self.anchor:
+            due_seq = int((now - self.anchor) // self.interval) + 1
+
+        skipped = 0
+        latest_seq = int((now - self.anchor) // self.interval) if now >= self.anchor else -1
+        if self._last_seq >= 0 and latest_seq >= due_seq:
+            # 上一轮处理跨过了边界：合并到最近一个已过边界，立即触发
+            self.overruns += 1
+            skipped = latest_seq - due_seq
+            self.skipped += skipped
+            due_seq = latest_seq
+
+        scheduled = self.anchor + due_seq * self.interval
+        if scheduled > self.end:
+            raise StopIteration
+
+        wait = scheduled - now
+        if wait > 0:
+            self.sleep_fn(wait)
+            now = self.now_fn()
+
+        lag = max(0.0, now - scheduled)
+        self._last_seq = due_seq
+        self.ticks += 1
+        self.lags.append(lag)
+        return Tick(
+            seq=due_seq,
+            at=datetime.fromtimestamp(scheduled),
+            offset=due_seq * self.interval,
+            lag=lag,
+            skipped=skipped,
+        )
+
+    def summary(self) -> dict:
+        """滞后与超时统计"""
+        lags = sorted(self.lags)
+        return {
+            "interval": self.interval,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "avg_lag_ms": round(sum(lags) / len(lags) * 1000, 1) if lags else 0,
+            "max_lag_ms": round(lags[-1] * 1000, 1) if lags else 0,
+        }
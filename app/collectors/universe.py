@@ -0,0 +1,232 @@
+# coding:utf-8
+"""每日股票池快照（全部 A 股代码、名称、板块、ST、北交所）
+
+每个交易日只向 THS 取一次（THS_DR p03291 全部 A 股 + THS_WCQuery ST 股票），
+写入本地 data/universe/<cdate>.npz 和 db_universe，进程内按日期缓存，
+日线、涨停反包、竞价等采集器共用，ST 口径统一为:
+    问财 "ST股票" 结果 ∪ 名称含 "ST"（*ST、ST、SST 等）
+
+读取顺序: 内存 → 本地文件 → db_universe → THS（取回后写入本地与数据库）
+问财 ST 查询失败时只按名称判断 ST，该快照仅本次使用（不写本地、数据库和内存缓存），下次调用重试。
+
+用法:
+  python -m app.collectors.universe                 取今天的股票池
+  python -m app.collectors.universe 2025-02-14      取指定交易日
+
+  universe = get_universe("2025-02-14")
+  universe.name_map()     {代码: 名称}
+  universe.st_codes()     ST 股票代码集合
+"""
+import os
+import sys
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.collectors import func, thsjson
+from app.collectors.bulk import replace_rows
+from app.collectors.models import StockUniverse
+from app.collectors.quotes import get_source
+
+UNIVERSE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "universe"
+)
+
+# 板块（按代码前缀）
+BOARD_MAIN = "main"   # 沪深主板
+BOARD_GEM = "gem"     # 创业板 30
+BOARD_STAR = "star"   # 科创板 68
+BOARD_BJ = "bj"       # 北交所
+
+# 已加载的股票池 {cdate: Universe}；每个日期一把锁，并发补采时同一日期只取一次
+_cache: dict[str, "Universe"] = {}
+_locks: dict[str, threading.Lock] = defaultdict(threading.Lock)
+_locks_guard = threading.Lock()
+
+
+def board_of(code: str) -> str:
+    if code.endswith(".BJ"):
+        return BOARD_BJ
+    if code.startswith("30"):
+        return BOARD_GEM
+    if code.startswith("68"):
+        return BOARD_STAR
+    return BOARD_MAIN
+
+
+class Universe:
+    """一个交易日的股票池（列式，代码升序）
+
+    complete 为 False 表示 ST 只按名称判断（问财查询失败），不应持久化。
+    """
+
+    def __init__(self, cdate: str, codes, names, st, complete: bool = True):
+        self.complete = complete
+        order = np.argsort(np.asarray(codes, dtype=str), kind="stable")
+        self.cdate = cdate
+        self.codes = np.asarray(codes, dtype=str)[order]
+        self.names = np.asarray(names, dtype=str)[order]
+        self.st = np.asarray(st, dtype=bool)[order]
+        self.board = np.array([board_of(code) for code in self.codes.tolist()], dtype=str)
+        self.bj = self.board == BOARD_BJ
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def name_map(self) -> dict[str, str]:
+        return dict(zip(self.codes.tolist(), self.names.tolist()))
+
+    def st_codes(self) -> set[str]:
+        return set(self.codes[self.st].tolist())
+
+    def is_st(self, codes) -> np.ndarray:
+        """批量判断是否 ST（不在股票池中的代码为 False）"""
+        query = np.asarray(codes, dtype=str)
+        if len(self.codes) == 0:
+            return np.zeros(len(query), dtype=bool)
+        pos = np.minimum(np.searchsorted(self.codes, query), len(self.codes) - 1)
+        return (self.codes[pos] == query) & self.st[pos]
+
+
+def universe_path(cdate: str, directory: str = UNIVERSE_DIR) -> str:
+    return os.path.join(directory, f"{cdate}.npz")
+
+
+def save_universe(universe: Universe, directory: str = UNIVERSE_DIR) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = universe_path(universe.cdate, directory)
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, codes=universe.codes, names=universe.names, st=universe.st)
+    os.replace(tmp, path)
+    return path
+
+
+def load_universe(cdate: str, directory: str = UNIVERSE_DIR) -> Universe | None:
+    path = universe_path(cdate, directory)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return Universe(cdate, data["codes"], data["names"], data["st"])
+
+
+def read_universe(cdate: str, db: Session) -> Universe | None:
+    """从 db_universe 读取，没有返回 None"""
+    rows = (
+        db.query(StockUniverse.stockid, StockUniverse.stockname, StockUniverse.is_st)
+        .filter(StockUniverse.cdate == cdate)
+        .all()
+    )
+    if not rows:
+        return None
+    codes, names, st = zip(*rows)
+    return Universe(cdate, codes, [name or "" for name in names], [bool(flag) for flag in st])
+
+
+def write_universe(universe: Universe, db: Session):
+    """整体替换 db_universe 中该日的股票池（提交，db 须为独立会话）"""
+    rows = [
+        {"cdate": universe.cdate, "stockid": code, "stockname": name, "board": board,
+         "is_st": int(st), "is_bj": int(bj)}
+        for code, name, board, st, bj in zip(
+            universe.codes.tolist(), universe.names.tolist(), universe.board.tolist(),
+            universe.st.tolist(), universe.bj.tolist(),
+        )
+    ]
+    replace_rows(db, StockUniverse, rows, scope={"cdate": universe.cdate})
+    db.commit()
+
+
+def fetch_universe(trading_day: str) -> Universe | str:
+    """从 THS 取一个交易日的股票池，失败返回错误信息（ST 查询失败时返回 complete=False 的快照）"""
+    ths = get_source()
+    if not ths.available:
+        return "iFinDPy not available"
+
+    cdate = trading_day.replace("-", "")
+    data_codes = ths.dr(
+        "p03291",
+        f"date={cdate};blockname=001005010;iv_type=allcontract",
+        "p03291_f001:Y,p03291_f002:Y,p03291_f003:Y,p03291_f004:Y",
+    )
+    if data_codes.errorcode != 0:
+        return f"THS_DR 失败: {data_codes.errmsg}"
+    codes = data_codes.data["p03291_f002"].tolist()
+    names = [str(name) if name is not None else "" for name in data_codes.data["p03291_f003"].tolist()]
+
+    st_sids = set()
+    st_stocks = ths.wcquery(cdate + " ST股票", "stock", "format:json")
+    complete = st_stocks.errorcode == 0
+    if complete:
+        st_data = thsjson.loads(st_stocks.data)
+        st_sids = set(st_data["tables"][0]["table"]["股票代码"])
+    else:
+        print(f"ST 股票查询失败，仅按名称判断（本次不保存，下次重试）: {st_stocks.errmsg}")
+
+    st = [code in st_sids or "ST" in name for code, name in zip(codes, names)]
+    return Universe(cdate, codes, names, st, complete)
+
+
+def get_universe(trading_day: str, db: Session | None = None) -> Universe | None:
+    """某交易日的股票池，取不到返回 None
+
+    Args:
+        trading_day: 交易日 YYYY-MM-DD 或 YYYYMMDD
+        db: 用于读取 db_universe，None 时临时开一个会话（写入始终使用独立会话，不提交调用方的事务）
+    """
+    cdate = trading_day.replace("-", "")
+    with _locks_guard:
+        lock = _locks[cdate]
+    with lock:
+        universe = _cache.get(cdate) or load_universe(cdate)
+        if universe is None:
+            universe = _from_db_or_ths(cdate, db)
+        if universe is not None and universe.complete:
+            _cache[cdate] = universe
+    return universe
+
+
+def _from_db_or_ths(cdate: str, db: Session | None) -> Universe | None:
+    from app.database import SessionLocal
+
+    session = db or SessionLocal()
+    try:
+        universe = read_universe(cdate, session)
+    finally:
+        if db is None:
+            session.close()
+
+    if universe is None:
+        universe = fetch_universe(f"{cdate[:4]}-{cdate[4:6]}-{cdate[6:]}")
+        if isinstance(universe, str):
+            print(f"获取 {cdate} 股票池失败: {universe}")
+            return None
+        if not universe.complete:
+            return universe
+        # 独立会话写入，不提交 / 回滚调用方会话中未提交的修改
+        writer = SessionLocal()
+        try:
+            write_universe(universe, writer)
+        except Exception as e:
+            writer.rollback()
+            print(f"写入 db_universe 失败（仅保存本地）: {e}")
+        finally:
+            writer.close()
+    save_universe(universe)
+    return universe
+
+
+if __name__ == "__main__":
+    date_arg = sys.argv[1] if len(sys.argv) > 1 else datetime.today().strftime("%Y-%m-%d")
+    trading_day = func.get_trading_day(date_arg)
+
+    func.thslogin()
+    try:
+        universe = get_universe(trading_day)
+        if universe is None:
+            sys.exit(1)
+        print(f"{universe.cdate} 股票池: {len(universe)} 只，ST {int(universe.st.sum())} 只，北交所 {int(universe.bj.sum())} 只")
+    finally:
+        func.thslogout()
@@ -0,0 +1,142 @@
+# coding:utf-8
+"""入选记录异步批量写入器（write-behind）
+
+实时监控循环只负责筛选，入选记录放入队列后立即返回；
+后台线程每个 tick 把队列中的记录按表合并成一条多行
+INSERT ... ON DUPLICATE KEY UPDATE（主键冲突即忽略）写入 Cloud SQL，
+瞬时错误自动重试，关闭时把剩余记录全部写完。
+
+用法:
+    writer = SelectionWriter()
+    writer.put(Mighty, {"cdate": "20250214", "stockid": "600000.SH", ...})
+    writer.flush()   # 每轮扫描结束调用，唤醒后台线程写入
+    writer.close()   # 监控结束，排空队列
+
+    SelectionWriter(bind=None)   # 试运行（离线回放）: 只计数，不写库
+"""
+import queue
+import threading
+import time as sys_time
+from collections import defaultdict
+
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from app.database import engine
+
+
+class SelectionWriter:
+    """后台批量写入入选记录
+
+    Args:
+        flush_interval: 未收到 flush 信号时的兜底写入间隔（秒）
+        max_retries: 单次写入的最大重试次数（仅针对瞬时错误）
+        retry_backoff: 首次重试等待秒数，之后每次翻倍
+        bind: 写入的数据库引擎，None 表示试运行（记录只计数、丢弃）
+    """
+
+    def __init__(self, flush_interval: float = 3.0, max_retries: int = 3, retry_backoff: float = 0.5, bind=engine):
+        self.bind = bind
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.written = 0
+        self.failed = 0
+        self.discarded = 0
+        # 累计入库耗时（秒），take_write_ms 取走增量
+        self._write_seconds = 0.0
+        self._timing_lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._pending: list = []  # 重试失败、留待下次写入的记录
+        self._wakeup = threading.Event()
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="selection-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, Model, row: dict):
+        """入队一条记录（非阻塞）"""
+        self._queue.put((Model, row))
+
+    def flush(self):
+        """通知后台线程立即写入当前队列"""
+        self._wakeup.set()
+
+    def take_write_ms(self) -> float:
+        """上次调用以来完成的入库耗时（毫秒）"""
+        with self._timing_lock:
+            seconds, self._write_seconds = self._write_seconds, 0.0
+        return seconds * 1000
+
+    def close(self, timeout: float | None = 30) -> dict:
+        """停止后台线程并写完剩余记录
+
+        Returns:
+            {"written": 已写入条数, "failed": 最终写入失败条数}，试运行时另有 "dry_run": 丢弃条数
+        """
+        self._closing.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        stats = {"written": self.written, "failed": self.failed}
+        if self.bind is None:
+            stats["dry_run"] = self.discarded
+        return stats
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            closing = self._closing.is_set()
+            self._write_batch(self._drain(), final=closing)
+            if closing and self._queue.empty():
+                return
+
+    def _drain(self) -> list:
+        items, self._pending = self._pending, []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _write_batch(self, items: list, final: bool = False):
+        if not items:
+            return
+        if self.bind is None:
+            self.discarded += len(items)
+            return
+
+        start = sys_time.perf_counter()
+        by_model = defaultdict(list)
+        for Model, row in items:
+            by_model[Model].append(row)
+
+        for Model, rows in by_model.items():
+            table = Model.__table__
+            stmt = mysql_insert(table).values(rows)
+            # 唯一键 (cdate, stockid) 冲突时保持原记录不变
+            stmt = stmt.on_duplicate_key_update(stockid=stmt.inserted.stockid)
+
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with self.bind.begin() as conn:
+                        conn.execute(stmt)
+                    self.written += len(rows)
+                    break
+                except (OperationalError, DBAPIError) as e:
+                    transient = isinstance(e, OperationalError) or e.connection_invalidated
+                    if transient and attempt < self.max_retries:
+                        wait = self.retry_backoff * (2 ** attempt)
+                        print(f"写入 {table.name} 失败（第{attempt + 1}次），{wait}s 后重试: {e}")
+                        sys_time.sleep(wait)
+                        continue
+                    if transient and not final:
+                        # 保留到下一个 tick 再试，不丢数据
+                        print(f"写入 {table.name} 暂时失败，{len(rows)} 条留待下次写入: {e}")
+                        self._pending.extend((Model, row) for row in rows)
+                    else:
+                        print(f"写入 {table.name} 失败，丢弃 {len(rows)} 条: {e}")
+                        self.failed += len(rows)
+                    break
+
+        with self._timing_lock:
+            self._write_seconds += sys_time.perf_counter() - start
@@ -18,6 +18,35 @@ class Settings(BaseSettings):
     THS_USERNAME: str = ""
     THS_PASSWORD: str = ""
 
+    # 盘中监控默认扫描间隔（秒），各策略可单独指定
+    MONITOR_INTERVAL: int = 3
+    # 按策略覆盖扫描间隔，如 "mighty=3,jjmighty=6"（未指定或为 0 的策略取 MONITOR_INTERVAL）
+    MONITOR_INTERVALS: str = ""
+    # 盘中监控 THS_RQ 分批: 每批代码数 / 并发请求批数
+    THS_RQ_BATCH_SIZE: int = 200
+    THS_RQ_WORKERS: int = 4
+    # THS 历史查询磁盘缓存（app/collectors/quotecache.py）: 大小上限（MB，0 关闭）/ 当日数据有效期（秒）/ 目录（默认 data/thscache）
+    THS_CACHE_MAX_MB: int = 512
+    THS_CACHE_TTL: int = 300
+    THS_CACHE_DIR: str = ""
+    # 历史补采（python -m app.collectors.backfill）: 并发交易日数 / THS 请求频率上限（次/秒）
+    BACKFILL_WORKERS: int = 4
+    BACKFILL_THS_RATE: float = 2.0
+    # 是否录制盘中每轮行情快照到 data/ticks/<cdate>.npz
+    RECORD_TICKS: bool = True
+    # 录制且裁剪时每隔多少轮请求一次完整股票池（0 表示只录制实际请求的代码）
+    RECORD_FULL_EVERY: int = 10
+    # 盘中监控是否不再请求已入选 / 永久不可能入选的股票
+    # （录制文件中被裁剪的代码 present 为 False；关闭后每轮请求并录制完整股票池，供更宽松阈值的 tick 回测）
+    MONITOR_PRUNE: bool = True
+    # 盘中监控使用的已保存回测策略（db_backtest_strategies.id），如 "mighty=3,jjmighty=5"；
+    # 未指定的策略使用 app/backtest/rules.py 中的 LIVE_RULES
+    MONITOR_STRATEGY_IDS: str = ""
+    # 离线回放（python -m app.collectors.replay）--write / --seed-pool 使用的单独数据库，不能与 DATABASE_URL 相同
+    REPLAY_DATABASE_URL: str = ""
+    # SSE 入选推送: 每张入选表读取新记录的间隔（秒，所有订阅者共享一次读取）
+    STREAM_POLL_INTERVAL: float = 1.0
+
     ADMIN_USERNAME: str = "admin"
     ADMIN_PASSWORD: str = "yz188188"
 
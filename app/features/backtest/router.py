@@ -305,8 +305,8 @@ def compare_formulas(
     # 应用非score的过滤器
     filters_dict = {k: v.model_dump() for k, v in body.filters.items()}
     non_score_filters = {k: v for k, v in filters_dict.items() if k != "min_score"}
-    from app.backtest.strategy import apply_filters as af, Trade
-    records = [r for r in records if af(r, non_score_filters)]
+    from app.backtest.strategy import filter_records, Trade
+    records = filter_records(records, non_score_filters)
 
     # 对每条记录重算新旧分数，分别按门槛过滤
     old_trades = []
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DECIMAL, BigInteger
+from sqlalchemy import Column, Integer, String, DECIMAL, BigInteger, UniqueConstraint
 
 from app.database import Base
 
@@ -16,3 +16,7 @@ class Jjbvol(Base):
     jje = Column(DECIMAL(15, 2), default=0)
     rate = Column(DECIMAL(10, 2), default=0)
     status = Column(String(20))
+
+    __table_args__ = (
+        UniqueConstraint("cdate", "stockid", name="uk_jjvol_cdate_stockid"),
+    )
@@ -0,0 +1,168 @@
+# coding:utf-8
+"""入选记录变更流 — 所有 SSE 订阅者共享一次数据库读取
+
+盘中采集（SelectionWriter 单线程按顺序写入）只会追加新行，自增 id 单调递增，
+因此每张入选表只需记住已推送的最大 id，按固定间隔执行一次
+  SELECT ... WHERE id > last_id ORDER BY id
+新行序列化一次后，按 (策略, 过滤配置) 分组求一次过滤掩码，再分发到各订阅者的队列。
+订阅人数再多，每条新记录也只读一次、序列化一次，不再是每个客户端每次轮询一次查询。
+
+没有订阅者时后台任务自动停止，下次订阅时从当前最大 id 重新开始。
+"""
+import asyncio
+import json
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func as sa_func
+
+from app.backtest.strategy import filter_records
+from app.config import get_settings
+from app.database import SessionLocal
+from app.features.jjmighty.models import Jjmighty
+from app.features.jjmighty.schemas import JjmightyItem
+from app.features.lianban.models import Lianban
+from app.features.lianban.schemas import LianbanItem
+from app.features.mighty.models import Mighty
+from app.features.mighty.schemas import MightyItem
+from app.features.shared.filters import STRATEGY_ALLOWED_FILTERS
+
+logger = logging.getLogger(__name__)
+
+# 可订阅的策略: 策略名 -> (入选表模型, 输出 schema)
+STREAM_MODELS = {
+    "mighty": (Mighty, MightyItem),
+    "lianban": (Lianban, LianbanItem),
+    "jjmighty": (Jjmighty, JjmightyItem),
+}
+
+# 单个订阅者最多积压的消息数，超过视为客户端过慢并断开
+QUEUE_SIZE = 1000
+
+
+def sse_message(strategy: str, row, item_schema) -> str:
+    """一条入选记录的 SSE 消息（id 为入选表自增 id，断线重连时用作 Last-Event-ID）"""
+    data = item_schema.model_validate(row).model_dump_json()
+    return f"id: {row.id}\nevent: {strategy}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """一个 SSE 连接的订阅"""
+
+    def __init__(self, strategy: str, filters: dict):
+        allowed = STRATEGY_ALLOWED_FILTERS.get(strategy, set())
+        self.strategy = strategy
+        self.filters = {k: v for k, v in filters.items() if k in allowed}
+        # 过滤配置相同的订阅者共用一次过滤计算
+        self.group = (strategy, json.dumps(self.filters, sort_keys=True))
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+        # 订阅时变更流已读到的 id，之前的记录由调用方按需补发
+        self.start_id = 0
+
+
+class SelectionHub:
+    """入选表变更流（进程内单例，见 get_hub）
+
+    Args:
+        interval: 轮询间隔（秒）
+        session_factory: 数据库会话工厂
+    """
+
+    def __init__(self, interval: float, session_factory=SessionLocal):
+        self.interval = interval
+        self.session_factory = session_factory
+        self.subscribers: set[Subscription] = set()
+        self.last_ids: dict[str, int] = {}
+        self.rows_read = 0
+        self._task: asyncio.Task | None = None
+
+    async def subscribe(self, strategy: str, filters: dict) -> Subscription:
+        sub = Subscription(strategy, filters)
+        if strategy not in self.last_ids:
+            max_id = await run_in_threadpool(self._max_id, strategy)
+            # 等待期间其他订阅者可能已初始化、后台任务也可能已推进，不能回退
+            self.last_ids.setdefault(strategy, max_id)
+        sub.start_id = self.last_ids[strategy]
+        self.subscribers.add(sub)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        self.subscribers.discard(sub)
+
+    def _max_id(self, strategy: str) -> int:
+        Model = STREAM_MODELS[strategy][0]
+        db = self.session_factory()
+        try:
+            return db.query(sa_func.max(Model.id)).scalar() or 0
+        finally:
+            db.close()
+
+    def read_since(self, strategy: str, after_id: int, until_id: int | None = None) -> list[tuple]:
+        """读取 id 在 (after_id, until_id] 内的入选记录，返回 [(记录, SSE 消息)]"""
+        Model, item_schema = STREAM_MODELS[strategy]
+        db = self.session_factory()
+        try:
+            query = db.query(Model).filter(Model.id > after_id)
+            if until_id is not None:
+                query = query.filter(Model.id <= until_id)
+            rows = query.order_by(Model.id).all()
+            return [(row, sse_message(strategy, row, item_schema)) for row in rows]
+        finally:
+            db.close()
+
+    def _poll(self, strategies: set[str]) -> dict[str, list[tuple]]:
+        """每个有订阅者的策略读取一次新行（在线程池中执行）"""
+        batches = {}
+        for strategy in strategies:
+            rows = self.read_since(strategy, self.last_ids[strategy])
+            if rows:
+                self.last_ids[strategy] = rows[-1][0].id
+                self.rows_read += len(rows)
+                batches[strategy] = rows
+        return batches
+
+    def _publish(self, batches: dict[str, list[tuple]]):
+        groups: dict[tuple, list[Subscription]] = {}
+        for sub in self.subscribers:
+            if sub.strategy in batches:
+                groups.setdefault(sub.group, []).append(sub)
+
+        for subs in groups.values():
+            rows = batches[subs[0].strategy]
+            passed = filter_records([row for row, _ in rows], subs[0].filters)
+            passed_ids = {row.id for row in passed}
+            messages = [message for row, message in rows if row.id in passed_ids]
+            for sub in subs:
+                for message in messages:
+                    try:
+                        sub.queue.put_nowait(message)
+                    except asyncio.QueueFull:
+                        sub.overflowed = True
+                        self.unsubscribe(sub)
+                        break
+
+    async def _run(self):
+        while self.subscribers:
+            try:
+                strategies = {sub.strategy for sub in self.subscribers}
+                batches = await run_in_threadpool(self._poll, strategies)
+                if batches:
+                    self._publish(batches)
+            except Exception:
+                logger.exception("读取入选记录变更失败")
+            await asyncio.sleep(self.interval)
+        # 无订阅者时停止，下次订阅从当时的最大 id 开始
+        self.last_ids.clear()
+
+
+_hub: SelectionHub | None = None
+
+
+def get_hub() -> SelectionHub:
+    global _hub
+    if _hub is None:
+        _hub = SelectionHub(get_settings().STREAM_POLL_INTERVAL)
+    return _hub
@@ -0,0 +1,78 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.database import SessionLocal
+from app.auth.dependencies import get_current_user, get_subscribed_user, security
+from app.backtest.strategy import filter_records
+from app.features.shared.filters import get_filters_for_display
+from app.features.stream.hub import STREAM_MODELS, get_hub
+
+router = APIRouter(prefix="/api/stream", tags=["stream"])
+
+# 无新记录时发送心跳注释的间隔（秒），防止代理断开空闲连接
+HEARTBEAT_SECONDS = 15
+
+
+def stream_filters(
+    strategy_name: str,
+    strategy_id: int | None = Query(None, description="策略配置ID"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> dict:
+    """校验订阅并读取过滤配置
+
+    使用短会话并在返回前关闭，不经 get_db（yield 依赖要到响应结束才释放，
+    SSE 长连接期间会一直占用连接池中的一个连接）。
+    """
+    if strategy_name not in STREAM_MODELS:
+        raise HTTPException(status_code=404, detail=f"未知策略: {strategy_name}")
+    db = SessionLocal()
+    try:
+        get_subscribed_user(get_current_user(credentials, db))
+        return get_filters_for_display(db, strategy_name, strategy_id)
+    finally:
+        db.close()
+
+
+@router.get("/{strategy_name}")
+async def stream_selections(
+    strategy_name: str,
+    last_id: int | None = Query(None, description="补发该 id 之后的记录（默认只推送新记录）"),
+    last_event_id: int | None = Header(None, description="SSE 断线重连时浏览器自动携带"),
+    filters: dict = Depends(stream_filters),
+):
+    """SSE 推送新入选记录（event 为策略名，data 与 GET /api/<策略> 的单条记录相同）"""
+    hub = get_hub()
+    sub = await hub.subscribe(strategy_name, filters)
+
+    backlog = []
+    after = last_event_id if last_event_id is not None else last_id
+    if after is not None and after < sub.start_id:
+        rows = await run_in_threadpool(hub.read_since, strategy_name, after, sub.start_id)
+        passed_ids = {row.id for row in filter_records([row for row, _ in rows], sub.filters)}
+        backlog = [message for row, message in rows if row.id in passed_ids]
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            for message in backlog:
+                yield message
+            # 积压过多被断开后由客户端携带 Last-Event-ID 重连补发
+            while not sub.overflowed:
+                try:
+                    message = await asyncio.wait_for(sub.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield message
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
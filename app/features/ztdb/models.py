@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DECIMAL
+from sqlalchemy import Column, Integer, String, DECIMAL, UniqueConstraint
 
 from app.database import Base
 
@@ -12,3 +12,7 @@ class Ztdb(Base):
     stockname = Column(String(50))
     zhenfu = Column(DECIMAL(10, 2))
     declines = Column(DECIMAL(10, 2))
+
+    __table_args__ = (
+        UniqueConstraint("cdate", "stockid", name="uk_ztdb_cdate_stockid"),
+    )
@@ -1,4 +1,5 @@
 import logging
+from datetime import date
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -12,6 +13,8 @@ from app.features.mighty.router import router as mighty_router
 from app.features.lianban.router import router as lianban_router
 from app.features.jjmighty.router import router as jjmighty_router
 from app.features.backtest.router import router as backtest_router
+from app.features.stream.router import router as stream_router
+from app.trading_calendar import get_calendar
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +42,7 @@ app.include_router(mighty_router)
 app.include_router(lianban_router)
 app.include_router(jjmighty_router)
 app.include_router(backtest_router)
+app.include_router(stream_router)
 
 
 @app.on_event("startup")
@@ -70,16 +74,19 @@ def seed_admin():
         db.close()
 
 
+@app.on_event("startup")
+def load_trading_calendar():
+    # 启动时按 XSHG（exchange_calendars）生成交易日历，与采集器共用 app/trading_calendar.py，请求中只做二分查找
+    cal = get_calendar()
+    logger.info("交易日历: %s ~ %s，共 %d 个交易日", cal.sessions[0], cal.sessions[-1], len(cal))
+    if cal.sessions[-1] < date.today().isoformat():
+        logger.warning("交易日历只覆盖到 %s，之后的日期按周一至周五去掉节假日表推算", cal.sessions[-1])
+
+
 @app.get("/api/latest-date")
 def latest_date():
-    import exchange_calendars as xcals
-    import pandas as pd
-    from datetime import date
-
-    cal = xcals.get_calendar("XSHG")
-    today = pd.Timestamp(date.today())
-    d = cal.date_to_session(today, direction="previous")
-    return {"date": d.strftime("%Y%m%d")}
+    # 超出日历覆盖范围时按周一至周五去掉节假日表推算（并记录警告），不会返回 500
+    return {"date": get_calendar().nearest(date.today().strftime("%Y%m%d"))}
 
 
 @app.get("/health")
@@ -0,0 +1,276 @@
+# coding:utf-8
+"""交易日历 — 采集器、回测与 API 共用的唯一交易日来源
+
+启动时一次性生成有序交易日数组，前一个 / 后一个 / 最近 / 区间查询均为二分查找 O(log n)，
+另有按数组批量查询的向量化接口（numpy searchsorted），供回测使用。
+
+交易日来源:
+  - 安装了 exchange_calendars 时取上交所日历（XSHG），覆盖 FIRST_YEAR 起至其维护的最后一个交易日
+  - 未安装时按下面的节假日表（周一至周五去掉节假日），只覆盖表中有数据的年份
+超出覆盖范围的日期按周一至周五去掉节假日表推算，并对每个年份记录一次警告
+（届时应升级 exchange_calendars 或补充节假日表），调度器不会因日历查询中断。
+
+日期参数可以是 YYYY-MM-DD 或 YYYYMMDD，返回与输入相同的格式。
+
+用法:
+    cal = get_calendar()
+    cal.previous("2025-02-05")          # "2025-01-27"（跨春节）
+    cal.nearest("20250201")             # "20250127"（非交易日往前取）
+    cal.range("2025-02-01", "2025-02-14")
+    cal.previous_sessions(np.array(["20250205", "20250206"]))
+"""
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 沪深交易所休市安排（原 func.get_holiday 的节假日表，含落在周末的休市日；
+# 未安装 exchange_calendars 时的交易日来源，须逐年连续；也用于推算日历覆盖范围外的日期）
+HOLIDAYS = {
+    2025: [
+        "2025-01-01",
+        "2025-01-28", "2025-01-29", "2025-01-30", "2025-01-31",
+        "2025-02-01", "2025-02-02", "2025-02-03", "2025-02-04",
+        "2025-04-04", "2025-04-05", "2025-04-06",
+        "2025-05-01", "2025-05-02", "2025-05-03", "2025-05-04", "2025-05-05",
+        "2025-05-31", "2025-06-01", "2025-06-02",
+        "2025-10-01", "2025-10-02", "2025-10-03", "2025-10-04",
+        "2025-10-05", "2025-10-06", "2025-10-07", "2025-10-08",
+    ],
+    2026: [
+        "2026-01-01", "2026-01-02",
+        "2026-02-16", "2026-02-17", "2026-02-18", "2026-02-19",
+        "2026-02-20", "2026-02-21", "2026-02-22", "2026-02-23",
+        "2026-04-04", "2026-04-05", "2026-04-06",
+        "2026-05-01", "2026-05-02", "2026-05-03", "2026-05-04", "2026-05-05",
+        "2026-06-19", "2026-06-20", "2026-06-21",
+        "2026-09-25", "2026-09-26", "2026-09-27",
+        "2026-10-01", "2026-10-02", "2026-10-03", "2026-10-04",
+        "2026-10-05", "2026-10-06", "2026-10-07",
+    ],
+}
+
+# 日历覆盖的起始年份（XSHG 日历）
+FIRST_YEAR = 2010
+
+
+def _dashed(day: str) -> str:
+    """YYYYMMDD / YYYY-MM-DD → YYYY-MM-DD"""
+    return f"{day[:4]}-{day[4:6]}-{day[6:8]}" if len(day) == 8 else day
+
+
+def _like(day: str, template: str) -> str:
+    """按 template 的格式输出 day（day 为 YYYY-MM-DD）"""
+    return day.replace("-", "") if len(template) == 8 else day
+
+
+class TradingCalendar:
+    """有序交易日数组
+
+    Args:
+        sessions: 升序的交易日 YYYY-MM-DD
+        holidays: 节假日集合 YYYY-MM-DD
+    """
+
+    def __init__(self, sessions: list[str], holidays: set[str] = frozenset()):
+        self.sessions = sessions
+        self.holidays = holidays
+        self._set = set(sessions)
+        self._array = np.array(sessions, dtype="U10")
+        self._compact = np.array([s.replace("-", "") for s in sessions], dtype="U8")
+        self._warned: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def _covers(self, day: str) -> bool:
+        return self.sessions[0] <= day <= self.sessions[-1]
+
+    def _guess(self, day: str) -> bool:
+        """覆盖范围外按周一至周五去掉节假日表推算是否交易日"""
+        year = int(day[:4])
+        if year not in self._warned:
+            self._warned.add(year)
+            logger.warning(
+                "交易日历未覆盖 %s（范围 %s ~ %s），按周一至周五去掉节假日表推算%s，"
+                "请升级 exchange_calendars 或补充 HOLIDAYS",
+                day, self.sessions[0], self.sessions[-1],
+                "" if year in HOLIDAYS else f"（节假日表也没有 {year} 年）",
+            )
+        return date.fromisoformat(day).weekday() < 5 and day not in self.holidays
+
+    def _step(self, day: str, days: int) -> str:
+        """从 day 起逐日移动直到交易日（day 本身不算），进入覆盖范围后改用二分查找"""
+        d = date.fromisoformat(day)
+        while True:
+            d += timedelta(days=days)
+            s = d.isoformat()
+            if self._covers(s):
+                if days < 0:
+                    return self.sessions[bisect_right(self.sessions, s) - 1]
+                return self.sessions[bisect_left(self.sessions, s)]
+            if self._guess(s):
+                return s
+
+    def is_session(self, day: str) -> bool:
+        d = _dashed(day)
+        if not self._covers(d):
+            return self._guess(d)
+        return d in self._set
+
+    def is_holiday(self, day: str) -> bool:
+        return _dashed(day) in self.holidays
+
+    def previous(self, day: str) -> str:
+        """严格早于 day 的最近交易日"""
+        d = _dashed(day)
+        if not self._covers(d):
+            return _like(self._step(d, -1), day)
+        i = bisect_left(self.sessions, d)
+        if i == 0:
+            return _like(self._step(d, -1), day)
+        return _like(self.sessions[i - 1], day)
+
+    def next(self, day: str) -> str:
+        """严格晚于 day 的最近交易日"""
+        d = _dashed(day)
+        if not self._covers(d):
+            return _like(self._step(d, 1), day)
+        i = bisect_right(self.sessions, d)
+        if i == len(self.sessions):
+            return _like(self._step(d, 1), day)
+        return _like(self.sessions[i], day)
+
+    def nearest(self, day: str, direction: str = "previous") -> str:
+        """day 是交易日则返回自身，否则按 direction（previous / next）取最近交易日"""
+        if self.is_session(day):
+            return day
+        return self.previous(day) if direction == "previous" else self.next(day)
+
+    def _guessed(self, start: str, end: str) -> list[str]:
+        """[start, end] 内按周一至周五去掉节假日表推算的交易日（start 晚于 end 时为空）"""
+        days = []
+        d, last = date.fromisoformat(start), date.fromisoformat(end)
+        while d <= last:
+            if self._guess(d.isoformat()):
+                days.append(d.isoformat())
+            d += timedelta(days=1)
+        return days
+
+    def range(self, start: str, end: str) -> list[str]:
+        """[start, end] 内的交易日"""
+        lo, hi = _dashed(start), _dashed(end)
+        before = (date.fromisoformat(self.sessions[0]) - timedelta(days=1)).isoformat()
+        after = (date.fromisoformat(self.sessions[-1]) + timedelta(days=1)).isoformat()
+        days = [
+            *self._guessed(lo, min(hi, before)),
+            *self.sessions[bisect_left(self.sessions, lo):bisect_right(self.sessions, hi)],
+            *self._guessed(max(lo, after), hi),
+        ]
+        return [_like(s, start) for s in days]
+
+    def offset(self, day: str, n: int) -> str:
+        """day 所在（非交易日取之前最近）交易日往后 n 个交易日，n 可为负"""
+        d = _dashed(self.nearest(day))
+        if self._covers(d):
+            i = bisect_left(self.sessions, d) + n
+            if 0 <= i < len(self.sessions):
+                return _like(self.sessions[i], day)
+        for _ in range(abs(n)):
+            d = self.next(d) if n > 0 else self.previous(d)
+        return _like(d, day)
+
+    # ---- 向量化接口（回测批量处理日期列） ----
+
+    def _sorted_for(self, dates: np.ndarray) -> np.ndarray:
+        return self._compact if dates.size and len(str(dates.flat[0])) == 8 else self._array
+
+    def is_sessions(self, dates) -> np.ndarray:
+        """逐个判断是否交易日"""
+        dates = np.asarray(dates, dtype=str)
+        sessions = self._sorted_for(dates)
+        pos = np.minimum(np.searchsorted(sessions, dates), len(sessions) - 1)
+        return sessions[pos] == dates
+
+    def previous_sessions(self, dates) -> np.ndarray:
+        """逐个取严格早于该日的交易日（超出范围为空串）"""
+        dates = np.asarray(dates, dtype=str)
+        sessions = self._sorted_for(dates)
+        pos = np.searchsorted(sessions, dates, side="left") - 1
+        return np.where(pos >= 0, sessions[np.maximum(pos, 0)], "")
+
+    def next_sessions(self, dates) -> np.ndarray:
+        """逐个取严格晚于该日的交易日（超出范围为空串）"""
+        dates = np.asarray(dates, dtype=str)
+        sessions = self._sorted_for(dates)
+        pos = np.searchsorted(sessions, dates, side="right")
+        return np.where(pos < len(sessions), sessions[np.minimum(pos, len(sessions) - 1)], "")
+
+    def session_index(self, dates) -> np.ndarray:
+        """逐个取交易日序号（非交易日取之前最近交易日的序号，早于首个交易日为 -1），
+        两个日期的序号差即相隔的交易日数"""
+        dates = np.asarray(dates, dtype=str)
+        return np.searchsorted(self._sorted_for(dates), dates, side="right") - 1
+
+
+def xshg_sessions(first_year: int = FIRST_YEAR) -> list[str] | None:
+    """上交所（XSHG）交易日 YYYY-MM-DD，未安装 exchange_calendars 返回 None"""
+    try:
+        import exchange_calendars as xcals
+    except ImportError:
+        return None
+    cal = xcals.get_calendar("XSHG", start=f"{first_year}-01-01")
+    return [session.strftime("%Y-%m-%d") for session in cal.sessions]
+
+
+def build_calendar(
+    first_year: int = FIRST_YEAR, last_year: int | None = None, holidays=HOLIDAYS, exchange: bool = True
+) -> TradingCalendar:
+    """生成交易日历
+
+    Args:
+        first_year / last_year: 覆盖的年份范围（last_year 默认取数据源的最后一年）
+        holidays: 节假日表 {年份: [YYYY-MM-DD]}，未使用 XSHG 时只覆盖表中的年份
+        exchange: 是否优先使用 exchange_calendars 的 XSHG 日历
+    """
+    sessions = xshg_sessions(first_year) if exchange else None
+    off = {day for days in holidays.values() for day in days}
+    if sessions is not None:
+        if last_year is not None:
+            sessions = [s for s in sessions if s[:4] <= str(last_year)]
+        # 节假日: 覆盖范围内不开市的工作日，另加节假日表中落在周末的休市日
+        d, end = date.fromisoformat(sessions[0]), date.fromisoformat(sessions[-1])
+        opened = set(sessions)
+        while d <= end:
+            if d.weekday() < 5 and d.isoformat() not in opened:
+                off.add(d.isoformat())
+            d += timedelta(days=1)
+        return TradingCalendar(sessions, off)
+
+    years = sorted(holidays)
+    if not years:
+        raise ValueError("未安装 exchange_calendars 且节假日表为空，无法生成交易日历")
+    first_year = max(first_year, years[0])
+    last_year = min(last_year or years[-1], years[-1])
+    missing = [year for year in range(first_year, last_year + 1) if year not in holidays]
+    if missing:
+        raise ValueError(f"节假日表缺少 {missing} 年")
+    sessions = []
+    d = date(first_year, 1, 1)
+    end = date(last_year, 12, 31)
+    while d <= end:
+        day = d.isoformat()
+        if d.weekday() < 5 and day not in off:
+            sessions.append(day)
+        d += timedelta(days=1)
+    return TradingCalendar(sessions, off)
+
+
+@lru_cache
+def get_calendar() -> TradingCalendar:
+    """进程内共享的交易日历（首次调用时生成）"""
+    return build_calendar()
@@ -19,8 +19,10 @@ CREATE TABLE IF NOT EXISTS db_ztdb (
   stockname VARCHAR(50),
   zhenfu DECIMAL(10,2),
   declines DECIMAL(10,2),
-  INDEX idx_cdate (cdate)
+  INDEX idx_cdate (cdate),
+  UNIQUE KEY uk_ztdb_cdate_stockid (cdate, stockid)
 );
+-- 已有库: ALTER TABLE db_ztdb ADD UNIQUE KEY uk_ztdb_cdate_stockid (cdate, stockid);
 
 CREATE TABLE IF NOT EXISTS db_data_jjztdt (
   id INT AUTO_INCREMENT PRIMARY KEY,
@@ -43,8 +45,10 @@ CREATE TABLE IF NOT EXISTS db_zrzt_jjvol (
   jje DECIMAL(15,2) DEFAULT 0,
   rate DECIMAL(10,2) DEFAULT 0,
   status VARCHAR(20),
-  INDEX idx_cdate (cdate)
+  INDEX idx_cdate (cdate),
+  UNIQUE KEY uk_jjvol_cdate_stockid (cdate, stockid)
 );
+-- 已有库: ALTER TABLE db_zrzt_jjvol ADD UNIQUE KEY uk_jjvol_cdate_stockid (cdate, stockid);
 
 CREATE TABLE IF NOT EXISTS db_money_effects (
   id INT AUTO_INCREMENT PRIMARY KEY,
@@ -142,6 +146,37 @@ CREATE TABLE IF NOT EXISTS db_jjmighty (
   INDEX idx_jjmighty_cdate (cdate)
 );
 
+CREATE TABLE IF NOT EXISTS db_monitor_ticks (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  cdate VARCHAR(8) NOT NULL,
+  seq INT NOT NULL,
+  times VARCHAR(8),
+  source VARCHAR(20),
+  lag_ms DECIMAL(10,1),
+  skipped INT DEFAULT 0,
+  tick_ms DECIMAL(10,1),
+  ths_ms DECIMAL(10,1),
+  decode_ms DECIMAL(10,1),
+  screen_ms DECIMAL(10,1),
+  db_ms DECIMAL(10,1),
+  pool INT,
+  polled INT,
+  selected INT DEFAULT 0,
+  INDEX idx_monitor_ticks_cdate (cdate)
+);
+
+CREATE TABLE IF NOT EXISTS db_universe (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  cdate VARCHAR(8) NOT NULL,
+  stockid VARCHAR(20) NOT NULL,
+  stockname VARCHAR(50),
+  board VARCHAR(8),
+  is_st SMALLINT DEFAULT 0,
+  is_bj SMALLINT DEFAULT 0,
+  INDEX idx_universe_cdate (cdate),
+  UNIQUE KEY uk_universe_cdate_stockid (cdate, stockid)
+);
+
 CREATE TABLE IF NOT EXISTS db_backtest_runs (
   id INT AUTO_INCREMENT PRIMARY KEY,
   strategy_name VARCHAR(50) NOT NULL,